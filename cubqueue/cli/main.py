@@ -6,10 +6,11 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from ..client import CubQueueClient
 from ..server.daemon import DaemonManager
+from ..worker import WorkerAgent
 
 # 版本信息
 __version__ = "1.0.0"
@@ -18,7 +19,26 @@ __version__ = "1.0.0"
 def cmd_start(args):
     """启动CubQueue服务器"""
     try:
-        daemon_manager = DaemonManager(args.base_dir, args.host, args.port)
+        daemon_manager = DaemonManager(
+            args.base_dir,
+            args.host,
+            args.port,
+            max_concurrent_tasks=args.max_concurrent_tasks,
+            result_cache_enabled=args.result_cache,
+            result_cache_ttl=args.result_cache_ttl,
+            ray_address=args.ray_address,
+            ray_shared_dir=args.ray_shared_dir,
+            fair_share_by=args.fair_share_by,
+            fair_share_weights=_parse_weights(args.fair_share_weight or []),
+            resource_admission=not args.no_resource_admission,
+            resource_cpus=args.cpus,
+            resource_memory_mb=args.memory,
+            memory_reserve_mb=args.memory_reserve,
+            task_timeout=args.task_timeout,
+            task_max_attempts=args.max_attempts,
+            retry_backoff=args.retry_backoff,
+            task_cgroups=not args.no_cgroups,
+        )
         if args.daemon:
             daemon_manager.start_daemon()
             print(f"CubQueue守护进程已启动 (http://{args.host}:{args.port})")
@@ -44,7 +64,23 @@ def cmd_register(args):
     """注册脚本"""
     try:
         client = CubQueueClient(f"http://{args.host}:{args.port}")
-        client.register(args.name, args.desc, args.script)
+        preload = [m.strip() for m in args.preload.split(",") if m.strip()] if args.preload else None
+        executor = args.executor or ("forkserver" if preload else None)
+        client.register(
+            args.name,
+            args.desc,
+            args.script,
+            executor,
+            preload,
+            args.cpus,
+            args.memory,
+            args.timeout,
+            args.cpu_time_limit,
+            args.memory_limit,
+            args.max_attempts,
+            args.retry_backoff,
+            _parse_retry_on(args.retry_on),
+        )
         print(f"脚本 '{args.name}' 注册成功")
     except Exception as e:
         print(f"注册失败: {e}", file=sys.stderr)
@@ -71,16 +107,39 @@ def cmd_list(args):
     print("查看任务列表...")
     try:
         client = CubQueueClient(f"http://{args.host}:{args.port}")
-        tasks = client.list_tasks()
-        if tasks:
-            print("任务列表:")
-            for task in tasks:
-                desc_info = f" - {task['description']}" if task.get('description') else ""
-                print(
-                    f"  - {task['id']}: {task['script_name']} ({task['status']}){desc_info}"
-                )
+        filters = dict(
+            status=args.status,
+            script=args.script,
+            since=args.since,
+            until=args.until,
+            query=args.query,
+            sweep=args.sweep,
+        )
+        next_cursor = None
+        if args.all:
+            tasks = client.iter_tasks(**filters)
         else:
+            page = client.get_task_page(
+                limit=args.limit, cursor=args.cursor, **filters
+            )
+            tasks = page["tasks"]
+            next_cursor = page["next_cursor"]
+
+        count = 0
+        for task in tasks:
+            if count == 0:
+                print("任务列表:")
+            count += 1
+            desc_info = f" - {task['description']}" if task.get('description') else ""
+            priority_info = f" [优先级 {task['priority']}]" if task.get('priority') else ""
+            print(
+                f"  - {task['id']}: {task['script_name']} ({task['status']})"
+                f"{priority_info}{desc_info}"
+            )
+        if count == 0:
             print("暂无任务")
+        if next_cursor:
+            print(f"还有更多任务，使用 --cursor {next_cursor} 查看下一页")
     except Exception as e:
         print(f"查询失败: {e}", file=sys.stderr)
         sys.exit(1)
@@ -89,17 +148,118 @@ def cmd_submit(args):
     """提交任务"""
     try:
         print("提交任务...")
-        client = CubQueueClient(f"http://{args.host}:{args.port}")
+        client = CubQueueClient(f"http://{args.host}:{args.port}", args.submitter)
         print(f"提交任务: {args.script}")
         large_files = args.large_files if args.large_files else []
         description = getattr(args, 'desc', None)
-        task_id = client.submit_task(args.script, args.arg_file, large_files, description)
-        print(f"任务提交成功，任务ID: {task_id}")
+        if args.sweep:
+            if not args.arg_file:
+                raise ValueError("--sweep需要与--arg-file（参数模板）一起使用")
+            with open(args.sweep, "r", encoding="utf-8") as f:
+                spec = json.load(f)
+            sweep = client.submit_sweep(
+                args.script,
+                args.arg_file,
+                spec,
+                args.sweep_mode,
+                large_files,
+                description,
+                priority=args.priority,
+                cpus=args.cpus,
+                memory_mb=args.memory,
+                timeout=args.timeout,
+                cpu_time_limit=args.cpu_time_limit,
+                memory_limit_mb=args.memory_limit,
+                max_attempts=args.max_attempts,
+                retry_backoff=args.retry_backoff,
+                retry_on=_parse_retry_on(args.retry_on),
+            )
+            print(f"参数扫描提交成功，扫描ID: {sweep['id']}，共 {sweep['total']} 个任务")
+        elif args.manifest:
+            args_list = _load_manifest(args.manifest)
+            task_ids = client.submit_many(
+                args.script,
+                args_list,
+                large_files,
+                description,
+                cache=not args.no_cache,
+                priority=args.priority,
+                cpus=args.cpus,
+                memory_mb=args.memory,
+                timeout=args.timeout,
+                cpu_time_limit=args.cpu_time_limit,
+                memory_limit_mb=args.memory_limit,
+                max_attempts=args.max_attempts,
+                retry_backoff=args.retry_backoff,
+                retry_on=_parse_retry_on(args.retry_on),
+            )
+            print(f"批量提交成功，共 {len(task_ids)} 个任务")
+            for task_id in task_ids:
+                print(f"  - {task_id}")
+        else:
+            task_id = client.submit_task(
+                args.script,
+                args.arg_file,
+                large_files,
+                description,
+                cache=not args.no_cache,
+                priority=args.priority,
+                cpus=args.cpus,
+                memory_mb=args.memory,
+                timeout=args.timeout,
+                cpu_time_limit=args.cpu_time_limit,
+                memory_limit_mb=args.memory_limit,
+                max_attempts=args.max_attempts,
+                retry_backoff=args.retry_backoff,
+                retry_on=_parse_retry_on(args.retry_on),
+            )
+            print(f"任务提交成功，任务ID: {task_id}")
     except Exception as e:
         print(f"提交失败: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def _load_manifest(path: str) -> List[dict]:
+    """读取JSON Lines格式的参数清单，每行是一个任务的参数对象"""
+    args_list = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                args = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"参数清单第{line_no}行格式错误: {e}")
+            if not isinstance(args, dict):
+                raise ValueError(f"参数清单第{line_no}行不是JSON对象")
+            args_list.append(args)
+    if not args_list:
+        raise ValueError(f"参数清单为空: {path}")
+    return args_list
+
+
+def _parse_weights(items: List[str]) -> Dict[str, float]:
+    """解析NAME=WEIGHT形式的公平份额权重"""
+    weights = {}
+    for item in items:
+        name, sep, value = item.rpartition("=")
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = 0
+        if not sep or weight <= 0:
+            raise ValueError(f"无效的公平份额权重: {item}，应为NAME=WEIGHT且WEIGHT大于0")
+        weights[name] = weight
+    return weights
+
+
+def _parse_retry_on(value: Optional[str]) -> Optional[List[str]]:
+    """解析逗号分隔的重试失败类别"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 def cmd_status(args):
     """查看任务状态"""
     try:
@@ -108,6 +268,24 @@ def cmd_status(args):
         print(f"任务 {args.task_id} 状态: {task_status['status']}")
         if "message" in task_status:
             print(f"消息: {task_status['message']}")
+        usage = task_status.get("resource_usage")
+        if usage:
+            print(
+                f"资源用量: 墙钟 {usage.get('wall_seconds', 0):.1f}s, "
+                f"CPU 用户态 {usage.get('cpu_user_seconds', 0):.1f}s / "
+                f"内核态 {usage.get('cpu_system_seconds', 0):.1f}s, "
+                f"峰值内存 {usage.get('max_rss_mb', 0):.1f}MB"
+            )
+        if task_status.get("retry_at"):
+            print(f"下次尝试: {task_status['retry_at']}")
+        if task_status.get("attempt", 1) > 1:
+            print("尝试记录:")
+            for attempt in client.get_task_attempts(args.task_id):
+                failure = f" [{attempt['failure']}]" if attempt.get("failure") else ""
+                print(
+                    f"  #{attempt['attempt']} {attempt['status']}{failure}"
+                    f" - {attempt.get('message') or ''}"
+                )
     except Exception as e:
         print(f"查询失败: {e}", file=sys.stderr)
         sys.exit(1)
@@ -117,8 +295,20 @@ def cmd_log(args):
     """查看任务日志"""
     try:
         client = CubQueueClient(f"http://{args.host}:{args.port}")
-        log_content = client.get_task_log(args.task_id, args.lines)
-        print(log_content)
+        if args.follow:
+            for text in client.stream_log(args.task_id, args.offset, args.lines):
+                print(text, end="", flush=True)
+        elif args.offset is not None or args.attempt is not None:
+            window = client.read_task_log(
+                args.task_id, args.offset or 0, args.max_bytes, args.attempt
+            )
+            print(window["log"], end="")
+            print(f"\n[next offset: {window['next_offset']} / {window['size']}]")
+        else:
+            log_content = client.get_task_log(args.task_id, args.lines, args.line_offset)
+            print(log_content)
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"查询失败: {e}", file=sys.stderr)
         sys.exit(1)
@@ -141,6 +331,98 @@ def cmd_download(args):
         sys.exit(1)
 
 
+def cmd_queue(args):
+    """查看调度队列状态"""
+    try:
+        client = CubQueueClient(f"http://{args.host}:{args.port}")
+        stats = client.get_queue_stats()
+        print(f"运行中: {stats['running']}/{stats['max_concurrent_tasks']}")
+        print(f"排队中: {stats['queued']}")
+        print(f"最长等待: {stats['oldest_wait_seconds']:.1f}s")
+        print(f"平均等待: {stats['avg_wait_seconds']:.1f}s")
+        if stats.get('worker_queued'):
+            print(f"等待worker租用: {stats['worker_queued']}")
+        by_group = stats.get('queued_by_group') or {}
+        if len(by_group) > 1:
+            print("各分组排队数:")
+            for group, count in sorted(by_group.items(), key=lambda item: -item[1]):
+                print(f"  - {group or '(未指定)'}: {count}")
+        resources = stats.get('resources')
+        if resources:
+            print(
+                f"CPU: 已预留 {resources['reserved_cpus']:g}/{resources['total_cpus']:g}，"
+                f"空闲 {resources['idle_cpus']:.1f}"
+            )
+            print(
+                f"内存: 已预留 {resources['reserved_memory_mb']:.0f}/"
+                f"{resources['total_memory_mb']:.0f}MB，"
+                f"可用 {resources['available_memory_mb']:.0f}MB"
+            )
+    except Exception as e:
+        print(f"查询失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_stats(args):
+    """查看任务统计信息"""
+    try:
+        client = CubQueueClient(f"http://{args.host}:{args.port}")
+        stats = client.get_stats()
+        print(f"任务总数: {stats['total']}")
+        for status, count in sorted(stats['by_status'].items()):
+            print(f"  {status}: {count}")
+        if stats['by_script']:
+            print("按脚本:")
+            for name, counts in sorted(stats['by_script'].items()):
+                detail = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+                print(f"  - {name}: {detail}")
+        print("吞吐量:")
+        for window in stats['throughput']:
+            print(
+                f"  最近{window['window_seconds']}s: 结束 {window['finished']} 个 "
+                f"(完成 {window['completed']}, 失败 {window['failed']}, "
+                f"超时 {window.get('timeout', 0)}, 取消 {window['cancelled']}), "
+                f"{window['per_minute']:.2f}/min"
+            )
+        queue = stats['queue']
+        print(f"调度队列: 运行中 {queue['running']}/{queue['max_concurrent_tasks']}, 排队中 {queue['queued']}")
+        if queue.get('worker_queued'):
+            print(f"等待worker租用: {queue['worker_queued']}")
+    except Exception as e:
+        print(f"查询失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_worker(args):
+    """以远程worker身份从服务器租用并运行任务"""
+    try:
+        agent = WorkerAgent(args.server, slots=args.slots, work_dir=args.work_dir)
+        agent.run()
+    except Exception as e:
+        print(f"worker运行失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_sweep(args):
+    """查看或取消参数扫描"""
+    try:
+        client = CubQueueClient(f"http://{args.host}:{args.port}")
+        if args.cancel:
+            client.cancel_sweep(args.sweep_id)
+            print(f"参数扫描 {args.sweep_id} 已取消")
+            return
+        sweep = client.get_sweep(args.sweep_id)
+        print(f"参数扫描 {sweep['id']} ({sweep['script_name']}, {sweep['mode']}): {sweep['status']}")
+        print(f"已展开: {sweep['expanded']}/{sweep['total']}")
+        if sweep.get('message'):
+            print(f"消息: {sweep['message']}")
+        for status, count in sorted(sweep['counts'].items()):
+            print(f"  {status}: {count}")
+    except Exception as e:
+        print(f"查询失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def cmd_cancel(args):
     """取消任务"""
     try:
@@ -168,6 +450,23 @@ def create_parser():
     start_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
     start_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
     start_parser.add_argument('--daemon', action='store_true', help='以守护进程模式启动')
+    start_parser.add_argument('--max-concurrent-tasks', type=int, default=5, help='最大并发任务数')
+    start_parser.add_argument('--result-cache', action='store_true', help='启用结果缓存，相同脚本、参数与输入文件的任务直接复用已有结果')
+    start_parser.add_argument('--result-cache-ttl', type=int, default=7 * 24 * 3600, help='结果缓存有效期（秒，默认7天）')
+    start_parser.add_argument('--ray-address', help='Ray集群地址，默认自动发现或启动本地Ray')
+    start_parser.add_argument('--ray-shared-dir', action='store_true', help='Ray集群节点能以相同路径访问工作目录，任务直接在任务目录中运行')
+    start_parser.add_argument('--fair-share-by', choices=['script', 'submitter'], default='script',
+                              help='优先级相同的任务按脚本或提交者分组轮流启动（默认script）')
+    start_parser.add_argument('--fair-share-weight', action='append', metavar='NAME=WEIGHT',
+                              help='分组的公平份额权重（可多次使用），未指定的分组权重为1')
+    start_parser.add_argument('--cpus', type=float, help='可分配给任务的CPU数，默认为主机逻辑CPU数')
+    start_parser.add_argument('--memory', type=int, help='可分配给任务的内存（MB），默认为主机总内存减去保留量')
+    start_parser.add_argument('--memory-reserve', type=int, default=512, help='为系统保留、不分配给任务的内存（MB，默认512）')
+    start_parser.add_argument('--no-resource-admission', action='store_true', help='不按CPU与内存限制任务启动，只限制并发数')
+    start_parser.add_argument('--task-timeout', type=int, default=3600, help='脚本与任务未设置时的运行超时（秒，默认3600，0表示不限制）')
+    start_parser.add_argument('--max-attempts', type=int, default=1, help='脚本与任务未设置时每个任务最多尝试的次数（默认1，不重试）')
+    start_parser.add_argument('--retry-backoff', type=float, default=30, help='脚本与任务未设置时重试的基础退避间隔（秒，默认30，每次失败后翻倍）')
+    start_parser.add_argument('--no-cgroups', action='store_true', help='不为任务创建cgroup，只按进程组与子进程枚举终止任务')
     start_parser.set_defaults(func=cmd_start)
     
     # stop 命令
@@ -180,6 +479,19 @@ def create_parser():
     register_parser.add_argument('--script', required=True, help='脚本文件路径')
     register_parser.add_argument('--name', required=True, help='脚本名称')
     register_parser.add_argument('--desc', required=True, help='脚本描述')
+    register_parser.add_argument('--executor', choices=['subprocess', 'forkserver', 'ray', 'worker'],
+                                 help='执行后端：subprocess（默认，本机子进程）、forkserver（预热的常驻解释器）、'
+                                      'ray（Ray集群）或worker（由cubqueue worker租用执行）')
+    register_parser.add_argument('--preload',
+                                 help='fork-server预先导入的模块，逗号分隔（隐含--executor forkserver），如numpy,scipy')
+    register_parser.add_argument('--cpus', type=float, help='每个任务需要的CPU数（默认1）')
+    register_parser.add_argument('--memory', type=int, help='每个任务需要的内存（MB），服务器只在可用内存足够时启动任务')
+    register_parser.add_argument('--timeout', type=int, help='每个任务的运行超时（秒，0表示不限制），默认使用服务器的--task-timeout')
+    register_parser.add_argument('--cpu-time-limit', type=int, help='每个任务的CPU时间上限（秒，RLIMIT_CPU）')
+    register_parser.add_argument('--memory-limit', type=int, help='每个任务的地址空间上限（MB，RLIMIT_AS）')
+    register_parser.add_argument('--max-attempts', type=int, help='每个任务最多尝试的次数（包括第一次），默认使用服务器的--max-attempts')
+    register_parser.add_argument('--retry-backoff', type=float, help='重试的基础退避间隔（秒），每次失败后翻倍')
+    register_parser.add_argument('--retry-on', help='只重试的失败类别，逗号分隔：退出码（如1）、信号（如SIGKILL）、timeout或error，默认任何失败都重试')
     register_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
     register_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
     register_parser.set_defaults(func=cmd_register)
@@ -194,14 +506,38 @@ def create_parser():
     list_parser = subparsers.add_parser('list', help='查看任务列表')
     list_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
     list_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
+    list_parser.add_argument('--status', help='按状态过滤，多个状态以逗号分隔')
+    list_parser.add_argument('--script', help='按脚本名称过滤')
+    list_parser.add_argument('--sweep', help='按参数扫描ID过滤')
+    list_parser.add_argument('--since', help='创建时间下限（ISO 8601格式）')
+    list_parser.add_argument('--until', help='创建时间上限（ISO 8601格式）')
+    list_parser.add_argument('--query', help='按描述中包含的子串过滤')
+    list_parser.add_argument('--limit', type=int, default=100, help='每页数量（默认100）')
+    list_parser.add_argument('--cursor', help='分页游标，从上一页的输出中获取')
+    list_parser.add_argument('--all', action='store_true', help='列出所有符合条件的任务')
     list_parser.set_defaults(func=cmd_list)
     
     # submit 命令
     submit_parser = subparsers.add_parser('submit', help='提交任务')
     submit_parser.add_argument('--script', required=True, help='脚本名称')
-    submit_parser.add_argument('--arg-file', required=True, help='参数文件路径')
+    submit_input = submit_parser.add_mutually_exclusive_group(required=True)
+    submit_input.add_argument('--arg-file', help='参数文件路径')
+    submit_input.add_argument('--manifest', help='JSON Lines参数清单，每行一个任务的参数，批量提交')
+    submit_parser.add_argument('--sweep', help='扫描规格JSON文件，以--arg-file为模板在服务器端展开参数扫描')
+    submit_parser.add_argument('--no-cache', action='store_true', help='不复用结果缓存，总是重新运行任务')
+    submit_parser.add_argument('--sweep-mode', choices=['cartesian', 'zip'], default='cartesian', help='扫描模式（默认cartesian）')
     submit_parser.add_argument('--large-files', action='append', help='大文件路径（可多次使用）')
     submit_parser.add_argument('--desc', help='任务描述（可选）')
+    submit_parser.add_argument('--priority', type=int, default=0, help='优先级，数值越大越先启动（默认0）')
+    submit_parser.add_argument('--submitter', help='提交者名称，默认为当前用户名')
+    submit_parser.add_argument('--cpus', type=float, help='每个任务需要的CPU数，默认使用脚本注册时的声明')
+    submit_parser.add_argument('--memory', type=int, help='每个任务需要的内存（MB），默认使用脚本注册时的声明')
+    submit_parser.add_argument('--timeout', type=int, help='每个任务的运行超时（秒，0表示不限制），默认使用脚本的设置')
+    submit_parser.add_argument('--cpu-time-limit', type=int, help='每个任务的CPU时间上限（秒），默认使用脚本的设置')
+    submit_parser.add_argument('--memory-limit', type=int, help='每个任务的地址空间上限（MB），默认使用脚本的设置')
+    submit_parser.add_argument('--max-attempts', type=int, help='每个任务最多尝试的次数，默认使用脚本的设置')
+    submit_parser.add_argument('--retry-backoff', type=float, help='重试的基础退避间隔（秒），默认使用脚本的设置')
+    submit_parser.add_argument('--retry-on', help='只重试的失败类别（逗号分隔），默认使用脚本的设置')
     submit_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
     submit_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
     submit_parser.set_defaults(func=cmd_submit)
@@ -217,6 +553,11 @@ def create_parser():
     log_parser = subparsers.add_parser('log', help='查看任务日志')
     log_parser.add_argument('--task-id', required=True, help='任务ID')
     log_parser.add_argument('--lines', type=int, default=100, help='显示的日志行数')
+    log_parser.add_argument('--line-offset', type=int, default=0, help='跳过末尾的行数（向前翻页）')
+    log_parser.add_argument('--offset', type=int, help='按字节读取的起始偏移（负数表示相对末尾）')
+    log_parser.add_argument('--max-bytes', type=int, default=1024 * 1024, help='按字节读取的最大字节数')
+    log_parser.add_argument('--attempt', type=int, help='只查看第几次尝试的日志')
+    log_parser.add_argument('--follow', '-f', action='store_true', help='持续输出新增日志，直到任务结束')
     log_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
     log_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
     log_parser.set_defaults(func=cmd_log)
@@ -231,6 +572,33 @@ def create_parser():
     download_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
     download_parser.set_defaults(func=cmd_download)
     
+    # queue 命令
+    queue_parser = subparsers.add_parser('queue', help='查看调度队列状态')
+    queue_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
+    queue_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
+    queue_parser.set_defaults(func=cmd_queue)
+
+    # sweep 命令
+    sweep_parser = subparsers.add_parser('sweep', help='查看或取消参数扫描')
+    sweep_parser.add_argument('--sweep-id', required=True, help='参数扫描ID')
+    sweep_parser.add_argument('--cancel', action='store_true', help='取消参数扫描及其未结束的任务')
+    sweep_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
+    sweep_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
+    sweep_parser.set_defaults(func=cmd_sweep)
+
+    # stats 命令
+    stats_parser = subparsers.add_parser('stats', help='查看任务统计信息')
+    stats_parser.add_argument('--host', default='127.0.0.1', help='服务器主机地址')
+    stats_parser.add_argument('--port', type=int, default=8000, help='服务器端口')
+    stats_parser.set_defaults(func=cmd_stats)
+
+    # worker 命令
+    worker_parser = subparsers.add_parser('worker', help='作为远程worker租用并运行任务')
+    worker_parser.add_argument('--server', required=True, help='服务器URL，如http://10.0.0.1:8000')
+    worker_parser.add_argument('--slots', type=int, default=1, help='同时运行的最大任务数')
+    worker_parser.add_argument('--work-dir', help='文件缓存与任务目录，默认为~/.cubqueue-worker')
+    worker_parser.set_defaults(func=cmd_worker)
+    
     # cancel 命令
     cancel_parser = subparsers.add_parser('cancel', help='取消任务')
     cancel_parser.add_argument('--task-id', required=True, help='任务ID')
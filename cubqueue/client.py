@@ -1,34 +1,86 @@
 """CubQueue Python客户端库"""
 
 import requests
+import getpass
 import json
 import os
+import hashlib
+import time
 import zipfile
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from io import BytesIO
 
+# 计算文件摘要与下载文件时每次读写的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 单次长轮询请求的等待时间（秒）
+LONG_POLL_TIMEOUT = 60
+
+# 批量等待单次请求最多包含的任务数（与服务器限制一致）
+MAX_WAIT_TASKS = 10000
+
+# 任务的结束状态
+FINISHED_STATUSES = ("completed", "failed", "timeout", "cancelled")
+
 
 class CubQueueClient:
     """CubQueue客户端"""
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self, base_url: str = "http://localhost:8000", submitter: Optional[str] = None
+    ):
         """初始化客户端
 
         Args:
             base_url: CubQueue服务器地址
+            submitter: 提交者名称，用于服务器按提交者公平份额调度，默认为当前用户名
         """
         print("[init] >>>", base_url)
         self.base_url = base_url.rstrip("/")
         self.session = requests.Session()
+        if submitter is None:
+            try:
+                submitter = getpass.getuser()
+            except Exception:
+                submitter = None
+        self.submitter = submitter
 
-    def register(self, name: str, description: str, script_path: str) -> Dict[str, Any]:
+        # 本地文件摘要缓存：(路径, 大小, 修改时间) -> SHA-256
+        self._digest_cache: Dict[Tuple[str, int, int], str] = {}
+
+    def register(
+        self,
+        name: str,
+        description: str,
+        script_path: str,
+        executor: Optional[str] = None,
+        preload: Optional[List[str]] = None,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
         """注册脚本
 
         Args:
             name: 脚本名称
             description: 脚本描述
             script_path: 脚本文件路径
+            executor: 执行后端，subprocess（默认）、forkserver、ray或worker
+            preload: forkserver方式下预先导入的模块列表，如["numpy", "torch"]
+            cpus: 每个任务需要的CPU数
+            memory_mb: 每个任务需要的内存（MB）
+            timeout: 每个任务的运行超时（秒，0表示不限制），默认使用服务器配置
+            cpu_time_limit: 每个任务的CPU时间上限（秒）
+            memory_limit_mb: 每个任务的地址空间上限（MB）
+            max_attempts: 每个任务最多尝试的次数（包括第一次），默认使用服务器配置
+            retry_backoff: 重试的基础退避间隔（秒），每次失败后翻倍
+            retry_on: 只重试的失败类别，如["1", "SIGKILL", "timeout"]，默认任何失败都重试
 
         Returns:
             注册结果
@@ -44,6 +96,13 @@ class CubQueueClient:
         with open(script_path, "rb") as f:
             files = {"script": f}
             data = {"name": name, "desc": description}
+            if executor is not None:
+                data["executor"] = executor
+            if preload:
+                data["preload"] = ",".join(preload)
+            data.update(self._resource_fields(cpus, memory_mb))
+            data.update(self._limit_fields(timeout, cpu_time_limit, memory_limit_mb))
+            data.update(self._retry_fields(max_attempts, retry_backoff, retry_on))
 
             response = self.session.post(
                 f"{self.base_url}/api/script", data=data, files=files
@@ -68,14 +127,39 @@ class CubQueueClient:
         arg_file_path: str,
         large_files: Optional[List[str]] = None,
         description: Optional[str] = None,
+        negotiate: bool = True,
+        cache: bool = True,
+        priority: int = 0,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
     ) -> str:
         """提交任务
 
+        默认先计算大文件的SHA-256并询问服务器缺少哪些文件，只上传缺少的部分，
+        其余文件按摘要引用。服务器不支持该协议时退化为直接上传。
+
         Args:
             script_name: 脚本名称
             arg_file_path: 参数文件路径
             large_files: 大文件路径列表
             description: 任务描述（可选）
+            negotiate: 是否按摘要协商上传
+            cache: 服务器启用结果缓存时，是否允许直接复用相同任务的结果
+            priority: 优先级，数值越大越先启动（默认0）
+            cpus: 每个任务需要的CPU数，默认使用脚本注册时的声明
+            memory_mb: 每个任务需要的内存（MB），默认使用脚本注册时的声明
+            timeout: 每个任务的运行超时（秒，0表示不限制），默认使用脚本的设置
+            cpu_time_limit: 每个任务的CPU时间上限（秒），默认使用脚本的设置
+            memory_limit_mb: 每个任务的地址空间上限（MB），默认使用脚本的设置
+            max_attempts: 每个任务最多尝试的次数，默认使用脚本的设置
+            retry_backoff: 重试的基础退避间隔（秒），默认使用脚本的设置
+            retry_on: 只重试的失败类别，默认使用脚本的设置
 
         Returns:
             任务ID
@@ -88,19 +172,34 @@ class CubQueueClient:
         if not os.path.exists(arg_file_path):
             raise FileNotFoundError(f"参数文件不存在: {arg_file_path}")
 
+        large_files = large_files or []
+        for file_path in large_files:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+
         data = {"script_name": script_name}
         if description:
             data["description"] = description
+        if not cache:
+            data["cache"] = "false"
+        data.update(self._scheduling_fields(priority))
+        data.update(self._resource_fields(cpus, memory_mb))
+        data.update(self._limit_fields(timeout, cpu_time_limit, memory_limit_mb))
+        data.update(self._retry_fields(max_attempts, retry_backoff, retry_on))
+
+        file_refs = None
+        if negotiate and large_files:
+            file_refs = self._upload_missing_files(large_files)
         files = []
 
         # 添加参数文件
         files.append(("arg_file", open(arg_file_path, "rb")))
 
-        # 添加大文件
-        if large_files:
+        if file_refs is not None:
+            data["file_refs"] = json.dumps(file_refs)
+        else:
+            # 添加大文件
             for file_path in large_files:
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError(f"文件不存在: {file_path}")
                 files.append(("files", open(file_path, "rb")))
 
         try:
@@ -115,16 +214,421 @@ class CubQueueClient:
                 if hasattr(file_obj, 'close'):
                     file_obj.close()
 
-    def list_tasks(self) -> List[Dict[str, Any]]:
-        """获取任务列表
+    def submit_many(
+        self,
+        script_name: str,
+        args_list: List[Dict[str, Any]],
+        large_files: Optional[List[str]] = None,
+        description: Optional[str] = None,
+        negotiate: bool = True,
+        cache: bool = True,
+        priority: int = 0,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
+    ) -> List[str]:
+        """在一次请求中批量提交任务
+
+        所有任务使用同一个脚本并共享large_files（参数中以<file1>、<file2>等引用），
+        服务器在同一个事务中创建全部任务。
+
+        Args:
+            script_name: 脚本名称
+            args_list: 每个任务的参数对象
+            large_files: 共享的大文件路径列表
+            description: 任务描述（可选，所有任务共用）
+            negotiate: 是否按摘要协商上传
+            cache: 服务器启用结果缓存时，是否允许直接复用相同任务的结果
+            priority: 优先级，数值越大越先启动（默认0）
+            cpus: 每个任务需要的CPU数，默认使用脚本注册时的声明
+            memory_mb: 每个任务需要的内存（MB），默认使用脚本注册时的声明
+            timeout: 每个任务的运行超时（秒，0表示不限制），默认使用脚本的设置
+            cpu_time_limit: 每个任务的CPU时间上限（秒），默认使用脚本的设置
+            memory_limit_mb: 每个任务的地址空间上限（MB），默认使用脚本的设置
+            max_attempts: 每个任务最多尝试的次数，默认使用脚本的设置
+            retry_backoff: 重试的基础退避间隔（秒），默认使用脚本的设置
+            retry_on: 只重试的失败类别，默认使用脚本的设置
+
+        Returns:
+            按args_list顺序排列的任务ID列表
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            requests.RequestException: 网络请求错误
+        """
+        print("[submit_many] >>>", script_name, len(args_list), large_files)
+        large_files = large_files or []
+        for file_path in large_files:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        manifest = "".join(
+            json.dumps(args, ensure_ascii=False) + "\n" for args in args_list
+        ).encode("utf-8")
+
+        data = {"script_name": script_name}
+        if description:
+            data["description"] = description
+        if not cache:
+            data["cache"] = "false"
+        data.update(self._scheduling_fields(priority))
+        data.update(self._resource_fields(cpus, memory_mb))
+        data.update(self._limit_fields(timeout, cpu_time_limit, memory_limit_mb))
+        data.update(self._retry_fields(max_attempts, retry_backoff, retry_on))
+
+        file_refs = None
+        if negotiate and large_files:
+            file_refs = self._upload_missing_files(large_files)
+        files = [("manifest", ("manifest.jsonl", manifest))]
+
+        if file_refs is not None:
+            data["file_refs"] = json.dumps(file_refs)
+        else:
+            for file_path in large_files:
+                files.append(("files", open(file_path, "rb")))
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/task/batch", data=data, files=files
+            )
+            response.raise_for_status()
+            return response.json()["task_ids"]
+        finally:
+            for _, file_obj in files:
+                if hasattr(file_obj, 'close'):
+                    file_obj.close()
+
+    def submit_sweep(
+        self,
+        script_name: str,
+        arg_file_path: str,
+        sweep: Dict[str, Any],
+        mode: str = "cartesian",
+        large_files: Optional[List[str]] = None,
+        description: Optional[str] = None,
+        negotiate: bool = True,
+        priority: int = 0,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """提交参数扫描，由服务器按模板与扫描规格逐批展开为任务
+
+        Args:
+            script_name: 脚本名称
+            arg_file_path: 参数模板文件路径
+            sweep: 扫描规格，参数路径（以点号分隔嵌套的键）-> 取值列表或
+                {"range": [start, stop, step]}，例如
+                {"temperature": [280, 300, 320], "seed": {"range": [100]}}
+            mode: cartesian（笛卡尔积）或zip（按下标逐一配对）
+            large_files: 共享的大文件路径列表
+            description: 任务描述（可选，所有任务共用）
+            negotiate: 是否按摘要协商上传
+            priority: 展开任务的优先级（默认0）
+            cpus: 每个任务需要的CPU数，默认使用脚本注册时的声明
+            memory_mb: 每个任务需要的内存（MB），默认使用脚本注册时的声明
+            timeout: 每个任务的运行超时（秒，0表示不限制），默认使用脚本的设置
+            cpu_time_limit: 每个任务的CPU时间上限（秒），默认使用脚本的设置
+            memory_limit_mb: 每个任务的地址空间上限（MB），默认使用脚本的设置
+            max_attempts: 每个任务最多尝试的次数，默认使用脚本的设置
+            retry_backoff: 重试的基础退避间隔（秒），默认使用脚本的设置
+            retry_on: 只重试的失败类别，默认使用脚本的设置
+
+        Returns:
+            参数扫描信息，包含id与total
+        """
+        print("[submit_sweep] >>>", script_name, arg_file_path, mode)
+        if not os.path.exists(arg_file_path):
+            raise FileNotFoundError(f"参数文件不存在: {arg_file_path}")
+        large_files = large_files or []
+        for file_path in large_files:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        data = {"script_name": script_name, "sweep": json.dumps(sweep), "mode": mode}
+        if description:
+            data["description"] = description
+        data.update(self._scheduling_fields(priority))
+        data.update(self._resource_fields(cpus, memory_mb))
+        data.update(self._limit_fields(timeout, cpu_time_limit, memory_limit_mb))
+        data.update(self._retry_fields(max_attempts, retry_backoff, retry_on))
+
+        file_refs = None
+        if negotiate and large_files:
+            file_refs = self._upload_missing_files(large_files)
+        files = [("arg_file", open(arg_file_path, "rb"))]
+
+        if file_refs is not None:
+            data["file_refs"] = json.dumps(file_refs)
+        else:
+            for file_path in large_files:
+                files.append(("files", open(file_path, "rb")))
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/sweep", data=data, files=files
+            )
+            response.raise_for_status()
+            return response.json()
+        finally:
+            for _, file_obj in files:
+                if hasattr(file_obj, 'close'):
+                    file_obj.close()
+
+    def get_sweep(self, sweep_id: str) -> Dict[str, Any]:
+        """获取参数扫描的展开进度与任务状态统计
+
+        Args:
+            sweep_id: 参数扫描ID
+
+        Returns:
+            参数扫描信息
+        """
+        print("[get_sweep] >>>", sweep_id)
+        response = self.session.get(f"{self.base_url}/api/sweep/{sweep_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_sweep(self, sweep_id: str) -> Dict[str, Any]:
+        """取消参数扫描及其未结束的任务
+
+        Args:
+            sweep_id: 参数扫描ID
+
+        Returns:
+            取消结果
+        """
+        print("[cancel_sweep] >>>", sweep_id)
+        response = self.session.delete(f"{self.base_url}/api/sweep/{sweep_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def upload_file(self, file_path: str, digest: Optional[str] = None) -> str:
+        """按摘要上传文件到服务器的共享存储
+
+        Args:
+            file_path: 文件路径
+            digest: 文件SHA-256摘要，为None时自动计算
+
+        Returns:
+            文件SHA-256摘要
+        """
+        print("[upload_file] >>>", file_path)
+        digest = digest or self._file_digest(file_path)
+        with open(file_path, "rb") as f:
+            # 以文件对象作为请求体，requests会分块流式发送
+            response = self.session.put(f"{self.base_url}/api/blob/{digest}", data=f)
+        response.raise_for_status()
+        return digest
+
+    def _scheduling_fields(self, priority: int) -> Dict[str, str]:
+        """提交请求中的优先级与提交者字段"""
+        fields = {}
+        if priority:
+            fields["priority"] = str(int(priority))
+        if self.submitter:
+            fields["submitter"] = self.submitter
+        return fields
+
+    @staticmethod
+    def _resource_fields(
+        cpus: Optional[float], memory_mb: Optional[int]
+    ) -> Dict[str, str]:
+        """请求中声明资源需求的字段"""
+        fields = {}
+        if cpus is not None:
+            fields["cpus"] = str(cpus)
+        if memory_mb is not None:
+            fields["memory_mb"] = str(int(memory_mb))
+        return fields
+
+    @staticmethod
+    def _limit_fields(
+        timeout: Optional[int],
+        cpu_time_limit: Optional[int],
+        memory_limit_mb: Optional[int],
+    ) -> Dict[str, str]:
+        """请求中设置运行限制的字段"""
+        fields = {}
+        for name, value in (
+            ("timeout", timeout),
+            ("cpu_time_limit", cpu_time_limit),
+            ("memory_limit_mb", memory_limit_mb),
+        ):
+            if value is not None:
+                fields[name] = str(int(value))
+        return fields
+
+    @staticmethod
+    def _retry_fields(
+        max_attempts: Optional[int],
+        retry_backoff: Optional[float],
+        retry_on: Optional[List[str]],
+    ) -> Dict[str, str]:
+        """请求中设置重试策略的字段"""
+        fields = {}
+        if max_attempts is not None:
+            fields["max_attempts"] = str(int(max_attempts))
+        if retry_backoff is not None:
+            fields["retry_backoff"] = str(retry_backoff)
+        if retry_on:
+            if not isinstance(retry_on, str):
+                retry_on = ",".join(str(item) for item in retry_on)
+            fields["retry_on"] = retry_on
+        return fields
+
+    def _upload_missing_files(
+        self, file_paths: List[str]
+    ) -> Optional[List[Dict[str, str]]]:
+        """上传服务器上缺少的文件，并返回按摘要引用的文件列表
+
+        Args:
+            file_paths: 文件路径列表
+
+        Returns:
+            文件引用列表；服务器不支持按摘要上传时返回None
+        """
+        digests = [self._file_digest(file_path) for file_path in file_paths]
+
+        response = self.session.post(
+            f"{self.base_url}/api/blob/missing", json={"digests": digests}
+        )
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+        missing = set(response.json()["missing"])
+
+        for file_path, digest in zip(file_paths, digests):
+            if digest in missing:
+                self.upload_file(file_path, digest)
+                missing.discard(digest)
+
+        return [
+            {"digest": digest, "filename": os.path.basename(file_path)}
+            for file_path, digest in zip(file_paths, digests)
+        ]
+
+    def _file_digest(self, file_path: str) -> str:
+        """计算文件SHA-256摘要（按路径、大小与修改时间缓存）"""
+        st = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+        digest = self._digest_cache.get(key)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+            self._digest_cache[key] = digest
+        return digest
+
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        script: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        query: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sweep: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """获取一页任务列表（按创建时间从新到旧）
+
+        Args:
+            status: 任务状态，多个状态以逗号分隔
+            script: 脚本名称
+            since: 创建时间下限（ISO 8601格式）
+            until: 创建时间上限（ISO 8601格式）
+            query: 描述中包含的子串
+            limit: 每页数量
+            cursor: 分页游标，为None时从最新的任务开始
+            sweep: 参数扫描ID
 
         Returns:
             任务列表
         """
         print("[list_tasks] >>>")
-        response = self.session.get(f"{self.base_url}/api/task")
+        return self.get_task_page(
+            status, script, since, until, query, limit, cursor, sweep=sweep
+        )["tasks"]
+
+    def get_task_page(
+        self,
+        status: Optional[str] = None,
+        script: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        query: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sweep: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """获取一页任务列表及下一页的游标
+
+        参数同list_tasks。
+
+        Returns:
+            包含tasks与next_cursor的字典，没有更多数据时next_cursor为None
+        """
+        params = {
+            "status": status,
+            "script": script,
+            "since": since,
+            "until": until,
+            "q": query,
+            "limit": limit,
+            "cursor": cursor,
+            "sweep": sweep,
+        }
+        response = self.session.get(
+            f"{self.base_url}/api/task",
+            params={k: v for k, v in params.items() if v is not None},
+        )
         response.raise_for_status()
-        return response.json()
+        return {
+            "tasks": response.json(),
+            "next_cursor": response.headers.get("X-Next-Cursor"),
+        }
+
+    def iter_tasks(
+        self,
+        status: Optional[str] = None,
+        script: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        query: Optional[str] = None,
+        page_size: int = 500,
+        sweep: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """逐页遍历所有符合条件的任务
+
+        Args:
+            page_size: 每页数量，其余参数同list_tasks
+
+        Yields:
+            任务信息
+        """
+        print("[iter_tasks] >>>")
+        cursor = None
+        while True:
+            page = self.get_task_page(
+                status, script, since, until, query, page_size, cursor, sweep=sweep
+            )
+            yield from page["tasks"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return
 
     def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """获取任务状态
@@ -140,23 +644,141 @@ class CubQueueClient:
         response.raise_for_status()
         return response.json()
 
-    def get_task_log(self, task_id: str, lines: int = 100) -> str:
+    def get_task_attempts(self, task_id: str) -> List[Dict[str, Any]]:
+        """获取任务的各次尝试
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            按序号排列的尝试记录，包含状态、失败类别与日志段的字节范围
+        """
+        print("[get_task_attempts] >>>", task_id)
+        response = self.session.get(f"{self.base_url}/api/task/{task_id}/attempts")
+        response.raise_for_status()
+        return response.json()
+
+    def get_task_log(
+        self, task_id: str, lines: int = 100, line_offset: int = 0
+    ) -> str:
         """获取任务日志
 
         Args:
             task_id: 任务ID
             lines: 日志行数
+            line_offset: 跳过末尾的行数，用于向前翻页
 
         Returns:
             日志内容
         """
-        print("[get_task_log] >>>", task_id, lines)
+        print("[get_task_log] >>>", task_id, lines, line_offset)
         response = self.session.get(
-            f"{self.base_url}/api/task/{task_id}/log", params={"lines": lines}
+            f"{self.base_url}/api/task/{task_id}/log",
+            params={"lines": lines, "line_offset": line_offset},
         )
         response.raise_for_status()
         return response.json()["log"]
 
+    def read_task_log(
+        self,
+        task_id: str,
+        offset: int = 0,
+        max_bytes: int = 1024 * 1024,
+        attempt: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """按字节窗口读取任务日志
+
+        Args:
+            task_id: 任务ID
+            offset: 起始字节偏移，负数表示相对文件末尾
+            max_bytes: 最多读取的字节数
+            attempt: 只读取第几次尝试的日志段，偏移仍是日志文件中的位置，
+                小于日志段起点时从起点开始
+
+        Returns:
+            日志窗口，包含log、offset、next_offset与size
+        """
+        print("[read_task_log] >>>", task_id, offset, max_bytes)
+        params = {"offset": offset, "max_bytes": max_bytes}
+        if attempt is not None:
+            params["attempt"] = attempt
+        response = self.session.get(
+            f"{self.base_url}/api/task/{task_id}/log", params=params
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stream_log(
+        self, task_id: str, offset: Optional[int] = None, lines: int = 0
+    ) -> Iterator[str]:
+        """持续获取任务日志的新增内容，直到任务结束
+
+        连接中断时从最后收到的位置自动续传。
+
+        Args:
+            task_id: 任务ID
+            offset: 起始字节偏移，负数表示相对文件末尾
+            lines: 未指定offset时，从最后lines行开始
+
+        Yields:
+            新增的日志文本
+        """
+        print("[stream_log] >>>", task_id, offset, lines)
+        params = {"lines": lines}
+        if offset is not None:
+            params["offset"] = offset
+        headers = {}
+        retries = 0
+
+        while True:
+            try:
+                with self.session.get(
+                    f"{self.base_url}/api/task/{task_id}/log/stream",
+                    params=params,
+                    headers=headers,
+                    stream=True,
+                    timeout=(10, 60),
+                ) as response:
+                    response.raise_for_status()
+                    for event, data in self._iter_sse(response):
+                        retries = 0
+                        if event == "end":
+                            return
+                        if event == "log":
+                            payload = json.loads(data)
+                            headers["Last-Event-ID"] = str(payload["next_offset"])
+                            yield payload["log"]
+                # 服务器未发送end事件就关闭了连接，续传
+            except (requests.ConnectionError, requests.Timeout):
+                retries += 1
+                if retries > 5:
+                    raise
+                time.sleep(min(2 ** retries, 10))
+
+    @staticmethod
+    def _iter_sse(response: requests.Response) -> Iterator[Tuple[str, str]]:
+        """解析Server-Sent Events响应
+
+        Yields:
+            (事件类型, 数据)
+        """
+        event = "message"
+        data_lines = []
+        for line in response.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line == "":
+                if data_lines:
+                    yield event, "\n".join(data_lines)
+                event = "message"
+                data_lines = []
+            elif line.startswith(":"):
+                continue
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].lstrip())
+
     def download_task_metadata(self, task_id: str, output_dir: str) -> str:
         """下载任务中间文件
 
@@ -168,17 +790,13 @@ class CubQueueClient:
             下载的文件路径
         """
         print("[download_task_metadata] >>>", task_id, output_dir)
-        response = self.session.get(f"{self.base_url}/api/task/{task_id}/metadata")
-        response.raise_for_status()
-
         # 创建输出目录
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        # 保存并解压文件
+        # 流式保存并解压文件
         zip_path = output_path / f"{task_id}_metadata.zip"
-        with open(zip_path, "wb") as f:
-            f.write(response.content)
+        self._download_to_file(f"/api/task/{task_id}/metadata", zip_path)
 
         # 解压文件
         extract_path = output_path / f"{task_id}_metadata"
@@ -201,17 +819,13 @@ class CubQueueClient:
             下载的文件路径
         """
         print("[download_task_result] >>>", task_id, output_dir)
-        response = self.session.get(f"{self.base_url}/api/task/{task_id}/result")
-        response.raise_for_status()
-
         # 创建输出目录
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        # 保存并解压文件
+        # 流式保存并解压文件
         zip_path = output_path / f"{task_id}_result.zip"
-        with open(zip_path, "wb") as f:
-            f.write(response.content)
+        self._download_to_file(f"/api/task/{task_id}/result", zip_path)
 
         # 解压文件
         extract_path = output_path / f"{task_id}_result"
@@ -223,6 +837,41 @@ class CubQueueClient:
 
         return str(extract_path)
 
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """获取调度队列状态
+
+        Returns:
+            队列深度、运行数与等待时间统计
+        """
+        print("[get_queue_stats] >>>")
+        response = self.session.get(f"{self.base_url}/api/queue")
+        response.raise_for_status()
+        return response.json()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取任务统计信息
+
+        Returns:
+            各状态、各脚本的任务数、最近时间窗口内的吞吐量与调度队列状态
+        """
+        print("[get_stats] >>>")
+        response = self.session.get(f"{self.base_url}/api/stats")
+        response.raise_for_status()
+        return response.json()
+
+    def _download_to_file(self, path: str, dest: Path):
+        """分块下载响应内容到文件，不在内存中保留完整内容
+
+        Args:
+            path: API路径
+            dest: 目标文件路径
+        """
+        with self.session.get(f"{self.base_url}{path}", stream=True) as response:
+            response.raise_for_status()
+            with open(dest, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+
     def cancel_task(self, task_id: str) -> Dict[str, Any]:
         """取消任务
 
@@ -242,10 +891,13 @@ class CubQueueClient:
     ) -> Dict[str, Any]:
         """等待任务完成
 
+        通过服务器端的长轮询接口等待，任务结束时立即返回；
+        服务器不支持该接口时退化为每隔check_interval秒查询一次状态。
+
         Args:
             task_id: 任务ID
             timeout: 超时时间（秒）
-            check_interval: 检查间隔（秒）
+            check_interval: 退化为轮询时的检查间隔（秒）
 
         Returns:
             最终任务状态
@@ -254,19 +906,165 @@ class CubQueueClient:
             TimeoutError: 超时
         """
         print("[wait_for_task] >>>", task_id, timeout, check_interval)
-        import time
+        deadline = time.time() + timeout
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            poll_timeout = min(remaining, LONG_POLL_TIMEOUT)
+            response = self.session.get(
+                f"{self.base_url}/api/task/{task_id}/wait",
+                params={"timeout": poll_timeout},
+                timeout=poll_timeout + 30,
+            )
+            if response.status_code in (404, 405) and not self._is_api_error(response):
+                # 旧版本服务器没有长轮询接口
+                return self._poll_task(task_id, deadline, check_interval)
+            response.raise_for_status()
+            status = response.json()
+            if status["status"] in FINISHED_STATUSES:
+                return status
+
+        raise TimeoutError(f"任务 {task_id} 在 {timeout} 秒内未完成")
+
+    def wait_tasks(
+        self, task_ids: List[str], mode: str = "any", timeout: float = LONG_POLL_TIMEOUT
+    ) -> Dict[str, Any]:
+        """在一次请求中等待多个任务（长轮询）
 
-        start_time = time.time()
+        Args:
+            task_ids: 任务ID列表，单次最多MAX_WAIT_TASKS个
+            mode: any表示任一任务结束即返回，all表示全部任务结束才返回
+            timeout: 本次请求的最长等待时间（秒），不超过300
+
+        Returns:
+            包含finished（已结束任务的状态）、pending与missing（不存在的任务ID）的字典
+        """
+        response = self.session.post(
+            f"{self.base_url}/api/task/wait",
+            json={"task_ids": list(task_ids), "mode": mode, "timeout": timeout},
+            timeout=timeout + 30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def as_completed(
+        self, task_ids: List[str], timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """按结束顺序逐个产出任务的最终状态，类似concurrent.futures.as_completed
+
+        所有任务通过同一个连接上的批量长轮询等待，而不是逐个查询。
+
+        Args:
+            task_ids: 任务ID列表
+            timeout: 总超时时间（秒），None表示不限制
+
+        Yields:
+            已结束任务的最终状态
+
+        Raises:
+            ValueError: 存在不存在的任务
+            TimeoutError: 超时仍有任务未结束
+        """
+        print("[as_completed] >>>", len(task_ids), timeout)
+        deadline = None if timeout is None else time.time() + timeout
+        pending = list(dict.fromkeys(task_ids))
 
-        while time.time() - start_time < timeout:
+        while pending:
+            poll_timeout = LONG_POLL_TIMEOUT
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"仍有 {len(pending)} 个任务在 {timeout} 秒内未完成")
+                poll_timeout = min(poll_timeout, remaining)
+
+            result = self.wait_tasks(pending[:MAX_WAIT_TASKS], "any", poll_timeout)
+            if result["missing"]:
+                raise ValueError(f"任务不存在: {', '.join(result['missing'])}")
+
+            finished_ids = set()
+            for status in result["finished"]:
+                finished_ids.add(status["id"])
+                yield status
+            pending = [task_id for task_id in pending if task_id not in finished_ids]
+
+    def wait_for_any(
+        self, task_ids: List[str], timeout: float = 3600
+    ) -> List[Dict[str, Any]]:
+        """等待任一任务结束
+
+        Args:
+            task_ids: 任务ID列表
+            timeout: 超时时间（秒）
+
+        Returns:
+            已结束任务的最终状态（至少一个）
+
+        Raises:
+            ValueError: 存在不存在的任务
+            TimeoutError: 超时
+        """
+        print("[wait_for_any] >>>", len(task_ids), timeout)
+        deadline = time.time() + timeout
+        task_ids = list(dict.fromkeys(task_ids))
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError(f"{len(task_ids)} 个任务在 {timeout} 秒内均未完成")
+            result = self.wait_tasks(
+                task_ids[:MAX_WAIT_TASKS], "any", min(remaining, LONG_POLL_TIMEOUT)
+            )
+            if result["missing"]:
+                raise ValueError(f"任务不存在: {', '.join(result['missing'])}")
+            if result["finished"]:
+                return result["finished"]
+
+    def wait_for_all(
+        self, task_ids: List[str], timeout: float = 3600
+    ) -> List[Dict[str, Any]]:
+        """等待所有任务结束
+
+        Args:
+            task_ids: 任务ID列表
+            timeout: 超时时间（秒）
+
+        Returns:
+            按task_ids顺序排列的最终任务状态
+
+        Raises:
+            ValueError: 存在不存在的任务
+            TimeoutError: 超时
+        """
+        print("[wait_for_all] >>>", len(task_ids), timeout)
+        statuses = {
+            status["id"]: status for status in self.as_completed(task_ids, timeout)
+        }
+        return [statuses[task_id] for task_id in task_ids]
+
+    def _poll_task(
+        self, task_id: str, deadline: float, check_interval: float
+    ) -> Dict[str, Any]:
+        """定期查询任务状态直到任务结束或超过截止时间"""
+        while time.time() < deadline:
             status = self.get_task_status(task_id)
 
-            if status["status"] in ["completed", "failed", "cancelled"]:
+            if status["status"] in FINISHED_STATUSES:
                 return status
 
             time.sleep(check_interval)
 
-        raise TimeoutError(f"任务 {task_id} 在 {timeout} 秒内未完成")
+        raise TimeoutError(f"任务 {task_id} 未在截止时间前完成")
+
+    @staticmethod
+    def _is_api_error(response: requests.Response) -> bool:
+        """判断404/405是否由接口本身返回（而不是接口不存在）"""
+        try:
+            detail = response.json().get("detail")
+        except ValueError:
+            return False
+        return detail not in ("Not Found", "Method Not Allowed")
 
     def health_check(self) -> bool:
         """健康检查
@@ -3,8 +3,8 @@
 包含数据库模型、任务管理、文件管理等核心功能。
 """
 
-from .models import Script, Task
+from .models import Script, Sweep, Task, TaskAttempt
 from .task_manager import TaskManager
 from .file_manager import FileManager
 
-__all__ = ["Script", "Task", "TaskManager", "FileManager"]
+__all__ = ["Script", "Sweep", "Task", "TaskAttempt", "TaskManager", "FileManager"]
@@ -0,0 +1,273 @@
+"""CubQueue流式压缩包生成"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Set, Tuple
+
+# 读取源文件时每次读取的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# build等待其他请求构建同一压缩包的最长时间（秒），超时后自行构建
+BUILD_WAIT_TIMEOUT = 300
+
+
+class _StreamBuffer:
+    """只写、不可定位的缓冲区
+
+    zipfile在不可定位的输出上会为每个条目写入数据描述符，
+    从而可以边压缩边把已生成的字节交给调用方。
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """取出并清空已写入的数据"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_directory(
+    directory: Path,
+    compression: int = zipfile.ZIP_DEFLATED,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """边生成边输出目录的zip压缩包
+
+    不生成临时压缩包，内存占用只与块大小相关。
+
+    Args:
+        directory: 要打包的目录
+        compression: 压缩方式
+        chunk_size: 块大小（字节）
+
+    Yields:
+        压缩包数据块
+    """
+    directory = Path(directory)
+    buffer = _StreamBuffer()
+
+    with zipfile.ZipFile(buffer, "w", compression) as zipf:
+        for file_path in sorted(directory.rglob("*")):
+            if not file_path.is_file():
+                continue
+
+            zinfo = zipfile.ZipInfo.from_file(
+                file_path, file_path.relative_to(directory).as_posix()
+            )
+            zinfo.compress_type = compression
+
+            with open(file_path, "rb") as src, zipf.open(zinfo, "w") as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+    # 中央目录在关闭时写入
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+def directory_fingerprint(directory: Path) -> str:
+    """计算目录内容指纹
+
+    指纹由所有文件的相对路径、大小与修改时间决定，不读取文件内容。
+
+    Args:
+        directory: 目录路径
+
+    Returns:
+        SHA-256十六进制指纹
+    """
+    directory = Path(directory)
+    sha256 = hashlib.sha256()
+    for file_path in sorted(directory.rglob("*")):
+        if not file_path.is_file():
+            continue
+        st = file_path.stat()
+        relpath = file_path.relative_to(directory).as_posix()
+        sha256.update(f"{relpath}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return sha256.hexdigest()
+
+
+class ArchiveCache:
+    """按目录指纹缓存已生成的压缩包
+
+    同一任务目录内容未变化时直接返回之前生成的压缩包；缓存总大小超过上限时
+    按最近最少使用的顺序淘汰。同一压缩包同时只有一个请求负责构建，
+    构建期间的其他请求直接流式生成而不写入缓存。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._building: Set[str] = set()
+
+        # 缓存条目：文件名 -> 大小，按最近使用时间从旧到新排列
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+
+        # 清理中断的构建留下的临时文件，并按修改时间恢复LRU顺序
+        for part_path in self.cache_dir.glob("*.part"):
+            part_path.unlink()
+        existing = self.cache_dir.glob("*.zip")
+        for zip_path in sorted(existing, key=lambda p: p.stat().st_mtime):
+            size = zip_path.stat().st_size
+            self._entries[zip_path.name] = size
+            self._total_bytes += size
+
+    def stream(self, name: str, directory: Path) -> Iterator[bytes]:
+        """获取目录压缩包的数据流，命中缓存时直接读取缓存文件
+
+        Args:
+            name: 压缩包名称（同一名称下只保留最新指纹的缓存）
+            directory: 要打包的目录
+
+        Returns:
+            压缩包数据块迭代器
+        """
+        # 在生成器内部才登记为构建者：迭代器未开始就被丢弃（例如客户端在
+        # 第一个数据块之前断开）时不会留下永远不会释放的构建标记
+        filename, state, cached = self._acquire(name, directory, open_cached=True)
+        if state == "cached":
+            yield from _iter_file(cached)
+        elif state == "building":
+            yield from iter_zip_directory(directory)
+        else:
+            yield from self._build(name, filename, directory)
+
+    def build(self, name: str, directory: Path) -> Path:
+        """确保目录压缩包已生成并返回缓存文件路径
+
+        Args:
+            name: 压缩包名称
+            directory: 要打包的目录
+
+        Returns:
+            压缩包路径
+        """
+        deadline = time.monotonic() + BUILD_WAIT_TIMEOUT
+        while True:
+            filename, state, _ = self._acquire(name, directory)
+            if state == "cached":
+                return self.cache_dir / filename
+            if state == "acquired" or time.monotonic() >= deadline:
+                # 等待超时时不登记为构建者，写入独立的临时文件后同样原子地提交
+                for _ in self._build(name, filename, directory, state == "acquired"):
+                    pass
+                return self.cache_dir / filename
+            # 另一个请求正在构建，等待其完成后复用
+            time.sleep(0.1)
+
+    def _acquire(
+        self, name: str, directory: Path, open_cached: bool = False
+    ) -> Tuple[str, str, Optional[BinaryIO]]:
+        """查找缓存，未命中且无人构建时登记为构建者
+
+        open_cached为真时在锁内打开命中的缓存文件，之后即使该条目被淘汰删除，
+        已打开的文件仍可完整读出。
+
+        Returns:
+            (缓存文件名, 状态, 打开的缓存文件)，状态为cached、building或acquired之一，
+            未命中或open_cached为假时文件为None
+        """
+        filename = f"{name}_{directory_fingerprint(directory)[:16]}.zip"
+        zip_path = self.cache_dir / filename
+
+        with self._lock:
+            if filename in self._entries and zip_path.exists():
+                self._entries.move_to_end(filename)
+                os.utime(zip_path)
+                return filename, "cached", open(zip_path, "rb") if open_cached else None
+            if filename in self._building:
+                return filename, "building", None
+            self._building.add(filename)
+            return filename, "acquired", None
+
+    def _build(
+        self, name: str, filename: str, directory: Path, owner: bool = True
+    ) -> Iterator[bytes]:
+        """边输出边写入缓存文件，完成后原子地提交
+
+        owner为真时调用方已通过_acquire登记为构建者，结束时（包括迭代器被关闭）释放登记。
+        """
+        part_path = self.cache_dir / f"{filename}.{uuid.uuid4().hex}.part"
+        try:
+            with open(part_path, "wb") as f:
+                for chunk in iter_zip_directory(directory):
+                    f.write(chunk)
+                    yield chunk
+            os.replace(part_path, self.cache_dir / filename)
+            self._add_entry(name, filename)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+            if owner:
+                with self._lock:
+                    self._building.discard(filename)
+
+    def _add_entry(self, name: str, filename: str):
+        """登记新生成的缓存文件，删除同名旧版本并按LRU淘汰"""
+        size = (self.cache_dir / filename).stat().st_size
+        with self._lock:
+            for old in [
+                key
+                for key in self._entries
+                if key.startswith(f"{name}_") and key != filename
+            ]:
+                self._remove_entry(old)
+            self._total_bytes += size - self._entries.pop(filename, 0)
+            self._entries[filename] = size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove_entry(next(iter(self._entries)))
+
+    def _remove_entry(self, filename: str):
+        """删除缓存条目（调用方需持有锁）"""
+        self._total_bytes -= self._entries.pop(filename)
+        try:
+            (self.cache_dir / filename).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """分块读取已打开的文件，结束后关闭"""
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
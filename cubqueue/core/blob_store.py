@@ -0,0 +1,270 @@
+"""CubQueue内容寻址文件存储"""
+
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Tuple
+
+# 流式写入时每次读写的块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """按SHA-256寻址的去重文件存储
+
+    每个不同内容的文件只在blobs/<前两位>/<digest>保存一份，任务目录中的
+    files/<uuid>通过硬链接引用它。blob的链接数减一即为引用计数，
+    任务目录被删除后引用自动释放，垃圾回收只需删除链接数为1的blob。
+    """
+
+    def __init__(self, base_dir: Path):
+        """初始化文件存储
+
+        Args:
+            base_dir: 工作目录
+        """
+        self.blobs_dir = Path(base_dir) / "blobs"
+        self.tmp_dir = self.blobs_dir / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        # 保护blob的提交、链接与回收之间的竞争
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        """获取blob文件路径
+
+        Args:
+            digest: SHA-256十六进制摘要
+
+        Returns:
+            blob文件路径
+        """
+        digest = digest.lower()
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"无效的SHA-256摘要: {digest}")
+        return self.blobs_dir / digest[:2] / digest
+
+    def has_blob(self, digest: str) -> bool:
+        """检查blob是否存在
+
+        存在时刷新其修改时间，使垃圾回收的宽限期重新计时，
+        避免客户端确认文件已存在后、创建任务前blob被回收。
+
+        Args:
+            digest: SHA-256十六进制摘要
+
+        Returns:
+            是否存在
+        """
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            try:
+                os.utime(blob_path)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                return blob_path.exists()
+        return True
+
+    def open_writer(self) -> "BlobWriter":
+        """打开一个增量写入器
+
+        适用于数据以块的形式陆续到达的场景（例如HTTP请求体）。
+
+        Returns:
+            写入器
+        """
+        return BlobWriter(self)
+
+    def ingest_stream(
+        self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+    ) -> Tuple[str, int]:
+        """以固定大小的块将数据流写入存储
+
+        内容已存在时丢弃新写入的数据，不产生额外的磁盘占用。
+
+        Args:
+            stream: 可读的二进制文件对象
+            chunk_size: 块大小（字节）
+
+        Returns:
+            (SHA-256摘要, 文件大小)
+        """
+        writer = self.open_writer()
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+            return writer.commit()
+        finally:
+            writer.close()
+
+    def link(self, digest: str, dest: Path):
+        """在目标位置创建指向blob的硬链接
+
+        文件系统不支持硬链接时退化为复制。
+
+        Args:
+            digest: SHA-256十六进制摘要
+            dest: 目标文件路径
+        """
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            if not blob_path.exists():
+                raise FileNotFoundError(f"文件不存在: {digest}")
+            try:
+                os.link(blob_path, dest)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                shutil.copyfile(blob_path, dest)
+
+    def refcount(self, digest: str) -> int:
+        """获取blob的引用计数
+
+        Args:
+            digest: SHA-256十六进制摘要
+
+        Returns:
+            引用该blob的任务文件数
+        """
+        try:
+            return self.blob_path(digest).stat().st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def collect_garbage(self, grace_seconds: float = 3600) -> Dict[str, int]:
+        """删除没有任何任务引用的blob
+
+        Args:
+            grace_seconds: 宽限期（秒），最近被写入或解除链接的blob暂不删除
+
+        Returns:
+            删除的blob数量与释放的字节数
+        """
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        freed = 0
+        with self._lock:
+            for blob_path in self._iter_blobs():
+                try:
+                    st = blob_path.stat()
+                    if st.st_nlink > 1 or max(st.st_mtime, st.st_ctime) > cutoff:
+                        continue
+                    blob_path.unlink()
+                    removed += 1
+                    freed += st.st_size
+                except FileNotFoundError:
+                    continue
+
+            # 清理中断的上传留下的临时文件
+            for tmp_path in self.tmp_dir.iterdir():
+                try:
+                    if tmp_path.stat().st_mtime < cutoff:
+                        tmp_path.unlink()
+                except FileNotFoundError:
+                    continue
+
+        return {"removed": removed, "freed_bytes": freed}
+
+    def get_usage(self) -> Dict[str, Any]:
+        """获取存储使用情况
+
+        Returns:
+            blob数量、总大小与未被引用的blob数量
+        """
+        count = 0
+        size = 0
+        unreferenced = 0
+        for blob_path in self._iter_blobs():
+            try:
+                st = blob_path.stat()
+            except FileNotFoundError:
+                continue
+            count += 1
+            size += st.st_size
+            if st.st_nlink <= 1:
+                unreferenced += 1
+        return {"blobs_count": count, "blobs_size": size, "unreferenced": unreferenced}
+
+    def _commit(self, tmp_path: Path, digest: str):
+        """将临时文件提交为blob"""
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            if blob_path.exists():
+                # 刷新修改时间，使其在宽限期内不会被垃圾回收
+                os.utime(blob_path)
+                return
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            # blob被多个任务共享，设为只读防止任务修改输入文件影响其他任务
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp_path, blob_path)
+
+    def _iter_blobs(self):
+        """遍历所有blob文件"""
+        for prefix_dir in self.blobs_dir.iterdir():
+            if prefix_dir == self.tmp_dir or not prefix_dir.is_dir():
+                continue
+            yield from prefix_dir.iterdir()
+
+
+class BlobWriter:
+    """blob增量写入器
+
+    数据先写入临时文件并同步计算SHA-256，commit时再按摘要提交到存储。
+    """
+
+    def __init__(self, store: BlobStore):
+        """初始化写入器
+
+        Args:
+            store: 所属的文件存储
+        """
+        self._store = store
+        self._tmp_path = store.tmp_dir / str(uuid.uuid4())
+        self._file = open(self._tmp_path, "wb")
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        """写入一块数据
+
+        Args:
+            chunk: 数据块
+        """
+        self._file.write(chunk)
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self, expected_digest: str = None) -> Tuple[str, int]:
+        """提交写入的数据
+
+        Args:
+            expected_digest: 期望的SHA-256摘要，不一致时放弃写入
+
+        Returns:
+            (SHA-256摘要, 文件大小)
+
+        Raises:
+            ValueError: 摘要与期望不一致
+        """
+        self._file.close()
+        digest = self._sha256.hexdigest()
+        if expected_digest is not None and digest != expected_digest.lower():
+            raise ValueError(f"文件摘要不匹配: 期望 {expected_digest}，实际 {digest}")
+        self._store._commit(self._tmp_path, digest)
+        return digest, self.size
+
+    def close(self):
+        """关闭写入器并删除未提交的临时文件"""
+        self._file.close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
@@ -15,6 +15,13 @@ class CubQueueConfig:
 
         # 数据库配置
         self.database_url = kwargs.get("database_url")
+        # SQLite存储参数：WAL模式下读操作不会被状态写入阻塞
+        self.db_journal_mode = kwargs.get("db_journal_mode", "WAL")
+        self.db_synchronous = kwargs.get("db_synchronous", "NORMAL")
+        self.db_mmap_size = kwargs.get("db_mmap_size", 256 * 1024 * 1024)  # 256MB
+        self.db_cache_size = kwargs.get("db_cache_size", -64 * 1024)  # 64MB（负数单位为KB）
+        self.db_busy_timeout = kwargs.get("db_busy_timeout", 20000)  # 毫秒
+        self.db_pool_size = kwargs.get("db_pool_size", 8)  # 只读连接池大小
 
         # 日志配置
         self.log_level = kwargs.get("log_level", "INFO")
@@ -22,11 +29,52 @@ class CubQueueConfig:
 
         # 任务配置
         self.max_concurrent_tasks = kwargs.get("max_concurrent_tasks", 5)
-        self.task_timeout = kwargs.get("task_timeout", 3600)  # 秒
+        # 任务运行超时（秒），脚本与任务未设置时使用，0表示不限制
+        self.task_timeout = kwargs.get("task_timeout", 3600)
+        # 自动重试：脚本与任务未设置时每个任务最多尝试的次数（1表示不重试）、
+        # 重试的基础退避间隔（秒，每次失败后翻倍）与退避间隔上限（秒）
+        self.task_max_attempts = kwargs.get("task_max_attempts", 1)
+        self.retry_backoff = kwargs.get("retry_backoff", 30)
+        self.retry_backoff_max = kwargs.get("retry_backoff_max", 3600)
+        # 主机提供可写的cgroup v2时为每个本机任务创建cgroup，终止任务时结束其中的所有进程
+        self.task_cgroups = kwargs.get("task_cgroups", True)
+        # 参数扫描每批展开的任务数，等待队列低于该数量时继续展开
+        self.sweep_batch_size = kwargs.get("sweep_batch_size", 500)
+        # 公平份额调度：优先级相同的等待任务按脚本（script）或提交者（submitter）
+        # 分组轮流启动，各分组启动任务的比例与权重成正比（未列出的分组权重为1）
+        self.fair_share_by = kwargs.get("fair_share_by", "script")
+        self.fair_share_weights = kwargs.get("fair_share_weights", {})
+        # 资源准入：按任务声明的CPU与内存以及psutil实时读数决定能否启动新任务。
+        # 可分配的CPU数与内存（MB）为None时取主机逻辑CPU数与总内存减去保留量，
+        # 未声明需求的任务按default_task_cpus与default_task_memory_mb计，两者默认为0，
+        # 即未声明需求的任务不参与资源准入，只受max_concurrent_tasks限制
+        self.resource_admission = kwargs.get("resource_admission", True)
+        self.resource_cpus = kwargs.get("resource_cpus")
+        self.resource_memory_mb = kwargs.get("resource_memory_mb")
+        self.memory_reserve_mb = kwargs.get("memory_reserve_mb", 512)
+        self.default_task_cpus = kwargs.get("default_task_cpus", 0)
+        self.default_task_memory_mb = kwargs.get("default_task_memory_mb", 0)
+        # 结果缓存：相同脚本、参数与输入文件的任务直接复用已完成任务的结果
+        self.result_cache_enabled = kwargs.get("result_cache_enabled", False)
+        self.result_cache_ttl = kwargs.get("result_cache_ttl", 7 * 24 * 3600)  # 秒
+        self.result_cache_size = kwargs.get(
+            "result_cache_size", 10 * 1024 * 1024 * 1024
+        )  # 10GB
+
+        # Ray执行后端：集群地址（None表示自动发现或启动本地Ray），
+        # 以及集群节点能否以相同路径访问任务目录
+        self.ray_address = kwargs.get("ray_address")
+        self.ray_shared_dir = kwargs.get("ray_shared_dir", False)
+
+        # 远程worker：租约有效期（秒），worker在此期间内未发送心跳则任务重新排队
+        self.worker_lease_timeout = kwargs.get("worker_lease_timeout", 60)
 
         # 文件配置
         self.max_file_size = kwargs.get("max_file_size", 100 * 1024 * 1024)  # 100MB
         self.cleanup_days = kwargs.get("cleanup_days", 30)
+        self.archive_cache_size = kwargs.get(
+            "archive_cache_size", 10 * 1024 * 1024 * 1024
+        )  # 10GB
 
         # 安全配置
         self.allowed_script_extensions = kwargs.get("allowed_script_extensions", [".py"])
@@ -1,22 +1,53 @@
 """CubQueue数据库连接和配置"""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 from pathlib import Path
 from typing import Generator
 
+from .config import CubQueueConfig, get_config
 from .models import Base
 
 
+class RoutingSession(Session):
+    """读写分离的数据库会话
+
+    查询使用只读连接池，flush与INSERT/UPDATE/DELETE语句使用唯一的写连接，
+    进程内的写操作在该连接上排队，不再与读操作争抢SQLite锁。
+    事务中一旦发生写操作，其后的查询也使用写连接，以读到本事务尚未提交的修改。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 当前事务是否已使用写连接
+        self._writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._writing = True
+        if self._writing:
+            return self.info["writer_engine"]
+        return self.info["reader_engine"]
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    """顶层事务结束（提交或回滚）后，查询恢复使用只读连接"""
+    if transaction.parent is None:
+        session._writing = False
+
+
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, config: CubQueueConfig = None):
         """初始化数据库管理器
 
         Args:
             base_dir: 工作目录，如果为None则使用默认目录
+            config: 配置实例，如果为None则使用全局配置
         """
         if base_dir is None:
             base_dir = Path.home() / ".cubqueue"
@@ -24,29 +55,103 @@ class DatabaseManager:
             base_dir = Path(base_dir)
 
         base_dir.mkdir(parents=True, exist_ok=True)
+        self.config = config or get_config()
 
         # 数据库文件路径
         self.db_path = base_dir / "cubqueue.db"
 
-        # 创建数据库引擎
+        # 只读连接池，供查询使用
         self.engine = create_engine(
             f"sqlite:///{self.db_path}",
-            poolclass=StaticPool,
+            poolclass=QueuePool,
+            pool_size=self.config.db_pool_size,
+            max_overflow=self.config.db_pool_size * 2,
             connect_args={"check_same_thread": False, "timeout": 20},
             echo=False,  # 设置为True可以看到SQL语句
         )
+        event.listen(self.engine, "connect", self._configure_reader)
+
+        # 唯一的写连接，所有写操作在此排队
+        self.writer_engine = create_engine(
+            f"sqlite:///{self.db_path}",
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=60,
+            connect_args={"check_same_thread": False, "timeout": 20},
+            echo=False,
+        )
+        event.listen(self.writer_engine, "connect", self._configure_writer)
 
         # 创建会话工厂
         self.SessionLocal = sessionmaker(
-            autocommit=False, autoflush=False, bind=self.engine
+            class_=RoutingSession,
+            autocommit=False,
+            autoflush=False,
+            info={"reader_engine": self.engine, "writer_engine": self.writer_engine},
         )
 
         # 创建表
         self.create_tables()
 
+    def _apply_pragmas(self, dbapi_connection):
+        """设置连接级别的SQLite参数"""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(self.config.db_busy_timeout)}")
+            cursor.execute(f"PRAGMA synchronous = {self.config.db_synchronous}")
+            cursor.execute(f"PRAGMA cache_size = {int(self.config.db_cache_size)}")
+            cursor.execute(f"PRAGMA mmap_size = {int(self.config.db_mmap_size)}")
+        finally:
+            cursor.close()
+
+    def _configure_writer(self, dbapi_connection, connection_record):
+        """初始化写连接"""
+        cursor = dbapi_connection.cursor()
+        try:
+            # journal_mode会持久化到数据库文件，在写连接上设置即可
+            cursor.execute(f"PRAGMA journal_mode = {self.config.db_journal_mode}")
+        finally:
+            cursor.close()
+        self._apply_pragmas(dbapi_connection)
+
+    def _configure_reader(self, dbapi_connection, connection_record):
+        """初始化只读连接"""
+        self._apply_pragmas(dbapi_connection)
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only = ON")
+        finally:
+            cursor.close()
+
     def create_tables(self):
         """创建数据库表"""
-        Base.metadata.create_all(bind=self.engine)
+        Base.metadata.create_all(bind=self.writer_engine)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """为旧版本创建的数据库补齐新增的列与索引
+
+        create_all只会创建不存在的表，已有表中缺少的列需要通过ALTER TABLE补齐。
+        """
+        with self.writer_engine.begin() as conn:
+            inspector = inspect(conn)
+            for table in Base.metadata.sorted_tables:
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    column_type = column.type.compile(dialect=self.writer_engine.dialect)
+                    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    if column.server_default is not None:
+                        default = column.server_default.arg
+                        default = default.text if hasattr(default, "text") else f"'{default}'"
+                        ddl += f" DEFAULT {default}"
+                    conn.execute(text(ddl))
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.writer_engine, checkfirst=True)
 
     def get_session(self) -> Session:
         """获取数据库会话"""
@@ -55,23 +160,25 @@ class DatabaseManager:
     def close(self):
         """关闭数据库连接"""
         self.engine.dispose()
+        self.writer_engine.dispose()
 
 
 # 全局数据库管理器实例
 _db_manager = None
 
 
-def init_database(base_dir: str = None) -> DatabaseManager:
+def init_database(base_dir: str = None, config: CubQueueConfig = None) -> DatabaseManager:
     """初始化数据库
 
     Args:
         base_dir: 工作目录
+        config: 配置实例
 
     Returns:
         数据库管理器实例
     """
     global _db_manager
-    _db_manager = DatabaseManager(base_dir)
+    _db_manager = DatabaseManager(base_dir, config)
     return _db_manager
 
 
@@ -0,0 +1,454 @@
+"""CubQueue任务执行后端
+
+执行后端负责把任务交给某种运行环境并返回一个进程句柄，监督器通过句柄
+统一完成等待（轮询）、取消与结果收集：
+
+- launch: 在运行环境中启动任务，返回句柄
+- 句柄的returncode/wait: 查询或等待任务结束
+- 句柄的terminate/kill: 取消任务
+- collect: 任务结束后把运行环境中产生的结果文件与日志收集回任务目录
+
+句柄与asyncio.subprocess.Process的接口一致（pid、returncode、wait、
+terminate、kill），pid在非本机进程的后端中为None。本机进程在独立的会话中
+运行（后端参数cgroup不为空时还加入该cgroup），句柄的tree属性为其进程树，
+terminate与kill向整个进程树发送信号。能够取得准确资源用量的后端在句柄的
+usage属性中提供，否则由监督器在运行期间采样。
+
+后端参数rlimits（{"cpu_time": 秒, "memory_mb": MB}）在脚本进程启动时以
+RLIMIT_CPU与RLIMIT_AS生效。
+
+任务的输出追加到日志文件末尾，重试的任务保留之前各次尝试的日志。
+"""
+
+import asyncio
+import importlib.util
+import io
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import CubQueueConfig
+from .forkserver import ForkServerPool
+from .limits import rlimits_preexec, rusage_usage
+from .proctree import TASK_ID_ENV, ProcessTree, chain_preexec, join_cgroup
+
+# 可选的执行后端，worker表示任务由远程worker通过HTTP租用执行，不在服务器上启动
+EXECUTOR_NAMES = ("subprocess", "forkserver", "ray", "worker")
+
+# 由远程节点收集回任务目录的内容
+COLLECTED_ENTRIES = ("output", "metadata", "log.txt")
+
+# 远程节点上终止脚本时发送SIGTERM后等待进程退出的时间（秒），超时后发送SIGKILL
+KILL_GRACE_PERIOD = 10
+
+
+class TaskExecutor:
+    """执行后端基类，所有方法均在监督器事件循环中调用"""
+
+    name = ""
+
+    async def launch(
+        self,
+        argv: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        log_path: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """启动任务
+
+        Args:
+            argv: 命令行参数，argv[1]为相对于cwd的脚本路径
+            cwd: 任务目录
+            env: 环境变量
+            log_path: 日志文件路径，标准输出与标准错误均追加到该文件
+            options: 脚本注册时指定的后端参数
+
+        Returns:
+            进程句柄
+        """
+        raise NotImplementedError
+
+    async def collect(self, process: Any, cwd: str):
+        """任务结束后将结果收集回任务目录（默认结果已在任务目录中）
+
+        Args:
+            process: launch返回的进程句柄
+            cwd: 任务目录
+        """
+
+    def shutdown(self):
+        """释放后端占用的资源"""
+
+
+class LocalProcess:
+    """在独立会话中运行的本机子进程，信号发送给整个进程树"""
+
+    def __init__(
+        self,
+        process: asyncio.subprocess.Process,
+        cgroup: Optional[str] = None,
+        task_id: Optional[str] = None,
+    ):
+        self._process = process
+        self.pid = process.pid
+        self.usage: Optional[Dict[str, float]] = None
+        self.tree = ProcessTree(process.pid, cgroup, task_id)
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self._process.returncode
+
+    async def wait(self) -> int:
+        """等待进程结束并返回退出码"""
+        return await self._process.wait()
+
+    def terminate(self):
+        """向整个进程树发送SIGTERM"""
+        self.tree.signal(signal.SIGTERM)
+
+    def kill(self):
+        """向整个进程树发送SIGKILL"""
+        self.tree.signal(signal.SIGKILL)
+
+
+class LocalExecutor(TaskExecutor):
+    """在服务器本机以子进程运行任务"""
+
+    name = "subprocess"
+
+    async def launch(self, argv, cwd, env, log_path, options=None):
+        options = options or {}
+        cgroup = options.get("cgroup")
+        preexec = chain_preexec(
+            (lambda: join_cgroup(cgroup)) if cgroup else None,
+            rlimits_preexec(options.get("rlimits")),
+        )
+        with open(log_path, "ab") as log_f:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=cwd,
+                stdout=log_f,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True,
+                preexec_fn=preexec,
+            )
+        return LocalProcess(process, cgroup, env.get(TASK_ID_ENV))
+
+
+class ForkServerExecutor(LocalExecutor):
+    """由预导入了指定模块的fork-server创建任务进程
+
+    后端参数preload为预导入的模块列表；fork-server不可用时退回普通子进程。
+    """
+
+    name = "forkserver"
+
+    def __init__(self):
+        self.pool = ForkServerPool()
+
+    async def launch(self, argv, cwd, env, log_path, options=None):
+        options = options or {}
+        preload = options.get("preload") or []
+        try:
+            return await self.pool.get(preload).spawn(
+                argv, cwd, env, log_path, options.get("rlimits"), options.get("cgroup")
+            )
+        except Exception as e:
+            print(f"[WARN] 预热进程启动任务失败，改为直接启动: {e}")
+        return await super().launch(argv, cwd, env, log_path, options)
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+
+class RayTaskHandle:
+    """Ray远程任务的进程句柄"""
+
+    def __init__(self, ref: Any):
+        self.pid: Optional[int] = None
+        self.returncode: Optional[int] = None
+        self.outputs: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self.usage: Optional[Dict[str, float]] = None
+        self._ref = ref
+        self._done = asyncio.get_running_loop().create_task(self._watch())
+
+    async def wait(self) -> int:
+        """等待远程任务结束并返回退出码"""
+        return await asyncio.shield(self._done)
+
+    def terminate(self):
+        """请求取消：远程函数收到KeyboardInterrupt后终止脚本进程组"""
+        self._cancel(force=False)
+
+    def kill(self):
+        """强制结束执行远程函数的Ray worker"""
+        self._cancel(force=True)
+
+    def _cancel(self, force: bool):
+        import ray
+
+        if self.returncode is not None:
+            return
+        ray.cancel(self._ref, force=force)
+
+    async def _watch(self) -> int:
+        import ray
+
+        try:
+            self.returncode, self.outputs, self.usage = await self._ref
+        except ray.exceptions.TaskCancelledError:
+            self.returncode = -signal.SIGTERM
+        except ray.exceptions.RayError as e:
+            self.returncode = -signal.SIGKILL
+            self.error = str(e)
+        return self.returncode
+
+
+class RayExecutor(TaskExecutor):
+    """以Ray远程函数在集群中运行任务
+
+    每个任务对应一次远程函数调用，由Ray负责选择节点；CubQueue仍在服务器上
+    维护任务状态与文件。节点与服务器共享任务目录（shared_dir=True）时脚本
+    直接在任务目录中运行，日志可以实时查看；否则任务目录的输入部分打包随
+    调用发送，运行结束后结果文件、中间文件与日志打包返回并解压到任务目录。
+    """
+
+    name = "ray"
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        shared_dir: bool = False,
+        num_cpus: float = 1,
+    ):
+        """初始化后端（首次启动任务时才连接Ray）
+
+        Args:
+            address: Ray集群地址，None表示自动发现或启动本地Ray
+            shared_dir: 集群节点是否能以相同路径访问服务器的任务目录
+            num_cpus: 每个任务占用的CPU数
+        """
+        self.address = address
+        self.shared_dir = shared_dir
+        self.num_cpus = num_cpus
+
+        self._lock = threading.Lock()
+        self._remote = None
+
+    async def launch(self, argv, cwd, env, log_path, options=None):
+        remote = self._get_remote()
+        options = options or {}
+        inputs = None
+        if not self.shared_dir:
+            inputs = await asyncio.get_running_loop().run_in_executor(
+                None, _pack_inputs, Path(cwd), log_path
+            )
+        resources = {"num_cpus": options.get("num_cpus", self.num_cpus)}
+        if options.get("memory_mb"):
+            resources["memory"] = int(options["memory_mb"]) * 1024 * 1024
+        ref = remote.options(**resources).remote(
+            argv,
+            cwd,
+            env,
+            os.path.relpath(log_path, cwd),
+            inputs,
+            options.get("rlimits"),
+        )
+        return RayTaskHandle(ref)
+
+    async def collect(self, process, cwd):
+        if process.outputs:
+            await asyncio.get_running_loop().run_in_executor(
+                None, _unpack, process.outputs, cwd
+            )
+        if process.error:
+            with open(os.path.join(cwd, "log.txt"), "a", encoding="utf-8") as log_f:
+                log_f.write(f"\nRay任务异常: {process.error}\n")
+
+    def shutdown(self):
+        import ray
+
+        if self._remote is not None and ray.is_initialized():
+            ray.shutdown()
+
+    def _get_remote(self):
+        """连接Ray并注册远程函数"""
+        with self._lock:
+            if self._remote is None:
+                import ray
+
+                if not ray.is_initialized():
+                    ray.init(address=self.address, ignore_reinit_error=True)
+                self._remote = ray.remote(max_retries=0)(_run_remote_task)
+            return self._remote
+
+
+def executor_available(name: str) -> bool:
+    """执行后端的依赖是否已安装
+
+    Args:
+        name: 后端名称
+
+    Returns:
+        是否可用
+    """
+    if name == "ray":
+        return importlib.util.find_spec("ray") is not None
+    return name in EXECUTOR_NAMES
+
+
+def create_executor(name: str, config: CubQueueConfig) -> TaskExecutor:
+    """创建执行后端
+
+    Args:
+        name: 后端名称
+        config: 配置实例
+
+    Returns:
+        执行后端
+
+    Raises:
+        ValueError: 未知的后端
+        RuntimeError: 后端依赖未安装
+    """
+    if name == "subprocess":
+        return LocalExecutor()
+    if name == "forkserver":
+        return ForkServerExecutor()
+    if name == "ray":
+        if not executor_available("ray"):
+            raise RuntimeError("未安装ray，请执行 pip install cubqueue[ray]")
+        return RayExecutor(config.ray_address, config.ray_shared_dir)
+    if name == "worker":
+        raise ValueError("由远程worker执行的任务不在服务器上启动")
+    raise ValueError(f"未知的执行后端: {name}")
+
+
+def _pack_inputs(task_dir: Path, log_path: str) -> bytes:
+    """将任务目录中除结果与日志以外的内容打包（不压缩）"""
+    skipped = {task_dir / name for name in COLLECTED_ENTRIES} | {Path(log_path)}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        for root, dirs, files in os.walk(task_dir):
+            root_path = Path(root)
+            dirs[:] = [d for d in dirs if root_path / d not in skipped]
+            for name in files:
+                path = root_path / name
+                if path not in skipped:
+                    zf.write(path, path.relative_to(task_dir).as_posix())
+    return buffer.getvalue()
+
+
+def _unpack(data: bytes, target_dir: str):
+    """解压打包的内容到目录，日志追加到目录中已有的日志之后"""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        members = [m for m in zf.infolist() if m.filename != "log.txt"]
+        zf.extractall(target_dir, members)
+        if len(members) < len(zf.infolist()):
+            with zf.open("log.txt") as src, open(
+                os.path.join(target_dir, "log.txt"), "ab"
+            ) as dst:
+                shutil.copyfileobj(src, dst)
+
+
+def _pack_outputs(task_dir: Path) -> bytes:
+    """将结果文件、中间文件与日志打包"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in COLLECTED_ENTRIES:
+            path = task_dir / name
+            if path.is_file():
+                zf.write(path, name)
+            elif path.is_dir():
+                zf.write(path, name)
+                for child in sorted(path.rglob("*")):
+                    zf.write(child, child.relative_to(task_dir).as_posix())
+    return buffer.getvalue()
+
+
+def _kill_group(
+    process: subprocess.Popen,
+    tree: ProcessTree,
+    grace_period: float = KILL_GRACE_PERIOD,
+):
+    """先向进程树发送SIGTERM，超过宽限期后发送SIGKILL，根进程退出后清理其余进程"""
+    tree.refresh()
+    for signum in (signal.SIGTERM, signal.SIGKILL):
+        tree.signal(signum)
+        try:
+            process.wait(timeout=grace_period)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+    else:
+        process.wait()
+    tree.terminate(grace_period)
+
+
+def _run_remote_task(
+    argv: List[str],
+    cwd: str,
+    env: Dict[str, str],
+    log_name: str,
+    inputs: Optional[bytes],
+    rlimits: Optional[Dict[str, Any]] = None,
+):
+    """在Ray worker中运行任务脚本（远程函数体）
+
+    Returns:
+        (退出码, 打包的结果；共享任务目录时为None, 资源用量)
+    """
+    work_dir = cwd
+    if inputs is not None:
+        work_dir = tempfile.mkdtemp(prefix="cubqueue-ray-")
+        _unpack(inputs, work_dir)
+        for name in ("output", "metadata"):
+            os.makedirs(os.path.join(work_dir, name), exist_ok=True)
+        env = dict(env)
+        env["CUBQUEUE_TASK_DIR"] = work_dir
+        env["CUBQUEUE_FILES_DIR"] = os.path.join(work_dir, "files")
+
+    try:
+        with open(os.path.join(work_dir, log_name), "ab") as log_f:
+            started = time.monotonic()
+            process = subprocess.Popen(
+                argv,
+                cwd=work_dir,
+                stdout=log_f,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True,
+                preexec_fn=rlimits_preexec(rlimits),
+            )
+            tree = ProcessTree(process.pid, task_id=env.get(TASK_ID_ENV))
+            try:
+                # 用wait4回收进程以取得其资源用量
+                _, status, rusage = os.wait4(process.pid, 0)
+            except KeyboardInterrupt:
+                # ray.cancel()：终止脚本进程树后重新抛出，由Ray标记为已取消
+                _kill_group(process, tree)
+                raise
+            if os.WIFSIGNALED(status):
+                returncode = -os.WTERMSIG(status)
+            else:
+                returncode = os.WEXITSTATUS(status)
+            process.returncode = returncode
+            usage = rusage_usage(rusage, time.monotonic() - started)
+            # 清理脚本退出后残留的后代进程
+            tree.terminate(KILL_GRACE_PERIOD)
+
+        outputs = None if inputs is None else _pack_outputs(Path(work_dir))
+        return returncode, outputs, usage
+    finally:
+        if inputs is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -1,10 +1,13 @@
 """CubQueue文件管理器"""
 
 import os
+import io
 import shutil
 import uuid
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, BinaryIO
+
+from .blob_store import BlobStore, CHUNK_SIZE
 
 
 class FileManager:
@@ -29,6 +32,9 @@ class FileManager:
         self.scripts_dir.mkdir(parents=True, exist_ok=True)
         self.tasks_dir.mkdir(parents=True, exist_ok=True)
 
+        # 任务输入文件的去重存储
+        self.blob_store = BlobStore(base_dir)
+
     def save_script(self, name: str, content: bytes, description: str) -> str:
         """保存脚本文件
 
@@ -104,6 +110,46 @@ class FileManager:
         Returns:
             文件UUID
         """
+        return self.save_task_file_stream(task_id, filename, io.BytesIO(content))[
+            "file_uuid"
+        ]
+
+    def save_task_file_stream(
+        self,
+        task_id: str,
+        filename: str,
+        stream: BinaryIO,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """以固定大小的块流式保存任务文件
+
+        文件内容按块写入去重存储，同时计算大小与SHA-256校验和，
+        内存占用只与块大小相关，与文件大小无关。相同内容只保存一份，
+        任务目录中的files/<uuid>为指向它的硬链接。
+
+        Args:
+            task_id: 任务ID
+            filename: 文件名
+            stream: 可读的二进制文件对象
+            chunk_size: 块大小（字节）
+
+        Returns:
+            文件信息，包含file_uuid、file_size和checksum
+        """
+        digest, _ = self.blob_store.ingest_stream(stream, chunk_size)
+        return self.link_task_file(task_id, filename, digest)
+
+    def link_task_file(self, task_id: str, filename: str, digest: str) -> Dict[str, Any]:
+        """将存储中已有的文件链接到任务目录
+
+        Args:
+            task_id: 任务ID
+            filename: 文件名
+            digest: 文件SHA-256摘要
+
+        Returns:
+            文件信息，包含file_uuid、file_size和checksum
+        """
         # 生成文件UUID
         file_uuid = str(uuid.uuid4())
 
@@ -111,17 +157,20 @@ class FileManager:
         task_files_dir = self.tasks_dir / task_id / "files"
         task_files_dir.mkdir(parents=True, exist_ok=True)
 
-        # 保存文件
+        # 链接文件
         file_path = task_files_dir / file_uuid
-        with open(file_path, "wb") as f:
-            f.write(content)
+        self.blob_store.link(digest, file_path)
 
         # 保存文件名映射
         mapping_path = task_files_dir / f"{file_uuid}.name"
         with open(mapping_path, "w", encoding="utf-8") as f:
             f.write(filename)
 
-        return file_uuid
+        return {
+            "file_uuid": file_uuid,
+            "file_size": file_path.stat().st_size,
+            "checksum": digest,
+        }
 
     def get_task_file_path(self, task_id: str, file_uuid: str) -> str:
         """获取任务文件路径
@@ -246,31 +295,50 @@ class FileManager:
                 except Exception as e:
                     print(f"清理任务目录失败 {task_dir.name}: {e}")
 
+        # 删除不再被任何任务引用的文件
+        result = self.blob_store.collect_garbage()
+        if result["removed"]:
+            print(f"已清理未引用文件: {result['removed']}个，{result['freed_bytes']}字节")
+
     def get_disk_usage(self) -> Dict[str, Any]:
         """获取磁盘使用情况
 
+        硬链接的多个路径只按inode计一次，依次归入文件存储、结果缓存、
+        任务目录与脚本目录中最先出现的一项，各项之和即实际占用。
+
         Returns:
             磁盘使用信息
         """
+        seen = set()
 
         def get_dir_size(path: Path) -> int:
-            """获取目录大小"""
+            """获取目录中尚未计入的inode的总大小"""
             total = 0
             try:
                 for entry in path.rglob("*"):
                     if entry.is_file():
-                        total += entry.stat().st_size
+                        st = entry.stat()
+                        key = (st.st_dev, st.st_ino)
+                        if key not in seen:
+                            seen.add(key)
+                            total += st.st_size
             except Exception:
                 pass
             return total
 
-        scripts_size = get_dir_size(self.scripts_dir)
+        blobs_size = get_dir_size(self.blob_store.blobs_dir)
+        result_cache_size = get_dir_size(self.base_dir / "result_cache")
         tasks_size = get_dir_size(self.tasks_dir)
-        total_size = scripts_size + tasks_size
+        scripts_size = get_dir_size(self.scripts_dir)
+        blob_usage = self.blob_store.get_usage()
+        total_size = scripts_size + tasks_size + blobs_size + result_cache_size
 
         return {
             "scripts_size": scripts_size,
             "tasks_size": tasks_size,
+            "blobs_size": blobs_size,
+            "blobs_count": blob_usage["blobs_count"],
+            "result_cache_size": result_cache_size,
             "total_size": total_size,
             "scripts_count": len(list(self.scripts_dir.glob("*.py"))),
             "tasks_count": len(list(self.tasks_dir.iterdir())),
@@ -0,0 +1,418 @@
+"""CubQueue预热解释器（fork-server）
+
+长期运行的辅助进程预先导入脚本声明的模块，之后为每个任务fork一个子进程，
+子进程继承已导入的模块，直接在任务目录中以__main__身份运行任务脚本，
+省去解释器启动与导入的时间。
+
+辅助进程通过Unix套接字接收请求，每个请求对应一个连接：
+请求为一行JSON（argv、cwd、env、log_path与可选的rlimits、cgroup），辅助进程依次
+回复{"pid": ...}与子进程结束后的{"returncode": ..., "usage": ...}。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .limits import apply_rlimits, rusage_usage
+from .proctree import TASK_ID_ENV, ProcessTree, join_cgroup
+
+# 等待辅助进程完成预导入的最长时间（秒）
+STARTUP_TIMEOUT = 300
+
+
+class ForkServerProcess:
+    """由fork-server创建的任务进程
+
+    提供与asyncio.subprocess.Process相同的pid、returncode、terminate、
+    kill与wait接口，供监督器统一管理。
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        cgroup: Optional[str] = None,
+        task_id: Optional[str] = None,
+    ):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+        self.usage: Optional[Dict[str, float]] = None
+        self.tree = ProcessTree(pid, cgroup, task_id)
+        self._reader = reader
+        self._writer = writer
+        self._done = asyncio.get_running_loop().create_task(self._watch())
+
+    async def wait(self) -> int:
+        """等待进程结束并返回退出码"""
+        return await asyncio.shield(self._done)
+
+    def terminate(self):
+        """向整个进程树发送SIGTERM"""
+        self.tree.signal(signal.SIGTERM)
+
+    def kill(self):
+        """向整个进程树发送SIGKILL"""
+        self.tree.signal(signal.SIGKILL)
+
+    async def _watch(self) -> int:
+        """读取辅助进程回复的退出码"""
+        try:
+            line = await self._reader.readline()
+            if line:
+                reply = json.loads(line)
+                self.returncode = reply["returncode"]
+                self.usage = reply.get("usage")
+            else:
+                self.returncode = -signal.SIGKILL
+        except (ValueError, KeyError, ConnectionError):
+            # 辅助进程异常退出，任务进程随之失去监督
+            self.returncode = -signal.SIGKILL
+        finally:
+            self._writer.close()
+        return self.returncode
+
+
+class ForkServer:
+    """一个预导入了指定模块的fork-server辅助进程"""
+
+    def __init__(self, modules: Sequence[str], socket_path: str):
+        """初始化
+
+        Args:
+            modules: 预导入的模块
+            socket_path: Unix套接字路径
+        """
+        self.modules = tuple(modules)
+        self.socket_path = socket_path
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self):
+        """启动辅助进程（不等待预导入完成）"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # 保证辅助进程能导入本模块
+        env = os.environ.copy()
+        package_root = str(Path(__file__).resolve().parents[2])
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (package_root, env.get("PYTHONPATH")) if p
+        )
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "cubqueue.core.forkserver", self.socket_path]
+            + list(self.modules),
+            stdin=subprocess.DEVNULL,
+            env=env,
+            start_new_session=True,
+        )
+
+    def is_alive(self) -> bool:
+        """辅助进程是否仍在运行"""
+        return self._process is not None and self._process.poll() is None
+
+    def stop(self):
+        """停止辅助进程（已创建的任务进程不受影响）"""
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def spawn(
+        self,
+        argv: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        log_path: str,
+        rlimits: Optional[Dict[str, int]] = None,
+        cgroup: Optional[str] = None,
+    ) -> ForkServerProcess:
+        """通过辅助进程创建任务进程（在事件循环中调用）
+
+        辅助进程完成预导入后才会创建套接字，此前的请求会等待其就绪。
+
+        Args:
+            argv: 命令行参数，argv[1]为脚本路径
+            cwd: 工作目录
+            env: 环境变量
+            log_path: 日志文件路径，标准输出与标准错误均追加到该文件
+            rlimits: 任务进程的资源限制
+            cgroup: 任务进程加入的cgroup目录
+
+        Returns:
+            任务进程
+
+        Raises:
+            RuntimeError: 辅助进程未能就绪
+        """
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if not self.is_alive():
+                raise RuntimeError(f"fork-server已退出: {', '.join(self.modules)}")
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("等待fork-server就绪超时")
+                await asyncio.sleep(0.05)
+
+        request = {
+            "argv": argv,
+            "cwd": cwd,
+            "env": env,
+            "log_path": log_path,
+            "rlimits": rlimits,
+            "cgroup": cgroup,
+        }
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+
+        line = await reader.readline()
+        try:
+            reply = json.loads(line)
+            pid = reply["pid"]
+        except (ValueError, KeyError):
+            writer.close()
+            raise RuntimeError(f"fork-server创建进程失败: {line!r}")
+        return ForkServerProcess(pid, reader, writer, cgroup, env.get(TASK_ID_ENV))
+
+
+class ForkServerPool:
+    """按预导入模块列表管理fork-server辅助进程
+
+    预导入模块列表相同的脚本共享同一个辅助进程，辅助进程在第一次使用时启动，
+    异常退出后下次使用时重新启动。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[Tuple[str, ...], ForkServer] = {}
+        # Unix套接字路径长度有限，放在临时目录中
+        self._socket_dir = tempfile.mkdtemp(prefix="cubqueue-fs-")
+
+    def get(self, modules: Sequence[str]) -> ForkServer:
+        """获取预导入了指定模块的fork-server
+
+        Args:
+            modules: 预导入的模块
+
+        Returns:
+            fork-server
+        """
+        key = tuple(modules)
+        with self._lock:
+            server = self._servers.get(key)
+            if server is None or not server.is_alive():
+                name = hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()[:16]
+                server = ForkServer(key, os.path.join(self._socket_dir, f"{name}.sock"))
+                server.start()
+                self._servers[key] = server
+            return server
+
+    def shutdown(self):
+        """停止所有辅助进程"""
+        with self._lock:
+            for server in self._servers.values():
+                server.stop()
+            self._servers.clear()
+
+
+def _serve(socket_path: str, modules: List[str]):
+    """辅助进程入口：预导入模块后循环接收请求
+
+    只使用主线程与selectors处理请求，保证fork时进程中没有其他线程。
+    """
+    import importlib
+
+    for module in modules:
+        importlib.import_module(module)
+
+    parent_pid = os.getppid()
+    selector = selectors.DefaultSelector()
+
+    # SIGCHLD通过唤醒管道通知主循环回收子进程
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    selector.register(wakeup_r, selectors.EVENT_READ, "wakeup")
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 先绑定临时路径再重命名，客户端只会连接到已就绪的套接字
+    tmp_path = f"{socket_path}.{os.getpid()}"
+    listener.bind(tmp_path)
+    listener.listen(128)
+    os.rename(tmp_path, socket_path)
+    selector.register(listener, selectors.EVENT_READ, "listen")
+
+    # 子进程PID -> (连接, 启动时间)
+    children: Dict[int, Tuple[socket.socket, float]] = {}
+    buffers: Dict[socket.socket, bytes] = {}
+
+    while True:
+        for key, _ in selector.select(timeout=1.0):
+            if key.data == "wakeup":
+                try:
+                    while os.read(wakeup_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+            elif key.data == "listen":
+                conn, _ = listener.accept()
+                buffers[conn] = b""
+                selector.register(conn, selectors.EVENT_READ, "request")
+            else:
+                conn = key.fileobj
+                data = conn.recv(65536)
+                if not data:
+                    selector.unregister(conn)
+                    buffers.pop(conn, None)
+                    conn.close()
+                    continue
+                buffers[conn] += data
+                if b"\n" not in buffers[conn]:
+                    continue
+                selector.unregister(conn)
+                request = json.loads(buffers.pop(conn).split(b"\n", 1)[0])
+                pid = _fork_task(request, listener, conn, wakeup_r, wakeup_w)
+                children[pid] = (conn, time.monotonic())
+                _send(conn, {"pid": pid})
+
+        # 回收已结束的子进程并回复退出码与资源用量
+        while children:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            child = children.pop(pid, None)
+            if child is not None:
+                conn, started = child
+                if os.WIFSIGNALED(status):
+                    returncode = -os.WTERMSIG(status)
+                else:
+                    returncode = os.WEXITSTATUS(status)
+                usage = rusage_usage(rusage, time.monotonic() - started)
+                _send(conn, {"returncode": returncode, "usage": usage})
+                conn.close()
+
+        # 服务器进程退出后随之退出
+        if os.getppid() != parent_pid:
+            break
+
+    listener.close()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+
+def _fork_task(
+    request: dict,
+    listener: socket.socket,
+    conn: socket.socket,
+    wakeup_r: int,
+    wakeup_w: int,
+) -> int:
+    """fork子进程运行任务脚本，返回子进程PID"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # 以下在子进程中执行，任何情况下都不能返回到服务循环
+    code = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        listener.close()
+        conn.close()
+        os.close(wakeup_r)
+        os.close(wakeup_w)
+
+        join_cgroup(request.get("cgroup"))
+        apply_rlimits(request.get("rlimits"))
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+
+        fd = os.open(request["log_path"], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+        os.close(fd)
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        os.close(null_fd)
+
+        code = _run_script(request["argv"][1:])
+    finally:
+        os._exit(code)
+
+
+def _run_script(argv: List[str]) -> int:
+    """以__main__身份运行脚本，返回与python命令行一致的退出码
+
+    子进程最终以os._exit退出，因此在返回前按解释器正常退出的顺序等待非守护线程结束、
+    执行atexit回调（包括logging与multiprocessing注册的清理）并刷新标准输出。
+    """
+    import atexit
+    import runpy
+    import traceback
+
+    script = os.path.abspath(argv[0])
+    sys.argv = list(argv)
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            threading._shutdown()
+        except BaseException:
+            traceback.print_exc()
+        atexit._run_exitfuncs()
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+    return code
+
+
+def _send(conn: socket.socket, message: dict):
+    """向连接发送一行JSON，连接已断开时忽略"""
+    try:
+        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,460 @@
+"""CubQueue远程worker任务租约"""
+
+import hashlib
+import os
+import shutil
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Set
+
+from sqlalchemy import or_
+
+from .models import Script, Task, TaskAttempt, TaskFile
+
+if TYPE_CHECKING:
+    from .task_manager import TaskManager
+
+# 由远程worker执行的脚本的执行后端名称
+WORKER_EXECUTOR = "worker"
+
+# worker完成任务时可以上传的目录
+UPLOADED_DIRS = ("metadata", "output")
+
+# 单次租用的最大任务数
+MAX_LEASE_TASKS = 100
+
+
+class LeaseError(Exception):
+    """租约无效：任务不存在、已结束，或已被其他worker租用"""
+
+
+class LeaseManager:
+    """远程worker的任务租约管理器
+
+    执行后端为worker的脚本的任务不进入本机调度队列，而是保持pending状态，
+    由远程worker通过HTTP租用。租用后任务变为running，并记录worker与租约
+    到期时间；worker通过心跳续约、追加日志，完成后上传结果。租约到期仍未
+    续约（worker退出或失联）的任务由后台线程重新置为pending，等待再次租用。
+    失败后等待重试的任务在退避结束前不会被租用。
+    """
+
+    def __init__(self, task_manager: "TaskManager", lease_timeout: float = 60):
+        """初始化管理器
+
+        Args:
+            task_manager: 任务管理器
+            lease_timeout: 租约有效期（秒）
+        """
+        self.task_manager = task_manager
+        self.db_manager = task_manager.db_manager
+        self.tasks_dir = task_manager.tasks_dir
+        self.lease_timeout = lease_timeout
+
+        # 脚本ID -> 是否由worker执行；脚本的执行后端注册后不再改变
+        self._worker_scripts: Dict[int, bool] = {}
+
+        # 租用与过期回收互斥
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动租约过期回收线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="cubqueue-lease", daemon=True
+        )
+        self._thread.start()
+
+    def lease(self, worker_id: str, slots: int) -> List[Dict[str, Any]]:
+        """按优先级与提交顺序租用等待中的任务
+
+        Args:
+            worker_id: worker ID
+            slots: 最多租用的任务数
+
+        Returns:
+            租用到的任务，包含脚本名称、命令行参数、输入文件清单与运行限制
+        """
+        slots = max(0, min(int(slots), MAX_LEASE_TASKS))
+        if slots == 0:
+            return []
+
+        now = datetime.utcnow()
+        leased = []
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                candidates = (
+                    db.query(Task.id, Task.script_id, Script.name)
+                    .join(Script, Task.script_id == Script.id)
+                    .filter(
+                        Task.status == "pending",
+                        Script.executor == WORKER_EXECUTOR,
+                        or_(Task.retry_at.is_(None), Task.retry_at <= now),
+                    )
+                    .order_by(Task.priority.desc(), Task.created_at, Task.id)
+                    .limit(slots)
+                    .all()
+                )
+                for task_id, script_id, script_name in candidates:
+                    updated = (
+                        db.query(Task)
+                        .filter(Task.id == task_id, Task.status == "pending")
+                        .update(
+                            {
+                                Task.status: "running",
+                                Task.worker_id: worker_id,
+                                Task.lease_expires_at: self._expiry(now),
+                                Task.started_at: now,
+                            },
+                            synchronize_session=False,
+                        )
+                    )
+                    if updated:
+                        leased.append((task_id, script_id, script_name))
+                db.commit()
+            finally:
+                db.close()
+
+        tasks = []
+        for task_id, script_id, script_name in leased:
+            self.task_manager.record_task_transition(task_id, script_id, "pending", "running")
+            # 登记本次尝试；租约过期后重新租用的尝试从其日志段的起点重新记录
+            self.task_manager.begin_attempt(task_id, worker_id)
+            timeout, rlimits = self.task_manager.get_task_limits(task_id)
+            tasks.append(
+                {
+                    "id": task_id,
+                    "script_name": script_name,
+                    "argv": ["python", f"{script_name}.py"],
+                    "files": self._list_inputs(task_id),
+                    "timeout": timeout,
+                    "rlimits": rlimits,
+                }
+            )
+        return tasks
+
+    def heartbeat(self, worker_id: str, task_ids: List[str]) -> List[str]:
+        """为worker仍在运行的任务续约
+
+        Args:
+            worker_id: worker ID
+            task_ids: worker正在运行的任务ID
+
+        Returns:
+            已不再由该worker持有（被取消、过期后重新租用或已结束）的任务ID，
+            worker应终止这些任务
+        """
+        if not task_ids:
+            return []
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                held = {
+                    task_id
+                    for (task_id,) in db.query(Task.id).filter(
+                        Task.id.in_(task_ids),
+                        Task.status == "running",
+                        Task.worker_id == worker_id,
+                    )
+                }
+                if held:
+                    db.query(Task).filter(Task.id.in_(held)).update(
+                        {Task.lease_expires_at: self._expiry(datetime.utcnow())},
+                        synchronize_session=False,
+                    )
+                    db.commit()
+            finally:
+                db.close()
+        return [task_id for task_id in task_ids if task_id not in held]
+
+    def input_path(self, task_id: str, worker_id: str, path: str) -> Path:
+        """获取任务输入文件的路径
+
+        Args:
+            task_id: 任务ID
+            worker_id: worker ID
+            path: 相对于任务目录的路径
+
+        Returns:
+            文件路径
+
+        Raises:
+            LeaseError: 租约无效
+            FileNotFoundError: 文件不存在或不是任务输入
+        """
+        self._check_lease(task_id, worker_id)
+        task_dir = (self.tasks_dir / task_id).resolve()
+        file_path = (task_dir / path).resolve()
+        if (
+            task_dir not in file_path.parents
+            or file_path.relative_to(task_dir).parts[0] in UPLOADED_DIRS + ("log.txt",)
+            or not file_path.is_file()
+        ):
+            raise FileNotFoundError(path)
+        return file_path
+
+    def append_log(self, task_id: str, worker_id: str, offset: int, data: bytes) -> int:
+        """在指定偏移处写入worker上传的日志
+
+        按偏移写入使重试的上传保持幂等。worker只上传本次尝试的日志，
+        偏移相对于本次尝试在任务日志中的日志段起点。
+
+        Args:
+            task_id: 任务ID
+            worker_id: worker ID
+            offset: 数据在本次尝试日志中的起始偏移
+            data: 日志内容
+
+        Returns:
+            写入后本次尝试的日志大小
+
+        Raises:
+            LeaseError: 租约无效
+            ValueError: 偏移超出当前日志大小
+        """
+        self._check_lease(task_id, worker_id)
+        base = self._log_start(task_id)
+        log_path = self.tasks_dir / task_id / "log.txt"
+        with open(log_path, "r+b" if log_path.exists() else "w+b") as f:
+            size = max(0, f.seek(0, os.SEEK_END) - base)
+            if offset > size:
+                raise ValueError(f"日志偏移 {offset} 超出当前大小 {size}")
+            f.seek(base + offset)
+            f.write(data)
+            return max(size, offset + len(data))
+
+    def complete(
+        self,
+        task_id: str,
+        worker_id: str,
+        returncode: Optional[int],
+        results: Optional[BinaryIO] = None,
+        error: Optional[str] = None,
+        timed_out: bool = False,
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """记录worker完成的任务
+
+        Args:
+            task_id: 任务ID
+            worker_id: worker ID
+            returncode: 脚本退出码，脚本未能启动时为None
+            results: worker上传的metadata/与output/的zip压缩包
+            error: 脚本未能启动时的错误信息
+            timed_out: 脚本是否因运行超时被终止
+            usage: 资源用量
+
+        Raises:
+            LeaseError: 租约无效
+            ValueError: 压缩包无效
+        """
+        # 先解除租约，之后过期回收不会再把任务重新排队
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                updated = (
+                    db.query(Task)
+                    .filter(
+                        Task.id == task_id,
+                        Task.status == "running",
+                        Task.worker_id == worker_id,
+                    )
+                    .update({Task.lease_expires_at: None}, synchronize_session=False)
+                )
+                db.commit()
+            finally:
+                db.close()
+        if not updated:
+            raise LeaseError(f"任务 {task_id} 未被worker {worker_id} 持有")
+
+        try:
+            if results is not None:
+                _extract_results(results, self.tasks_dir / task_id)
+        except Exception as e:
+            self.task_manager.finish_remote_task(
+                task_id, None, f"保存任务结果失败: {e}", usage=usage
+            )
+            raise ValueError(f"无效的结果压缩包: {e}")
+        self.task_manager.finish_remote_task(task_id, returncode, error, timed_out, usage)
+
+    def count_queued(self) -> int:
+        """等待worker租用的任务数
+
+        由任务统计的各脚本pending计数求和，只在首次遇到某个脚本时查询其执行后端。
+        """
+        pending = self.task_manager.stats.count_by_script("pending")
+        unknown = [script_id for script_id in pending if script_id not in self._worker_scripts]
+        if unknown:
+            db = self.db_manager.get_session()
+            try:
+                rows = db.query(Script.id, Script.executor).filter(Script.id.in_(unknown)).all()
+            finally:
+                db.close()
+            for script_id, executor in rows:
+                self._worker_scripts[script_id] = executor == WORKER_EXECUTOR
+        return sum(
+            count
+            for script_id, count in pending.items()
+            if self._worker_scripts.get(script_id, False)
+        )
+
+    def requeue_expired(self) -> int:
+        """将租约已过期的任务重新置为pending
+
+        Returns:
+            重新排队的任务数
+        """
+        now = datetime.utcnow()
+        requeued = []
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                expired = (
+                    db.query(Task.id, Task.script_id, Task.worker_id)
+                    .filter(Task.status == "running", Task.lease_expires_at < now)
+                    .all()
+                )
+                for task_id, script_id, worker_id in expired:
+                    updated = (
+                        db.query(Task)
+                        .filter(
+                            Task.id == task_id,
+                            Task.status == "running",
+                            Task.lease_expires_at < now,
+                        )
+                        .update(
+                            {
+                                Task.status: "pending",
+                                Task.worker_id: None,
+                                Task.lease_expires_at: None,
+                                Task.started_at: None,
+                                Task.message: f"worker {worker_id} 租约过期，任务重新排队",
+                            },
+                            synchronize_session=False,
+                        )
+                    )
+                    if updated:
+                        requeued.append((task_id, script_id))
+                db.commit()
+            finally:
+                db.close()
+
+        for task_id, script_id in requeued:
+            self.task_manager.record_task_transition(task_id, script_id, "running", "pending")
+        return len(requeued)
+
+    def _run(self):
+        """过期回收线程入口"""
+        interval = max(1.0, self.lease_timeout / 4)
+        while not self._stop.wait(interval):
+            try:
+                if self.requeue_expired():
+                    self.task_manager.sweeps.notify()
+            except Exception as e:
+                print(f"[ERROR] 回收过期租约失败: {e}")
+
+    def _check_lease(self, task_id: str, worker_id: str):
+        """检查任务是否由该worker持有"""
+        db = self.db_manager.get_session()
+        try:
+            held = (
+                db.query(Task.id)
+                .filter(
+                    Task.id == task_id,
+                    Task.status == "running",
+                    Task.worker_id == worker_id,
+                )
+                .first()
+            )
+        finally:
+            db.close()
+        if held is None:
+            raise LeaseError(f"任务 {task_id} 未被worker {worker_id} 持有")
+
+    def _log_start(self, task_id: str) -> int:
+        """任务当前尝试的日志段在日志文件中的起点"""
+        db = self.db_manager.get_session()
+        try:
+            start = (
+                db.query(TaskAttempt.log_start)
+                .join(Task, Task.id == TaskAttempt.task_id)
+                .filter(TaskAttempt.task_id == task_id, TaskAttempt.attempt == Task.attempt)
+                .scalar()
+            )
+        finally:
+            db.close()
+        return start or 0
+
+    def _expiry(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.lease_timeout)
+
+    def _list_inputs(self, task_id: str) -> List[Dict[str, Any]]:
+        """列出任务目录中的输入文件及其SHA-256摘要
+
+        上传的文件使用入库时记录的摘要，脚本与参数文件当场计算。
+        """
+        task_dir = self.tasks_dir / task_id
+        db = self.db_manager.get_session()
+        try:
+            checksums = dict(
+                db.query(TaskFile.file_uuid, TaskFile.checksum).filter(
+                    TaskFile.task_id == task_id
+                )
+            )
+        finally:
+            db.close()
+
+        skipped: Set[str] = set(UPLOADED_DIRS) | {"log.txt"}
+        inputs = []
+        for root, dirs, files in os.walk(task_dir):
+            rel_root = Path(root).relative_to(task_dir)
+            if rel_root == Path("."):
+                dirs[:] = [d for d in dirs if d not in skipped]
+            for name in files:
+                rel_path = rel_root / name
+                if rel_path.as_posix() in skipped:
+                    continue
+                path = task_dir / rel_path
+                digest = checksums.get(name) if rel_root.parts[:1] == ("files",) else None
+                inputs.append(
+                    {
+                        "path": rel_path.as_posix(),
+                        "size": path.stat().st_size,
+                        "digest": digest or _file_digest(path),
+                    }
+                )
+        return inputs
+
+
+def _file_digest(path: Path) -> str:
+    """计算文件的SHA-256摘要"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _extract_results(results: BinaryIO, task_dir: Path):
+    """将worker上传的压缩包解压到任务目录，只接受metadata/与output/下的文件"""
+    with zipfile.ZipFile(results) as zf:
+        members = zf.infolist()
+        for member in members:
+            parts = Path(member.filename).parts
+            if (
+                not parts
+                or parts[0] not in UPLOADED_DIRS
+                or ".." in parts
+                or Path(member.filename).is_absolute()
+            ):
+                raise ValueError(f"不允许的文件路径: {member.filename}")
+
+        for name in UPLOADED_DIRS:
+            shutil.rmtree(task_dir / name, ignore_errors=True)
+            (task_dir / name).mkdir()
+        zf.extractall(task_dir)
@@ -0,0 +1,109 @@
+"""CubQueue任务运行限制与资源用量
+
+运行限制包括墙钟超时（由监督器或worker计时）以及在子进程启动时设置的
+RLIMIT_CPU（CPU时间，秒）与RLIMIT_AS（地址空间，MB）。资源用量记录任务
+运行的墙钟时间、用户态与内核态CPU时间以及峰值常驻内存。
+"""
+
+import resource
+from typing import Any, Callable, Dict, Optional
+
+import psutil
+
+MB = 1024 * 1024
+
+# 运行中任务资源用量的采样间隔（秒）
+USAGE_SAMPLE_INTERVAL = 1.0
+
+
+def rlimits_preexec(rlimits: Optional[Dict[str, Any]]) -> Optional[Callable[[], None]]:
+    """生成在子进程exec之前设置资源限制的函数
+
+    Args:
+        rlimits: {"cpu_time": 秒, "memory_mb": MB}，值为空表示不限制
+
+    Returns:
+        供preexec_fn使用的函数，没有限制时为None
+    """
+    rlimits = rlimits or {}
+    limits = []
+    if rlimits.get("cpu_time"):
+        seconds = int(rlimits["cpu_time"])
+        # 超过软限制时收到SIGXCPU，再多1秒后被内核以SIGKILL结束
+        limits.append((resource.RLIMIT_CPU, (seconds, seconds + 1)))
+    if rlimits.get("memory_mb"):
+        size = int(rlimits["memory_mb"]) * MB
+        limits.append((resource.RLIMIT_AS, (size, size)))
+    if not limits:
+        return None
+
+    def apply():
+        for which, value in limits:
+            resource.setrlimit(which, value)
+
+    return apply
+
+
+def apply_rlimits(rlimits: Optional[Dict[str, Any]]):
+    """在当前进程中设置资源限制（用于fork之后、运行脚本之前）"""
+    preexec = rlimits_preexec(rlimits)
+    if preexec is not None:
+        preexec()
+
+
+def rusage_usage(rusage: Any, wall_seconds: float) -> Dict[str, float]:
+    """由os.wait4或resource.getrusage的结果构造资源用量"""
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "cpu_user_seconds": round(rusage.ru_utime, 3),
+        "cpu_system_seconds": round(rusage.ru_stime, 3),
+        # Linux上ru_maxrss的单位为KB
+        "max_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+    }
+
+
+class UsageSampler:
+    """定期采样进程树的CPU时间与常驻内存
+
+    进程由asyncio或subprocess回收时拿不到rusage，改为在运行期间采样：
+    CPU时间取最近一次采样（包括已被回收的子进程），常驻内存取各次采样的峰值。
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.cpu_user = 0.0
+        self.cpu_system = 0.0
+        self.max_rss = 0
+
+    def sample(self):
+        """采样一次，进程已结束时保留之前的结果"""
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+
+        user = system = 0.0
+        rss = 0
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    rss += proc.memory_info().rss
+            except psutil.Error:
+                continue
+            user += times.user + times.children_user
+            system += times.system + times.children_system
+        # 子进程结束后其CPU时间可能暂时不计入任何存活进程，取单调值
+        self.cpu_user = max(self.cpu_user, user)
+        self.cpu_system = max(self.cpu_system, system)
+        self.max_rss = max(self.max_rss, rss)
+
+    def usage(self, wall_seconds: float) -> Dict[str, float]:
+        """按采样结果构造资源用量"""
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_user_seconds": round(self.cpu_user, 3),
+            "cpu_system_seconds": round(self.cpu_system, 3),
+            "max_rss_mb": round(self.max_rss / MB, 1),
+        }
@@ -0,0 +1,187 @@
+"""CubQueue日志读取"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional
+
+# 反向查找行时每次读取的块大小
+BLOCK_SIZE = 64 * 1024
+
+# 按字节窗口读取时单次返回的最大字节数
+MAX_READ_BYTES = 1024 * 1024
+
+
+def tail_lines(
+    path: Path, lines: int, line_offset: int = 0, block_size: int = BLOCK_SIZE
+) -> Dict[str, Any]:
+    """从文件末尾反向按块读取最后若干行
+
+    开销只与返回的行数及line_offset有关，与文件总大小无关。
+
+    Args:
+        path: 文件路径
+        lines: 返回的行数，小于等于0时返回整个文件
+        line_offset: 跳过末尾的行数，用于向前翻页
+        block_size: 反向读取的块大小（字节）
+
+    Returns:
+        日志窗口，包含content（字节）、start、end与size
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        line_offset = max(0, line_offset)
+
+        if lines <= 0:
+            start = 0
+            end = size
+            if line_offset:
+                starts = _find_line_starts(f, size, line_offset, block_size)
+                end = starts[line_offset - 1] if len(starts) >= line_offset else 0
+        else:
+            count = lines + line_offset
+            starts = _find_line_starts(f, size, count, block_size)
+            start = starts[count - 1] if len(starts) >= count else 0
+            if line_offset == 0:
+                end = size
+            elif len(starts) >= line_offset:
+                end = starts[line_offset - 1]
+            else:
+                end = 0
+
+        f.seek(start)
+        content = f.read(max(0, end - start))
+
+    return {"content": content, "start": start, "end": end, "size": size}
+
+
+def read_range(path: Path, offset: int, max_bytes: int = MAX_READ_BYTES) -> Dict[str, Any]:
+    """按字节窗口读取文件
+
+    窗口末尾不完整的UTF-8字符会留到下一次读取。
+
+    Args:
+        path: 文件路径
+        offset: 起始字节偏移，负数表示相对文件末尾
+        max_bytes: 最多读取的字节数
+
+    Returns:
+        日志窗口，包含content（字节）、start、end与size
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        start = size + offset if offset < 0 else offset
+        start = min(max(0, start), size)
+
+        f.seek(start)
+        content = trim_partial_utf8(f.read(max(0, max_bytes)))
+
+    return {
+        "content": content,
+        "start": start,
+        "end": start + len(content),
+        "size": size,
+    }
+
+
+async def follow_log(
+    path: Path,
+    offset: int,
+    is_active: Callable[[], bool],
+    poll_interval: float = 0.5,
+    heartbeat_interval: float = 15,
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """持续读取文件新增的内容
+
+    通过stat轮询文件大小，只有文件增长时才读取新增的字节；
+    任务结束且没有新数据时停止。
+
+    Args:
+        path: 文件路径
+        offset: 起始字节偏移
+        is_active: 判断任务是否仍在运行的函数
+        poll_interval: 轮询间隔（秒）
+        heartbeat_interval: 无新数据时产生心跳的间隔（秒）
+
+    Yields:
+        日志窗口（同read_range）；长时间没有新数据时产生None作为心跳
+    """
+    loop = asyncio.get_running_loop()
+    last_yield = time.monotonic()
+    while True:
+        # 先记录任务状态再读取，避免丢失任务结束前最后写入的内容
+        active = is_active()
+
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            size = 0
+
+        if size > offset:
+            window = await loop.run_in_executor(None, read_range, path, offset)
+            if window["end"] > offset:
+                offset = window["end"]
+                last_yield = time.monotonic()
+                yield window
+                continue
+
+        if not active:
+            return
+
+        if time.monotonic() - last_yield >= heartbeat_interval:
+            last_yield = time.monotonic()
+            yield None
+        await asyncio.sleep(poll_interval)
+
+
+def trim_partial_utf8(data: bytes) -> bytes:
+    """去掉末尾不完整的UTF-8多字节字符
+
+    Args:
+        data: 字节数据
+
+    Returns:
+        以完整字符结尾的字节数据
+    """
+    # 从末尾最多回看3个字节，寻找多字节字符的起始字节
+    for i in range(1, min(4, len(data)) + 1):
+        byte = data[-i]
+        if byte & 0xC0 == 0x80:
+            # 后续字节，继续向前查找
+            continue
+        if byte & 0x80 == 0:
+            return data
+        if byte & 0xE0 == 0xC0:
+            expected = 2
+        elif byte & 0xF0 == 0xE0:
+            expected = 3
+        elif byte & 0xF8 == 0xF0:
+            expected = 4
+        else:
+            return data
+        return data if i >= expected else data[:-i]
+    return data
+
+
+def _find_line_starts(
+    f: BinaryIO, size: int, count: int, block_size: int
+) -> List[int]:
+    """从文件末尾向前查找最多count个行起始偏移（由近到远）"""
+    starts: List[int] = []
+    pos = size
+    while pos > 0 and len(starts) < count:
+        read_size = min(block_size, pos)
+        pos -= read_size
+        f.seek(pos)
+        block = f.read(read_size)
+
+        idx = len(block)
+        while len(starts) < count:
+            idx = block.rfind(b"\n", 0, idx)
+            if idx < 0:
+                break
+            # 文件末尾的换行符不开启新行
+            if pos + idx + 1 < size:
+                starts.append(pos + idx + 1)
+    return starts
@@ -1,6 +1,16 @@
 """CubQueue数据库模型"""
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    Text,
+    DateTime,
+    ForeignKey,
+    JSON,
+    Index,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,6 +27,18 @@ class Script(Base):
     name = Column(String(255), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=False)
     path = Column(String(500), nullable=False)
+    executor = Column(
+        String(20), nullable=False, default="subprocess", server_default="subprocess"
+    )  # subprocess, forkserver, ray, worker
+    preload = Column(JSON, nullable=True)  # fork-server预导入的模块列表
+    cpus = Column(Float, nullable=True)  # 每个任务需要的CPU数
+    memory_mb = Column(Integer, nullable=True)  # 每个任务需要的内存（MB）
+    timeout = Column(Integer, nullable=True)  # 每个任务的运行超时（秒），0表示不限制
+    cpu_time_limit = Column(Integer, nullable=True)  # 每个任务的CPU时间上限（秒）
+    memory_limit_mb = Column(Integer, nullable=True)  # 每个任务的地址空间上限（MB）
+    max_attempts = Column(Integer, nullable=True)  # 每个任务最多尝试的次数（包括第一次）
+    retry_backoff = Column(Float, nullable=True)  # 重试的基础退避间隔（秒），每次失败后翻倍
+    retry_on = Column(JSON(none_as_null=True), nullable=True)  # 重试的失败类别，为空时任何失败都重试
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -31,15 +53,45 @@ class Task(Base):
     """任务模型"""
 
     __tablename__ = "tasks"
+    __table_args__ = (
+        # 任务列表按(created_at, id)做键集分页，以下复合索引覆盖常用的过滤条件
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_script_id_created_at_id", "script_id", "created_at", "id"),
+        Index("ix_tasks_sweep_id_created_at_id", "sweep_id", "created_at", "id"),
+        # 远程worker按优先级与提交顺序租用等待中的任务
+        Index("ix_tasks_status_priority_created_at", "status", "priority", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, index=True)  # UUID
     script_id = Column(Integer, ForeignKey("scripts.id"), nullable=False)
+    sweep_id = Column(String(36), ForeignKey("sweeps.id"), nullable=True)  # 所属参数扫描
     status = Column(
         String(50), nullable=False, default="pending"
-    )  # pending, running, completed, failed, cancelled
+    )  # pending, running, completed, failed, timeout, cancelled
     args = Column(JSON, nullable=True)  # 任务参数
     description = Column(Text, nullable=True)  # 任务描述
+    priority = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )  # 优先级，数值越大越先启动
+    submitter = Column(String(100), nullable=True)  # 提交者，用于按提交者公平份额调度
+    cpus = Column(Float, nullable=True)  # 需要的CPU数，为空时使用脚本的声明
+    memory_mb = Column(Integer, nullable=True)  # 需要的内存（MB），为空时使用脚本的声明
+    timeout = Column(Integer, nullable=True)  # 运行超时（秒），为空时使用脚本的设置
+    cpu_time_limit = Column(Integer, nullable=True)  # CPU时间上限（秒），为空时使用脚本的设置
+    memory_limit_mb = Column(Integer, nullable=True)  # 地址空间上限（MB），为空时使用脚本的设置
+    max_attempts = Column(Integer, nullable=True)  # 最多尝试次数，为空时使用脚本的设置
+    retry_backoff = Column(Float, nullable=True)  # 重试的基础退避间隔（秒），为空时使用脚本的设置
+    retry_on = Column(JSON(none_as_null=True), nullable=True)  # 重试的失败类别，为空时使用脚本的设置
+    attempt = Column(
+        Integer, nullable=False, default=1, server_default="1"
+    )  # 当前（或最后一次）尝试的序号
+    retry_at = Column(DateTime, nullable=True)  # 等待重试的任务最早可以再次启动的时间
+    resource_usage = Column(JSON, nullable=True)  # 结束时记录的资源用量
     message = Column(Text, nullable=True)  # 状态消息
+    fingerprint = Column(String(64), nullable=True)  # 结果缓存指纹，未启用缓存时为空
+    worker_id = Column(String(100), nullable=True)  # 租用任务的远程worker
+    lease_expires_at = Column(DateTime, nullable=True)  # 租约到期时间
     created_at = Column(DateTime, default=datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
@@ -51,6 +103,76 @@ class Task(Base):
         return f"<Task(id='{self.id}', status='{self.status}')>"
 
 
+class Sweep(Base):
+    """参数扫描模型
+
+    由参数模板与扫描规格描述的一组任务，服务器按需逐批展开为任务。
+    """
+
+    __tablename__ = "sweeps"
+
+    id = Column(String(36), primary_key=True, index=True)  # UUID
+    script_id = Column(Integer, ForeignKey("scripts.id"), nullable=False)
+    mode = Column(String(20), nullable=False, default="cartesian")  # cartesian, zip
+    template = Column(JSON, nullable=False)  # 参数模板
+    spec = Column(JSON, nullable=False)  # 扫描规格：参数路径 -> 取值列表或range
+    shared_files = Column(JSON, nullable=True)  # 共享文件：[[文件名, SHA-256摘要], ...]
+    description = Column(Text, nullable=True)
+    priority = Column(Integer, nullable=False, default=0, server_default="0")  # 展开任务的优先级
+    submitter = Column(String(100), nullable=True)  # 展开任务的提交者
+    cpus = Column(Float, nullable=True)  # 展开任务需要的CPU数
+    memory_mb = Column(Integer, nullable=True)  # 展开任务需要的内存（MB）
+    timeout = Column(Integer, nullable=True)  # 展开任务的运行超时（秒）
+    cpu_time_limit = Column(Integer, nullable=True)  # 展开任务的CPU时间上限（秒）
+    memory_limit_mb = Column(Integer, nullable=True)  # 展开任务的地址空间上限（MB）
+    max_attempts = Column(Integer, nullable=True)  # 展开任务最多尝试的次数
+    retry_backoff = Column(Float, nullable=True)  # 展开任务重试的基础退避间隔（秒）
+    retry_on = Column(JSON(none_as_null=True), nullable=True)  # 展开任务重试的失败类别
+    total = Column(Integer, nullable=False)  # 展开后的任务总数
+    expanded = Column(Integer, nullable=False, default=0)  # 已展开的任务数
+    status = Column(
+        String(50), nullable=False, default="active"
+    )  # active, expanded, cancelled, failed
+    message = Column(Text, nullable=True)  # 展开失败的原因
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # 关联关系
+    script = relationship("Script")
+
+    def __repr__(self):
+        return f"<Sweep(id='{self.id}', status='{self.status}')>"
+
+
+class TaskAttempt(Base):
+    """任务的一次尝试
+
+    同一任务的各次尝试依次追加到任务日志中，log_start与log_end为本次尝试
+    在日志文件中的字节范围。
+    """
+
+    __tablename__ = "task_attempts"
+    __table_args__ = (Index("ix_task_attempts_task_id_attempt", "task_id", "attempt"),)
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String(36), ForeignKey("tasks.id"), nullable=False)
+    attempt = Column(Integer, nullable=False)  # 尝试序号，从1开始
+    status = Column(
+        String(50), nullable=False, default="running"
+    )  # running, completed, failed, timeout, cancelled
+    return_code = Column(Integer, nullable=True)
+    failure = Column(String(50), nullable=True)  # 失败类别：exit:N、signal:NAME、timeout或error
+    message = Column(Text, nullable=True)
+    worker_id = Column(String(100), nullable=True)  # 执行本次尝试的远程worker
+    log_start = Column(Integer, nullable=False, default=0)
+    log_end = Column(Integer, nullable=True)
+    resource_usage = Column(JSON, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<TaskAttempt(task_id='{self.task_id}', attempt={self.attempt})>"
+
+
 class TaskFile(Base):
     """任务文件模型"""
 
@@ -61,7 +183,24 @@ class TaskFile(Base):
     filename = Column(String(255), nullable=False)
     file_uuid = Column(String(36), nullable=False, unique=True)
     file_size = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=True)  # SHA-256
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<TaskFile(id={self.id}, filename='{self.filename}')>"
+
+
+class TaskCacheEntry(Base):
+    """任务结果缓存条目"""
+
+    __tablename__ = "task_cache"
+
+    fingerprint = Column(String(64), primary_key=True)  # 脚本、参数与输入文件的SHA-256指纹
+    task_id = Column(String(36), nullable=False)  # 产生该结果的任务
+    size = Column(Integer, nullable=False)  # 缓存文件总大小（字节）
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TaskCacheEntry(fingerprint='{self.fingerprint}', task_id='{self.task_id}')>"
@@ -0,0 +1,101 @@
+"""CubQueue任务状态通知"""
+
+import asyncio
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class TaskSubscription:
+    """对一组任务状态变化的订阅
+
+    只能在创建它的事件循环中读取；通知可以来自任意线程。
+    """
+
+    def __init__(self, task_ids: Iterable[str]):
+        """初始化订阅（需在事件循环线程中调用）
+
+        Args:
+            task_ids: 订阅的任务ID
+        """
+        self.task_ids: Set[str] = set(task_ids)
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """等待下一次状态变化
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            (任务ID, 新状态)，超时返回None
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _deliver(self, task_id: str, status: str):
+        """从任意线程投递状态变化"""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (task_id, status))
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+
+class TaskNotifier:
+    """进程内的任务状态变化通知中心
+
+    任务状态提交到数据库后由TaskManager发布，等待任务结束的请求通过订阅
+    被唤醒，而不需要反复查询数据库。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 任务ID -> 订阅集合
+        self._subscriptions: Dict[str, Set[TaskSubscription]] = {}
+
+    def subscribe(self, task_ids: Iterable[str]) -> TaskSubscription:
+        """订阅任务状态变化（需在事件循环线程中调用）
+
+        为避免遗漏通知，调用方应先订阅，再查询任务的当前状态。
+
+        Args:
+            task_ids: 任务ID
+
+        Returns:
+            订阅对象，使用完毕后需调用unsubscribe
+        """
+        subscription = TaskSubscription(task_ids)
+        with self._lock:
+            for task_id in subscription.task_ids:
+                self._subscriptions.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TaskSubscription):
+        """取消订阅
+
+        Args:
+            subscription: 订阅对象
+        """
+        with self._lock:
+            for task_id in subscription.task_ids:
+                subscriptions = self._subscriptions.get(task_id)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[task_id]
+
+    def publish(self, task_id: str, status: str):
+        """发布任务状态变化（可在任意线程中调用）
+
+        Args:
+            task_id: 任务ID
+            status: 新状态
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(task_id, ()))
+        for subscription in subscriptions:
+            subscription._deliver(task_id, status)
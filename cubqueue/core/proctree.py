@@ -0,0 +1,292 @@
+"""CubQueue任务进程树
+
+任务进程在独立的会话（进程组）中启动；主机提供可写的cgroup v2时，每个任务
+还放入单独的cgroup。终止任务时向整个进程组、cgroup中的所有进程，以及通过
+psutil枚举到的所有后代进程（包括自行调用setsid脱离了进程组的进程，例如
+MPI或Ray启动的进程）发送信号，任务结束后残留的进程也一并清理。
+没有cgroup时，取消或超时、以及正常退出后进程树中仍有进程时，还按环境变量
+CUBQUEUE_TASK_ID找出在两次枚举之间就已脱离根进程的后代进程；这需要遍历主机上
+的所有进程，因此不在每个任务正常结束时进行。
+"""
+
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+# 等待进程树退出时的轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 任务进程及其后代进程继承的任务ID环境变量
+TASK_ID_ENV = "CUBQUEUE_TASK_ID"
+
+
+class TaskCgroups:
+    """为每个任务创建cgroup v2子组
+
+    子组建立在服务器进程所在的cgroup之下（cubqueue-<服务器PID>/<任务键>），
+    需要该cgroup可写，例如以root运行或由systemd委派（Delegate=yes）。
+    不可用时所有方法退化为空操作，只依靠进程组与psutil枚举。
+    """
+
+    def __init__(self, enabled: bool = True):
+        """初始化
+
+        Args:
+            enabled: 是否尝试使用cgroup
+        """
+        self.root: Optional[Path] = _create_cgroup_root() if enabled else None
+
+    @property
+    def available(self) -> bool:
+        return self.root is not None
+
+    def create(self, key: str) -> Optional[str]:
+        """创建任务的cgroup
+
+        Args:
+            key: 任务键（任务ID）
+
+        Returns:
+            cgroup目录，不可用时为None
+        """
+        if self.root is None:
+            return None
+        path = self.root / key
+        try:
+            path.mkdir(exist_ok=True)
+        except OSError as e:
+            print(f"[WARN] 创建任务cgroup失败 {key}: {e}")
+            return None
+        return str(path)
+
+    def remove(self, path: Optional[str]):
+        """删除任务的cgroup（其中的进程都已结束时才能删除）"""
+        if path is None:
+            return
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    def close(self):
+        """删除所有任务cgroup与服务器的cgroup"""
+        if self.root is None:
+            return
+        try:
+            children = [child for child in self.root.iterdir() if child.is_dir()]
+        except OSError:
+            children = []
+        for child in children:
+            self.remove(str(child))
+        self.remove(str(self.root))
+
+
+def _create_cgroup_root() -> Optional[Path]:
+    """在服务器进程所在的cgroup v2之下创建cubqueue-<PID>，不可用时返回None"""
+    mount = None
+    try:
+        with open("/proc/self/mounts") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) > 2 and parts[2] == "cgroup2":
+                    mount = parts[1]
+                    break
+        with open("/proc/self/cgroup") as f:
+            current = next(
+                (line.strip()[3:] for line in f if line.startswith("0::")), None
+            )
+    except OSError:
+        return None
+    if mount is None or current is None:
+        return None
+
+    base = Path(mount) / current.lstrip("/")
+    # 把进程移入子组需要对共同祖先（即base）的cgroup.procs有写权限
+    if not os.access(base / "cgroup.procs", os.W_OK):
+        return None
+    _remove_stale_roots(base)
+    root = base / f"cubqueue-{os.getpid()}"
+    try:
+        root.mkdir(exist_ok=True)
+    except OSError:
+        return None
+    return root
+
+
+def _remove_stale_roots(base: Path):
+    """删除已退出（例如被强制结束）的服务器留下的空cgroup"""
+    for root in base.glob("cubqueue-*"):
+        try:
+            if psutil.pid_exists(int(root.name.split("-", 1)[1])):
+                continue
+            for child in root.iterdir():
+                if child.is_dir():
+                    os.rmdir(child)
+            os.rmdir(root)
+        except (OSError, ValueError):
+            pass
+
+
+def join_cgroup(path: Optional[str]):
+    """将当前进程移入cgroup（在fork之后、运行脚本之前调用）"""
+    if path is None:
+        return
+    with open(os.path.join(path, "cgroup.procs"), "w") as f:
+        f.write(str(os.getpid()))
+
+
+def chain_preexec(*funcs: Optional[Callable[[], None]]) -> Optional[Callable[[], None]]:
+    """将多个preexec_fn依次组合，全部为None时返回None"""
+    funcs = [func for func in funcs if func is not None]
+    if not funcs:
+        return None
+
+    def run():
+        for func in funcs:
+            func()
+
+    return run
+
+
+class ProcessTree:
+    """一个任务的进程树：根进程、其进程组、cgroup以及所有已知的后代进程
+
+    根进程结束后，它的子进程被过继给init，无法再从根进程找到，因此运行期间
+    需要定期调用refresh记录后代进程。根进程本身由启动它的一方等待与回收，
+    这里不会对根进程调用wait，避免抢先回收其退出码。
+    """
+
+    def __init__(
+        self, pid: int, cgroup: Optional[str] = None, task_id: Optional[str] = None
+    ):
+        """初始化
+
+        Args:
+            pid: 根进程PID，根进程在独立的会话中启动，进程组ID即为其PID
+            cgroup: 任务的cgroup目录，None表示未使用cgroup
+            task_id: 任务ID，未使用cgroup时按环境变量TASK_ID_ENV查找后代进程
+        """
+        self.pid = pid
+        self.cgroup = cgroup
+        self.task_id = task_id
+        # 已知的后代进程，psutil.Process按PID与创建时间识别，PID被复用时不会误认
+        self._known: Dict[int, psutil.Process] = {}
+
+    def refresh(self):
+        """记录根进程当前的所有后代进程"""
+        try:
+            children = psutil.Process(self.pid).children(recursive=True)
+        except psutil.Error:
+            return
+        for proc in children:
+            self._known.setdefault(proc.pid, proc)
+
+    def _find_marked(self):
+        """按任务ID环境变量记录已过继给init的后代进程（遍历所有进程，只在发送信号时调用）"""
+        if self.task_id is None or self.cgroup is not None:
+            return
+        for proc in psutil.process_iter():
+            if proc.pid == self.pid or proc.pid in self._known:
+                continue
+            try:
+                if proc.environ().get(TASK_ID_ENV) == self.task_id:
+                    self._known[proc.pid] = proc
+            except psutil.Error:
+                pass
+
+    def members(self) -> List[psutil.Process]:
+        """仍在运行的后代进程与cgroup中的进程（不含根进程）"""
+        self.refresh()
+        procs = dict(self._known)
+        for pid in self._cgroup_pids():
+            if pid != self.pid and pid not in procs:
+                try:
+                    procs[pid] = psutil.Process(pid)
+                except psutil.Error:
+                    pass
+
+        alive = []
+        for pid, proc in procs.items():
+            try:
+                if proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE:
+                    alive.append(proc)
+                    continue
+            except psutil.Error:
+                pass
+            self._known.pop(pid, None)
+        return alive
+
+    def signal(self, signum: int):
+        """向进程组、cgroup与所有后代进程发送信号（根进程由调用方处理）"""
+        self._find_marked()
+        if signum == signal.SIGKILL and self.cgroup is not None:
+            # cgroup.kill（Linux 5.14起）原子地结束cgroup中的所有进程，包括正在fork的进程
+            try:
+                with open(os.path.join(self.cgroup, "cgroup.kill"), "w") as f:
+                    f.write("1")
+            except OSError:
+                pass
+        try:
+            os.killpg(self.pid, signum)
+        except OSError:
+            pass
+        for proc in self.members():
+            try:
+                proc.send_signal(signum)
+            except psutil.Error:
+                pass
+
+    def alive(self) -> bool:
+        """除已结束的根进程外，树中是否还有进程在运行"""
+        try:
+            # 进程组中没有任何进程时killpg返回ESRCH
+            os.killpg(self.pid, 0)
+            group_alive = True
+        except OSError:
+            group_alive = False
+        return group_alive or bool(self.members())
+
+    def wait(self, timeout: float) -> bool:
+        """等待树中所有进程结束
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否都已结束
+        """
+        deadline = time.monotonic() + timeout
+        while self.alive():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def terminate(self, grace_period: float):
+        """清理树中剩余的进程：先发送SIGTERM，超过宽限期后发送SIGKILL（阻塞）
+
+        进程组与已知的后代进程都已结束时直接返回，不遍历主机上的所有进程；
+        仍有进程时由signal按环境变量补充查找。
+
+        Args:
+            grace_period: 发送SIGTERM后等待进程退出的时间（秒）
+        """
+        if not self.alive():
+            return
+        self.signal(signal.SIGTERM)
+        if not self.wait(grace_period):
+            self.signal(signal.SIGKILL)
+            self.wait(grace_period)
+
+    def _cgroup_pids(self) -> List[int]:
+        if self.cgroup is None:
+            return []
+        try:
+            with open(os.path.join(self.cgroup, "cgroup.procs")) as f:
+                return [int(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return []
@@ -0,0 +1,225 @@
+"""CubQueue主机资源准入控制"""
+
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import psutil
+
+MB = 1024 * 1024
+
+
+class ResourceDemand(NamedTuple):
+    """任务声明的资源需求"""
+
+    cpus: float
+    memory_mb: int
+
+
+class ResourceMonitor:
+    """按任务声明的CPU与内存需求决定能否启动新任务
+
+    任务启动前需同时满足：
+
+    - 声明量：运行中任务声明的CPU与内存之和加上新任务的需求不超过主机容量；
+    - 实时读数：psutil读取的可用内存减去保留量后，足以容纳新任务以及运行中任务
+      尚未用到的声明内存（刚启动的任务还没有分配内存）；最近一次采样的空闲CPU
+      减去此后启动的任务的需求，足以容纳新任务。
+
+    运行中任务进程树的常驻内存与CPU使用率一起在采样线程中读取，
+    准入判断只使用缓存的读数，不在持有锁时遍历/proc。
+
+    内存从不超额分配：需求超过主机容量的任务不能启动。CPU需求超过主机核数时
+    按主机核数计；没有运行中的任务时不检查实时CPU读数，避免其他进程长期占满
+    CPU时任务永远无法启动。只声明内存（CPU需求为0）的任务不检查CPU。
+    """
+
+    def __init__(
+        self,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        memory_reserve_mb: int = 512,
+        pid_lookup: Optional[Callable[[str], Optional[int]]] = None,
+        interval: float = 2.0,
+    ):
+        """初始化
+
+        Args:
+            cpus: 可分配给任务的CPU数，None表示主机逻辑CPU数
+            memory_mb: 可分配给任务的内存（MB），None表示主机总内存减去保留量
+            memory_reserve_mb: 为系统与服务器保留、不分配给任务的内存（MB）
+            pid_lookup: 由任务ID查询运行中任务进程PID的函数
+            interval: CPU与内存采样间隔（秒）
+        """
+        self.interval = interval
+        self.memory_reserve_mb = memory_reserve_mb
+        self.total_cpus = float(cpus or psutil.cpu_count() or 1)
+        self.total_memory_mb = int(
+            memory_mb or psutil.virtual_memory().total // MB - memory_reserve_mb
+        )
+        self._pid_lookup = pid_lookup
+
+        self._lock = threading.Lock()
+        # 运行中任务的声明需求
+        self._reserved: Dict[str, ResourceDemand] = {}
+        self._reserved_cpus = 0.0
+        self._reserved_memory_mb = 0
+        # 最近一次CPU采样的空闲CPU数，以及此后启动的任务声明的CPU数
+        self._idle_cpus = self.total_cpus
+        self._cpus_since_sample = 0.0
+        # 采样次数，用于区分任务在最近一次采样之前还是之后启动
+        self._generation = 0
+        self._started_generation: Dict[str, int] = {}
+        # 最近一次采样时运行中任务进程树的常驻内存（MB），尚未采样的任务视为0
+        self._rss_mb: Dict[str, int] = {}
+        psutil.cpu_percent(interval=None)
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_sample: Callable[[], None]):
+        """启动采样线程
+
+        实时读数变化（例如其他进程释放了内存）不会产生任何事件，
+        每次采样后调用on_sample重新尝试启动等待资源的任务。
+
+        Args:
+            on_sample: 采样后调用的函数
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.sample()
+                    on_sample()
+                except Exception as e:
+                    print(f"[ERROR] 资源采样失败: {e}")
+
+        self._thread = threading.Thread(
+            target=run, name="cubqueue-resources", daemon=True
+        )
+        self._thread.start()
+
+    def check_demand(self, demand: ResourceDemand) -> Optional[str]:
+        """检查需求能否在本机满足
+
+        Returns:
+            不能满足的原因，可以满足时为None
+        """
+        if demand.memory_mb > self.total_memory_mb:
+            return (
+                f"任务需要 {demand.memory_mb}MB 内存，"
+                f"超过主机可分配的 {self.total_memory_mb}MB"
+            )
+        return None
+
+    def try_reserve(self, task_id: str, demand: ResourceDemand) -> bool:
+        """资源足够时为任务预留资源
+
+        Args:
+            task_id: 任务ID
+            demand: 资源需求
+
+        Returns:
+            是否已预留
+        """
+        cpus = min(demand.cpus, self.total_cpus)
+        with self._lock:
+            if self._reserved_cpus + cpus > self.total_cpus + 1e-9:
+                return False
+            if self._reserved_memory_mb + demand.memory_mb > self.total_memory_mb:
+                return False
+            if (
+                cpus
+                and self._reserved
+                and cpus > self._idle_cpus - self._cpus_since_sample + 1e-9
+            ):
+                return False
+            available_mb = psutil.virtual_memory().available // MB - self.memory_reserve_mb
+            if demand.memory_mb + self._unrealized_memory_mb() > available_mb:
+                return False
+
+            self._reserved[task_id] = ResourceDemand(cpus, demand.memory_mb)
+            self._started_generation[task_id] = self._generation
+            self._reserved_cpus += cpus
+            self._reserved_memory_mb += demand.memory_mb
+            self._cpus_since_sample += cpus
+            return True
+
+    def release(self, task_id: str):
+        """释放任务预留的资源"""
+        with self._lock:
+            demand = self._reserved.pop(task_id, None)
+            if demand is None:
+                return
+            # 结束的任务让出的CPU立即计为空闲，不必等到下一次采样
+            if self._started_generation.pop(task_id) == self._generation:
+                self._cpus_since_sample -= demand.cpus
+            else:
+                self._idle_cpus = min(self.total_cpus, self._idle_cpus + demand.cpus)
+            self._rss_mb.pop(task_id, None)
+            self._reserved_cpus -= demand.cpus
+            self._reserved_memory_mb -= demand.memory_mb
+            if not self._reserved:
+                self._reserved_cpus = 0.0
+                self._reserved_memory_mb = 0
+
+    def sample(self):
+        """采样CPU使用率与运行中任务的常驻内存（定期调用）"""
+        with self._lock:
+            task_ids = [
+                task_id for task_id, demand in self._reserved.items() if demand.memory_mb
+            ]
+        # 遍历进程树需要扫描/proc，在锁外进行
+        rss_mb = {}
+        for task_id in task_ids:
+            pid = self._pid_lookup(task_id) if self._pid_lookup else None
+            if pid:
+                rss_mb[task_id] = _tree_rss(pid) // MB
+        percent = psutil.cpu_percent(interval=None)
+        with self._lock:
+            # 采样期间结束的任务不再记录
+            self._rss_mb = {
+                task_id: rss for task_id, rss in rss_mb.items() if task_id in self._reserved
+            }
+            self._idle_cpus = self.total_cpus * (1 - percent / 100)
+            self._cpus_since_sample = 0.0
+            self._generation += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取资源容量、预留量与实时读数"""
+        memory = psutil.virtual_memory()
+        with self._lock:
+            return {
+                "total_cpus": self.total_cpus,
+                "reserved_cpus": self._reserved_cpus,
+                "idle_cpus": max(0.0, self._idle_cpus),
+                "total_memory_mb": self.total_memory_mb,
+                "reserved_memory_mb": self._reserved_memory_mb,
+                "available_memory_mb": memory.available // MB,
+            }
+
+    def _unrealized_memory_mb(self) -> int:
+        """运行中任务声明但尚未使用的内存，使用最近一次采样的读数（调用方需持有锁）"""
+        total = 0
+        for task_id, demand in self._reserved.items():
+            if demand.memory_mb:
+                total += max(0, demand.memory_mb - self._rss_mb.get(task_id, 0))
+        return total
+
+
+def _tree_rss(pid: int) -> int:
+    """进程及其所有子进程的常驻内存（字节）"""
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+    rss = 0
+    for proc in processes:
+        try:
+            rss += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
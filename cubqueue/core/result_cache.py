@@ -0,0 +1,240 @@
+"""CubQueue任务结果缓存"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from .database import DatabaseManager
+from .models import TaskCacheEntry
+
+# 缓存的任务目录内容：结果文件、中间文件与日志
+CACHED_ENTRIES = ("output", "metadata", "log.txt")
+
+
+def compute_fingerprint(
+    script_path: Path, args: Any, files: List[Tuple[str, str]]
+) -> str:
+    """计算任务指纹
+
+    指纹由脚本内容、规范化的参数（键排序、紧凑格式）与按占位符编号排列的
+    输入文件名及SHA-256摘要共同决定。
+
+    Args:
+        script_path: 脚本文件路径
+        args: 任务参数（文件占位符替换之前）
+        files: 输入文件列表，每项为(文件名, SHA-256摘要)，依次对应<file1>、<file2>等
+
+    Returns:
+        SHA-256十六进制指纹
+    """
+    with open(script_path, "rb") as f:
+        script_digest = hashlib.sha256(f.read()).hexdigest()
+    canonical = json.dumps(
+        {
+            "script": script_digest,
+            "args": args,
+            "files": [[filename, digest.lower()] for filename, digest in files],
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """按任务指纹缓存已完成任务的结果
+
+    任务成功完成后，其结果文件、中间文件与日志通过硬链接保存到
+    result_cache/<指纹>/，之后指纹相同的任务直接从缓存链接结果而不运行。
+    缓存与任务目录共享文件内容，不额外占用磁盘；删除原任务后缓存仍然有效。
+    超过有效期的条目在查找时删除，总大小超过上限时按最近使用时间淘汰。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        db_manager: DatabaseManager,
+        ttl: float,
+        max_bytes: int,
+    ):
+        """初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            db_manager: 数据库管理器
+            ttl: 缓存有效期（秒）
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_manager = db_manager
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+
+        # 清理中断的保存留下的临时目录
+        for tmp_dir in self.cache_dir.glob("*.tmp"):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def restore(self, fingerprint: str, task_dir: Path) -> Optional[str]:
+        """查找缓存并将结果链接到任务目录
+
+        Args:
+            fingerprint: 任务指纹
+            task_dir: 目标任务目录
+
+        Returns:
+            产生该结果的任务ID，未命中时返回None
+        """
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                entry = (
+                    db.query(TaskCacheEntry)
+                    .filter(TaskCacheEntry.fingerprint == fingerprint)
+                    .first()
+                )
+                if entry is None:
+                    return None
+
+                entry_dir = self.cache_dir / fingerprint
+                if entry.created_at < self._expiry() or not entry_dir.is_dir():
+                    db.delete(entry)
+                    db.commit()
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    return None
+
+                for name in CACHED_ENTRIES:
+                    src = entry_dir / name
+                    dst = task_dir / name
+                    if src.is_dir():
+                        _link_tree(src, dst)
+                    elif src.exists():
+                        _link_file(src, dst)
+
+                entry.hits += 1
+                entry.last_used_at = datetime.utcnow()
+                db.commit()
+                return entry.task_id
+            finally:
+                db.close()
+
+    def store(self, fingerprint: str, task_id: str, task_dir: Path):
+        """保存已完成任务的结果
+
+        Args:
+            fingerprint: 任务指纹
+            task_id: 任务ID
+            task_dir: 任务目录
+        """
+        entry_dir = self.cache_dir / fingerprint
+        tmp_dir = self.cache_dir / f"{fingerprint}.{uuid.uuid4().hex}.tmp"
+        tmp_dir.mkdir()
+        try:
+            for name in CACHED_ENTRIES:
+                src = task_dir / name
+                if src.is_dir():
+                    _link_tree(src, tmp_dir / name)
+                elif src.exists():
+                    _link_file(src, tmp_dir / name)
+            size = sum(p.stat().st_size for p in tmp_dir.rglob("*") if p.is_file())
+
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+
+                db = self.db_manager.get_session()
+                try:
+                    now = datetime.utcnow()
+                    entry = db.get(TaskCacheEntry, fingerprint)
+                    if entry is None:
+                        entry = TaskCacheEntry(fingerprint=fingerprint, hits=0)
+                        db.add(entry)
+                    entry.task_id = task_id
+                    entry.size = size
+                    entry.created_at = now
+                    entry.last_used_at = now
+                    db.commit()
+                    self._evict(db)
+                finally:
+                    db.close()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def get_usage(self) -> Dict[str, Any]:
+        """获取缓存使用情况
+
+        Returns:
+            条目数、总大小与累计命中次数
+        """
+        db = self.db_manager.get_session()
+        try:
+            count, size, hits = db.query(
+                func.count(TaskCacheEntry.fingerprint),
+                func.coalesce(func.sum(TaskCacheEntry.size), 0),
+                func.coalesce(func.sum(TaskCacheEntry.hits), 0),
+            ).one()
+            return {"entries": count, "size": size, "hits": hits}
+        finally:
+            db.close()
+
+    def _expiry(self) -> datetime:
+        """早于该时间创建的条目已过期"""
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def _evict(self, db):
+        """删除过期条目，并在总大小超过上限时按LRU淘汰（调用方需持有锁）"""
+        expired = (
+            db.query(TaskCacheEntry)
+            .filter(TaskCacheEntry.created_at < self._expiry())
+            .all()
+        )
+        removed = list(expired)
+
+        total = (
+            db.query(func.coalesce(func.sum(TaskCacheEntry.size), 0)).scalar()
+            - sum(entry.size for entry in expired)
+        )
+        if total > self.max_bytes:
+            expired_keys = {entry.fingerprint for entry in expired}
+            for entry in db.query(TaskCacheEntry).order_by(TaskCacheEntry.last_used_at):
+                if total <= self.max_bytes:
+                    break
+                if entry.fingerprint in expired_keys:
+                    continue
+                removed.append(entry)
+                total -= entry.size
+
+        if not removed:
+            return
+        for entry in removed:
+            db.delete(entry)
+        db.commit()
+        for entry in removed:
+            shutil.rmtree(self.cache_dir / entry.fingerprint, ignore_errors=True)
+
+
+def _link_file(src: Path, dst: Path):
+    """创建硬链接，文件系统不支持时退化为复制"""
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copy2(src, dst)
+
+
+def _link_tree(src: Path, dst: Path):
+    """以硬链接的方式复制目录"""
+    shutil.copytree(src, dst, copy_function=_link_file, dirs_exist_ok=True)
@@ -0,0 +1,182 @@
+"""CubQueue任务失败分类与自动重试
+
+失败的任务按结束方式分类：
+
+- exit:N：脚本以非零退出码N退出；
+- signal:SIGNAME：脚本被信号终止（例如被OOM killer以SIGKILL结束）；
+- timeout：超过运行超时被终止；
+- error：脚本未能启动或执行后端出错。
+
+重试策略由脚本设置、提交任务时覆盖：最多尝试次数（包括第一次）、指数退避的
+基础间隔，以及只在哪些失败类别时重试（为空时任何失败都重试）。取消与服务器
+关闭中断的任务不会重试。
+"""
+
+import heapq
+import random
+import signal
+import threading
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# 退避间隔的随机抖动比例，避免同时失败的任务（例如数据库被锁）同时重试
+BACKOFF_JITTER = 0.2
+
+# 除退出码与信号之外可以作为重试条件的失败类别
+FAILURE_CLASSES = ("timeout", "error")
+
+
+class RetryPolicy(NamedTuple):
+    """任务生效的重试策略"""
+
+    max_attempts: int
+    backoff: float
+    retry_on: Optional[List[str]]
+
+    def should_retry(self, attempt: int, failure: Optional[str]) -> bool:
+        """第attempt次尝试以failure失败后是否重试"""
+        if failure is None or attempt >= self.max_attempts:
+            return False
+        return not self.retry_on or failure in self.retry_on
+
+    def delay(self, attempt: int, max_delay: float) -> float:
+        """第attempt次尝试失败后到下一次尝试的等待时间（秒）
+
+        Args:
+            attempt: 失败的尝试序号（从1开始）
+            max_delay: 等待时间上限（秒）
+        """
+        delay = min(max_delay, self.backoff * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+
+class RetryQueue:
+    """等待退避结束的任务，到期后交给回调重新提交
+
+    所有等待重试的任务共用一个后台线程与一个按到期时间排序的堆，
+    大量任务同时失败时不会为每个任务创建计时器线程。
+    """
+
+    def __init__(self, submit: Callable[[List[str]], None]):
+        """初始化
+
+        Args:
+            submit: 重新提交到期任务的函数，参数为任务ID列表
+        """
+        self._submit = submit
+        self._cond = threading.Condition()
+        # (到期时间（time.monotonic）, 任务ID)
+        self._heap: List[Tuple[float, str]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, task_id: str, delay: float):
+        """在delay秒后重新提交任务"""
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + max(0.0, delay), task_id))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="cubqueue-retry", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[1])
+            try:
+                self._submit(due)
+            except Exception as e:
+                print(f"[ERROR] 重新提交重试任务失败: {e}")
+
+
+def classify_failure(return_code: Optional[int], reason: str) -> Optional[str]:
+    """任务结束方式的失败类别
+
+    Args:
+        return_code: 进程退出码，负数表示被信号终止
+        reason: 结束原因（exited、timeout、cancelled、shutdown或error）
+
+    Returns:
+        失败类别，成功结束、被取消或服务器关闭时为None
+    """
+    if reason in ("timeout", "error"):
+        return reason
+    if reason != "exited" or return_code == 0:
+        return None
+    if return_code is None:
+        return "error"
+    if return_code < 0:
+        return f"signal:{_signal_name(-return_code)}"
+    return f"exit:{return_code}"
+
+
+def parse_retry_on(value: Union[str, Iterable[str], None]) -> Optional[List[str]]:
+    """解析重试条件
+
+    每项可以是退出码（1或exit:1）、信号（SIGKILL、KILL、signal:9或-9），
+    或timeout、error；字符串形式以逗号分隔。
+
+    Args:
+        value: 重试条件
+
+    Returns:
+        规范化的失败类别列表，为空时返回None（任何失败都重试）
+
+    Raises:
+        ValueError: 无法识别的条件
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    classes = []
+    for item in value:
+        item = str(item).strip()
+        if not item:
+            continue
+        failure = _parse_failure(item)
+        if failure not in classes:
+            classes.append(failure)
+    return classes or None
+
+
+def _parse_failure(item: str) -> str:
+    """将单个重试条件规范化为失败类别"""
+    lowered = item.lower()
+    if lowered in FAILURE_CLASSES:
+        return lowered
+    kind, _, name = item.rpartition(":")
+    kind = kind.lower()
+    if kind not in ("", "exit", "signal"):
+        raise ValueError(f"无效的重试条件: {item}")
+    try:
+        number = int(name)
+    except ValueError:
+        if kind == "exit":
+            raise ValueError(f"无效的重试条件: {item}")
+        return f"signal:{_signal_name(name)}"
+    if kind == "signal" or number < 0:
+        return f"signal:{_signal_name(abs(number))}"
+    if number == 0:
+        raise ValueError(f"退出码0表示成功，不能作为重试条件: {item}")
+    return f"exit:{number}"
+
+
+def _signal_name(value: Union[int, str]) -> str:
+    """信号编号或名称（可省略SIG前缀）的规范名称，例如SIGKILL"""
+    try:
+        if isinstance(value, int):
+            return signal.Signals(value).name
+        name = value.upper()
+        return signal.Signals[name if name.startswith("SIG") else f"SIG{name}"].name
+    except (KeyError, ValueError):
+        if isinstance(value, int):
+            return f"SIG{value}"
+        raise ValueError(f"未知的信号: {value}")
@@ -0,0 +1,313 @@
+"""CubQueue任务调度器"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from .resources import ResourceDemand, ResourceMonitor
+
+# 未指定分组的任务所属的分组
+DEFAULT_GROUP = ""
+
+
+class _Group:
+    """公平份额调度中的一个分组（脚本或提交者）"""
+
+    __slots__ = ("name", "weight", "heap", "pass_", "version", "queued")
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        # 等待中的任务：(-优先级, 序号, 任务ID)
+        self.heap: List[Tuple[int, int, str]] = []
+        # 步幅调度的行程值，每启动一个任务增加1/weight
+        self.pass_ = 0.0
+        # 分组在就绪堆中的有效条目版本，旧版本的条目在出堆时丢弃
+        self.version = 0
+        self.queued = 0
+
+
+class TaskScheduler:
+    """有界并发、按优先级与加权公平份额调度的任务调度器
+
+    提交的任务先进入等待队列（任务状态保持为pending），调度器只在运行中的
+    任务数小于并发上限时才取出任务交给launcher启动，运行中的任务结束后
+    再从队列中补充新任务。
+
+    出队顺序：优先级高的任务先启动；优先级相同时，在各分组（脚本或提交者）
+    之间按权重做步幅调度（stride scheduling），每个分组得到与权重成比例的
+    启动机会，大批量提交的分组不会让其他分组的少量任务长时间等待；同一分组内
+    相同优先级的任务按提交顺序启动。每个分组内部是一个堆，各分组的队首再组成
+    一个就绪堆，入队与出队均为O(log n)。
+
+    配置了资源监视器时，排在最前的任务还需要主机有足够的CPU与内存才会启动；
+    资源不足时后面的任务也继续等待，需求大的任务不会被小任务一直插队。
+    """
+
+    def __init__(
+        self,
+        max_concurrent_tasks: int,
+        launcher: Callable[[str], None],
+        weights: Optional[Dict[str, float]] = None,
+        resources: Optional[ResourceMonitor] = None,
+    ):
+        """初始化调度器
+
+        Args:
+            max_concurrent_tasks: 最大并发任务数
+            launcher: 启动任务的回调函数，参数为任务ID
+            weights: 分组名称 -> 公平份额权重，未列出的分组权重为1
+            resources: 资源监视器，None表示只限制并发数
+        """
+        self.max_concurrent_tasks = max(1, int(max_concurrent_tasks))
+        self._launcher = launcher
+        self.weights = dict(weights or {})
+        self.resources = resources
+
+        self._lock = threading.Lock()
+        self._groups: Dict[str, _Group] = {}
+        # 就绪堆：(-队首优先级, 分组行程值, 版本, 分组名称)
+        self._ready: List[Tuple[int, float, int, str]] = []
+        # 等待中的任务：任务ID -> (入队时间, 分组名称, 序号, 资源需求)
+        self._queued: Dict[str, Tuple[float, str, int, Optional[ResourceDemand]]] = {}
+        # 按入队顺序记录的(入队时间, 任务ID, 序号)，用于计算最长等待时间
+        self._arrivals: Deque[Tuple[float, str, int]] = deque()
+        self._running: Set[str] = set()
+        self._seq = itertools.count()
+        # 全局虚拟时间：最近一次出队的分组行程值，空闲后重新活跃的分组从这里开始
+        self._virtual_time = 0.0
+
+        # 最近出队任务的等待时间（秒），用于统计
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        # 关闭后不再启动新任务
+        self._closed = False
+
+    def submit(
+        self,
+        task_id: str,
+        priority: int = 0,
+        group: str = DEFAULT_GROUP,
+        demand: Optional[ResourceDemand] = None,
+    ):
+        """将任务加入等待队列并尝试调度
+
+        Args:
+            task_id: 任务ID
+            priority: 优先级，数值越大越先启动
+            group: 公平份额分组
+            demand: 资源需求，None表示不占用资源
+        """
+        self.submit_many([(task_id, priority, group, demand)])
+
+    def submit_many(
+        self, entries: Iterable[Tuple[str, int, str, Optional[ResourceDemand]]]
+    ):
+        """按顺序将一批任务加入等待队列并尝试调度
+
+        Args:
+            entries: (任务ID, 优先级, 分组, 资源需求)列表
+        """
+        with self._lock:
+            now = time.time()
+            for task_id, priority, group, demand in entries:
+                if task_id in self._queued or task_id in self._running:
+                    continue
+                self._push(
+                    task_id, int(priority or 0), group or DEFAULT_GROUP, demand, now
+                )
+
+        self.dispatch()
+
+    def remove(self, task_id: str) -> bool:
+        """从等待队列中移除任务
+
+        堆中的条目在到达队首时才被丢弃，移除操作为O(1)。
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            任务是否在等待队列中
+        """
+        with self._lock:
+            entry = self._queued.pop(task_id, None)
+            if entry is None:
+                return False
+            self._groups[entry[1]].queued -= 1
+            return True
+
+    def task_finished(self, task_id: str):
+        """标记运行中的任务已结束，并补充新任务
+
+        Args:
+            task_id: 任务ID
+        """
+        with self._lock:
+            self._running.discard(task_id)
+            if self.resources is not None:
+                self.resources.release(task_id)
+
+        self.dispatch()
+
+    def is_queued(self, task_id: str) -> bool:
+        """任务是否在等待队列中"""
+        with self._lock:
+            return task_id in self._queued
+
+    def is_running(self, task_id: str) -> bool:
+        """任务是否已被调度运行"""
+        with self._lock:
+            return task_id in self._running
+
+    def close(self):
+        """停止启动新任务（服务器关闭时调用），等待中的任务保留在队列中"""
+        with self._lock:
+            self._closed = True
+
+    def dispatch(self):
+        """在并发上限内启动等待队列中的任务"""
+        while True:
+            with self._lock:
+                if self._closed or len(self._running) >= self.max_concurrent_tasks:
+                    return
+                group = self._peek()
+                if group is None:
+                    return
+                task_id = group.heap[0][2]
+                enqueued_at, _, _, demand = self._queued[task_id]
+                if (
+                    self.resources is not None
+                    and demand is not None
+                    and not self.resources.try_reserve(task_id, demand)
+                ):
+                    return
+                self._take(group)
+                del self._queued[task_id]
+                self._running.add(task_id)
+                self._wait_times.append(time.time() - enqueued_at)
+
+            try:
+                self._launcher(task_id)
+            except Exception as e:
+                print(f"[ERROR] 启动任务失败 {task_id}: {e}")
+                with self._lock:
+                    self._running.discard(task_id)
+                    if self.resources is not None:
+                        self.resources.release(task_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度队列统计信息
+
+        Returns:
+            队列深度、运行数、各分组排队数与等待时间统计
+        """
+        now = time.time()
+        with self._lock:
+            # 丢弃已出队或已移除的到达记录
+            while self._arrivals and self._queued.get(
+                self._arrivals[0][1], (None, None, None, None)
+            )[2] != self._arrivals[0][2]:
+                self._arrivals.popleft()
+            oldest = self._arrivals[0][0] if self._arrivals else None
+            wait_times = list(self._wait_times)
+            return {
+                "max_concurrent_tasks": self.max_concurrent_tasks,
+                "running": len(self._running),
+                "queued": len(self._queued),
+                "queued_by_group": {
+                    group.name: group.queued
+                    for group in self._groups.values()
+                    if group.queued
+                },
+                "oldest_wait_seconds": (now - oldest) if oldest is not None else 0.0,
+                "avg_wait_seconds": (
+                    sum(wait_times) / len(wait_times) if wait_times else 0.0
+                ),
+                "max_wait_seconds": max(wait_times) if wait_times else 0.0,
+            }
+
+    def _push(
+        self,
+        task_id: str,
+        priority: int,
+        group_name: str,
+        demand: Optional[ResourceDemand],
+        now: float,
+    ):
+        """将任务放入分组堆（调用方需持有锁）"""
+        group = self._groups.get(group_name)
+        if group is None:
+            group = _Group(group_name, float(self.weights.get(group_name, 1.0)))
+            self._groups[group_name] = group
+
+        self._prune(group)
+        was_idle = not group.heap
+        if was_idle:
+            # 空闲期间不积累份额
+            group.pass_ = max(group.pass_, self._virtual_time)
+
+        seq = next(self._seq)
+        entry = (-priority, seq, task_id)
+        heapq.heappush(group.heap, entry)
+        group.queued += 1
+        self._queued[task_id] = (now, group_name, seq, demand)
+        self._arrivals.append((now, task_id, seq))
+
+        # 队首发生变化时重新登记到就绪堆
+        if was_idle or group.heap[0] is entry:
+            self._publish(group)
+
+    def _peek(self) -> Optional[_Group]:
+        """按优先级与公平份额找出下一个任务所在的分组（调用方需持有锁）
+
+        返回的分组在就绪堆顶，其堆顶即为下一个任务。
+        """
+        while self._ready:
+            neg_priority, _, version, group_name = self._ready[0]
+            group = self._groups[group_name]
+            if version != group.version:
+                heapq.heappop(self._ready)
+                continue
+            self._prune(group)
+            if not group.heap:
+                heapq.heappop(self._ready)
+                continue
+            if group.heap[0][0] != neg_priority:
+                # 队首任务已被移除，按新的队首重新排序
+                heapq.heappop(self._ready)
+                self._publish(group)
+                continue
+            return group
+        return None
+
+    def _take(self, group: _Group) -> str:
+        """取出_peek返回的分组的队首任务（调用方需持有锁）"""
+        heapq.heappop(self._ready)
+        _, _, task_id = heapq.heappop(group.heap)
+        group.queued -= 1
+        self._virtual_time = group.pass_
+        group.pass_ += 1.0 / max(group.weight, 1e-6)
+        self._prune(group)
+        if group.heap:
+            self._publish(group)
+        return task_id
+
+    def _publish(self, group: _Group):
+        """将分组的当前队首登记到就绪堆，使旧条目失效"""
+        group.version += 1
+        heapq.heappush(
+            self._ready, (group.heap[0][0], group.pass_, group.version, group.name)
+        )
+
+    def _prune(self, group: _Group):
+        """丢弃分组堆顶已被移除的任务"""
+        heap = group.heap
+        while heap:
+            _, seq, task_id = heap[0]
+            entry = self._queued.get(task_id)
+            if entry is not None and entry[2] == seq:
+                return
+            heapq.heappop(heap)
@@ -0,0 +1,166 @@
+"""CubQueue任务统计"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import Script, Task
+
+# 吞吐量统计的时间窗口（秒）
+THROUGHPUT_WINDOWS = (60, 300, 3600)
+
+# 视为已结束的任务状态
+FINISHED_STATUSES = ("completed", "failed", "timeout", "cancelled")
+
+
+class TaskStats:
+    """增量维护的任务计数器
+
+    启动时通过一次GROUP BY查询得到各状态、各脚本的任务数，之后由任务的
+    创建与状态变化增量更新，查询统计信息时不再扫描任务表。
+    已结束任务按秒分桶记录，用于计算最近若干时间窗口内的吞吐量。
+    """
+
+    def __init__(self, windows: Sequence[int] = THROUGHPUT_WINDOWS):
+        """初始化计数器
+
+        Args:
+            windows: 吞吐量统计的时间窗口（秒）
+        """
+        self.windows = tuple(sorted(windows))
+
+        self._lock = threading.Lock()
+        # 脚本ID -> 状态 -> 任务数
+        self._counts: Dict[int, Counter] = {}
+        self._script_names: Dict[int, str] = {}
+        # 已结束任务的秒级分桶：(秒, 状态 -> 任务数)，按时间从旧到新排列
+        self._finished: Deque[Tuple[int, Counter]] = deque()
+
+    def load(self, db: Session):
+        """从数据库加载当前的任务计数
+
+        Args:
+            db: 数据库会话
+        """
+        rows = (
+            db.query(Task.script_id, Script.name, Task.status, func.count(Task.id))
+            .join(Script, Task.script_id == Script.id)
+            .group_by(Task.script_id, Script.name, Task.status)
+            .all()
+        )
+        with self._lock:
+            self._counts.clear()
+            for script_id, script_name, status, count in rows:
+                self._script_names[script_id] = script_name
+                self._counts.setdefault(script_id, Counter())[status] = count
+
+    def record_created(
+        self, script_id: int, script_name: str, status: str = "pending", count: int = 1
+    ):
+        """记录新创建的任务
+
+        Args:
+            script_id: 脚本ID
+            script_name: 脚本名称
+            status: 初始状态
+            count: 任务数量
+        """
+        with self._lock:
+            self._script_names[script_id] = script_name
+            self._counts.setdefault(script_id, Counter())[status] += count
+
+    def record_transition(
+        self, script_id: int, old_status: str, new_status: str, now: Optional[float] = None
+    ):
+        """记录任务状态变化
+
+        Args:
+            script_id: 脚本ID
+            old_status: 原状态
+            new_status: 新状态
+            now: 变化发生的时间戳，默认为当前时间
+        """
+        if old_status == new_status:
+            return
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            counts = self._counts.setdefault(script_id, Counter())
+            counts[old_status] -= 1
+            counts[new_status] += 1
+
+            if new_status in FINISHED_STATUSES:
+                if not self._finished or self._finished[-1][0] != second:
+                    self._finished.append((second, Counter()))
+                self._finished[-1][1][new_status] += 1
+            self._prune(second)
+
+    def count_by_script(self, status: str) -> Dict[int, int]:
+        """获取各脚本处于指定状态的任务数
+
+        Args:
+            status: 任务状态
+
+        Returns:
+            脚本ID -> 任务数，不含任务数为0的脚本
+        """
+        with self._lock:
+            return {
+                script_id: counts[status]
+                for script_id, counts in self._counts.items()
+                if counts[status] > 0
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        Returns:
+            任务总数、各状态任务数、各脚本各状态任务数与最近时间窗口内的吞吐量
+        """
+        now = int(time.time())
+        with self._lock:
+            self._prune(now)
+            by_status: Counter = Counter()
+            by_script: Dict[str, Dict[str, int]] = {}
+            for script_id, counts in self._counts.items():
+                counts = {status: n for status, n in counts.items() if n > 0}
+                if not counts:
+                    continue
+                by_status.update(counts)
+                by_script[self._script_names.get(script_id, str(script_id))] = counts
+
+            throughput = []
+            for window in self.windows:
+                finished: Counter = Counter()
+                for second, counts in reversed(self._finished):
+                    if second <= now - window:
+                        break
+                    finished.update(counts)
+                total = sum(finished.values())
+                throughput.append(
+                    {
+                        "window_seconds": window,
+                        "finished": total,
+                        "completed": finished["completed"],
+                        "failed": finished["failed"],
+                        "timeout": finished["timeout"],
+                        "cancelled": finished["cancelled"],
+                        "per_minute": total * 60.0 / window,
+                    }
+                )
+
+        return {
+            "total": sum(by_status.values()),
+            "by_status": dict(by_status),
+            "by_script": by_script,
+            "throughput": throughput,
+        }
+
+    def _prune(self, now: int):
+        """丢弃超出最大时间窗口的分桶（调用方需持有锁）"""
+        horizon = now - self.windows[-1]
+        while self._finished and self._finished[0][0] <= horizon:
+            self._finished.popleft()
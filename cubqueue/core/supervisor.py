@@ -0,0 +1,362 @@
+"""CubQueue子进程监督器"""
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .executors import LocalExecutor, TaskExecutor
+from .limits import USAGE_SAMPLE_INTERVAL, UsageSampler
+from .proctree import TaskCgroups
+
+
+def _install_child_watcher(loop: asyncio.AbstractEventLoop):
+    """为Python 3.12以下版本启用基于pidfd的子进程回收
+
+    默认的ThreadedChildWatcher会为每个子进程创建一个等待线程，
+    在支持pidfd的Linux上改用绑定到监督器事件循环的PidfdChildWatcher，
+    由事件循环直接回收子进程。Python 3.12起asyncio已自动使用pidfd。
+
+    Args:
+        loop: 监督器事件循环
+    """
+    if sys.version_info >= (3, 12) or not hasattr(asyncio, "PidfdChildWatcher"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except (AttributeError, OSError):
+        return
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.get_event_loop_policy().set_child_watcher(watcher)
+
+
+class ProcessSupervisor:
+    """基于asyncio的子进程监督器
+
+    在单个后台线程中运行事件循环，统一负责所有任务子进程的启动、
+    等待、超时与取消，不再为每个运行中的任务占用一个阻塞线程。
+    进程的创建与结果收集由执行后端完成，默认在本机启动子进程。
+
+    任务结束时报告其资源用量：执行后端提供了用量（由wait4取得）时直接使用，
+    否则使用运行期间对本机进程树的定期采样。
+
+    本机任务在独立的会话中运行，可用时还放入单独的cgroup；取消、超时与关闭
+    监督器时终止整个进程树。任务的主进程结束后，留在进程树中的其他进程
+    （例如脚本启动的进程池或MPI进程）也被终止，之后才报告任务结束、释放槽位。
+
+    结束回调会写数据库并可能直接启动下一个任务，在单独的回调线程中依次执行，
+    不阻塞事件循环对其他任务的超时与取消处理。
+    """
+
+    def __init__(
+        self,
+        on_exit: Callable[
+            [str, Optional[int], str, Optional[str], Optional[Dict[str, float]]], None
+        ],
+        kill_grace_period: float = 10,
+        use_cgroups: bool = True,
+    ):
+        """初始化监督器
+
+        Args:
+            on_exit: 子进程结束回调，参数为(任务ID, 退出码, 结束原因, 错误信息, 资源用量)，
+                结束原因为exited、timeout、cancelled、shutdown或error之一
+            kill_grace_period: 发送SIGTERM后等待进程退出的时间（秒），超时后发送SIGKILL
+            use_cgroups: 主机提供可写的cgroup v2时，是否为每个本机任务创建cgroup
+        """
+        self._on_exit = on_exit
+        self.kill_grace_period = kill_grace_period
+        self.default_executor = LocalExecutor()
+        self.cgroups = TaskCgroups(use_cgroups)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        # 结束回调线程，单线程保证回调按任务结束的顺序执行
+        self._callbacks = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="cubqueue-exit"
+        )
+
+        # 以下状态只在事件循环线程中访问
+        self._processes: Dict[str, Any] = {}
+        self._stop_reasons: Dict[str, str] = {}
+        self._supervising: Set[asyncio.Task] = set()
+        self._closing = False
+
+    def start(self):
+        """启动事件循环线程"""
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run_loop, name="cubqueue-supervisor", daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+
+    def launch(
+        self,
+        task_id: str,
+        argv: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        log_path: str,
+        timeout: Optional[float] = None,
+        executor: Optional[TaskExecutor] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ):
+        """启动任务子进程（非阻塞）
+
+        Args:
+            task_id: 任务ID
+            argv: 命令行参数
+            cwd: 工作目录
+            env: 环境变量
+            log_path: 日志文件路径，标准输出与标准错误均写入该文件
+            timeout: 运行超时时间（秒），None表示不限制
+            executor: 执行后端，None表示在本机启动子进程
+            options: 传给执行后端的参数
+        """
+        self.start()
+        asyncio.run_coroutine_threadsafe(
+            self._supervise(
+                task_id,
+                argv,
+                cwd,
+                env,
+                log_path,
+                timeout,
+                executor or self.default_executor,
+                options,
+            ),
+            self._loop,
+        )
+
+    def cancel(self, task_id: str):
+        """取消任务子进程（非阻塞）
+
+        Args:
+            task_id: 任务ID
+        """
+        self.start()
+        self._loop.call_soon_threadsafe(self._request_stop, task_id, "cancelled")
+
+    def get_pid(self, task_id: str) -> Optional[int]:
+        """获取运行中任务的进程PID，进程尚未启动、已结束或不在本机时返回None
+
+        Args:
+            task_id: 任务ID
+        """
+        process = self._processes.get(task_id)
+        return getattr(process, "pid", None)
+
+    def shutdown(self):
+        """终止所有运行中任务的进程树并停止事件循环线程（阻塞）"""
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._stop_all(), self._loop)
+        try:
+            # SIGTERM宽限期、SIGKILL后等待与清理残留进程各需要至多一个宽限期
+            future.result(timeout=self.kill_grace_period * 3 + 5)
+        except Exception as e:
+            print(f"[ERROR] 终止运行中的任务失败: {e!r}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._callbacks.shutdown(wait=True)
+        self.cgroups.close()
+
+    async def _stop_all(self):
+        """终止所有运行中的任务并等待其结束处理（包括结束回调）完成"""
+        self._closing = True
+        for task_id in list(self._processes):
+            self._request_stop(task_id, "shutdown")
+        if self._supervising:
+            await asyncio.wait(set(self._supervising))
+
+    def _run_loop(self):
+        """事件循环线程入口"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        _install_child_watcher(self._loop)
+        self._started.set()
+        self._loop.run_forever()
+
+    def _request_stop(self, task_id: str, reason: str):
+        """记录停止原因并终止进程（在事件循环线程中执行）"""
+        if task_id in self._stop_reasons:
+            return
+        self._stop_reasons[task_id] = reason
+
+        process = self._processes.get(task_id)
+        if process is not None:
+            self._loop.create_task(self._terminate(process))
+
+    async def _terminate(self, process: Any):
+        """先发送SIGTERM，超过宽限期后发送SIGKILL
+
+        向进程树发送信号可能需要扫描主机上的全部进程，在线程池中执行，
+        不阻塞事件循环。
+        """
+        if process.returncode is not None:
+            return
+        try:
+            await self._loop.run_in_executor(None, process.terminate)
+            await asyncio.wait_for(process.wait(), self.kill_grace_period)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            try:
+                await self._loop.run_in_executor(None, process.kill)
+            except ProcessLookupError:
+                pass
+
+    async def _supervise(
+        self,
+        task_id: str,
+        argv: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        log_path: str,
+        timeout: Optional[float],
+        executor: TaskExecutor,
+        options: Optional[Dict[str, Any]],
+    ):
+        """启动子进程并等待其结束"""
+        # 进程启动前已被取消
+        if self._closing:
+            self._stop_reasons.setdefault(task_id, "shutdown")
+        if task_id in self._stop_reasons:
+            await self._notify(task_id, None, self._stop_reasons.pop(task_id), None)
+            return
+
+        current = asyncio.current_task()
+        self._supervising.add(current)
+        cgroup = None
+        try:
+            if isinstance(executor, LocalExecutor):
+                cgroup = self.cgroups.create(task_id)
+                options = dict(options or {}, cgroup=cgroup)
+            await self._run(task_id, argv, cwd, env, log_path, timeout, executor, options)
+        finally:
+            self.cgroups.remove(cgroup)
+            self._supervising.discard(current)
+
+    async def _run(
+        self,
+        task_id: str,
+        argv: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        log_path: str,
+        timeout: Optional[float],
+        executor: TaskExecutor,
+        options: Optional[Dict[str, Any]],
+    ):
+        """启动子进程，等待其结束并清理进程树"""
+        started = time.monotonic()
+        try:
+            process = await executor.launch(argv, cwd, env, log_path, options)
+        except Exception as e:
+            await self._notify(task_id, None, "error", str(e))
+            return
+
+        self._processes[task_id] = process
+        if self._closing:
+            self._stop_reasons.setdefault(task_id, "shutdown")
+        if task_id in self._stop_reasons:
+            # 启动期间被取消或监督器正在关闭
+            self._loop.create_task(self._terminate(process))
+        tree = getattr(process, "tree", None)
+        sampler = UsageSampler(process.pid) if process.pid else None
+        sampling = (
+            self._loop.create_task(self._sample_usage(sampler, tree)) if sampler else None
+        )
+        try:
+            if timeout:
+                await asyncio.wait_for(asyncio.shield(process.wait()), timeout)
+            else:
+                await process.wait()
+        except asyncio.TimeoutError:
+            # 终止前再采样一次，保留超时时刻的用量
+            if sampler is not None:
+                sampler.sample()
+            self._request_stop(task_id, "timeout")
+            await process.wait()
+        finally:
+            self._processes.pop(task_id, None)
+            if sampling is not None:
+                sampling.cancel()
+        wall_seconds = time.monotonic() - started
+
+        # 主进程已结束，终止仍留在进程树中的进程后再释放槽位
+        if tree is not None:
+            try:
+                await self._loop.run_in_executor(
+                    None, tree.terminate, self.kill_grace_period
+                )
+            except Exception as e:
+                print(f"[ERROR] 清理任务进程树失败 {task_id}: {e}")
+
+        usage = getattr(process, "usage", None)
+        if usage is None:
+            usage = (
+                sampler.usage(wall_seconds)
+                if sampler is not None
+                else {"wall_seconds": round(wall_seconds, 3)}
+            )
+
+        reason = self._stop_reasons.pop(task_id, "exited")
+        try:
+            await executor.collect(process, cwd)
+        except Exception as e:
+            if reason == "exited":
+                await self._notify(
+                    task_id, process.returncode, "error", f"收集任务结果失败: {e}", usage
+                )
+                return
+        await self._notify(task_id, process.returncode, reason, None, usage)
+
+    async def _sample_usage(self, sampler: UsageSampler, tree: Any):
+        """定期采样运行中进程树的资源用量，并记录其后代进程"""
+        while True:
+            # psutil读取/proc，放到线程池中避免阻塞事件循环
+            await self._loop.run_in_executor(None, sampler.sample)
+            if tree is not None:
+                await self._loop.run_in_executor(None, tree.refresh)
+            await asyncio.sleep(USAGE_SAMPLE_INTERVAL)
+
+    async def _notify(
+        self,
+        task_id: str,
+        returncode: Optional[int],
+        reason: str,
+        error: Optional[str],
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """在回调线程中调用结束回调并等待其完成，等待期间事件循环继续处理其他任务"""
+        await asyncio.wrap_future(
+            self._callbacks.submit(
+                self._call_on_exit, task_id, returncode, reason, error, usage
+            )
+        )
+
+    def _call_on_exit(
+        self,
+        task_id: str,
+        returncode: Optional[int],
+        reason: str,
+        error: Optional[str],
+        usage: Optional[Dict[str, float]],
+    ):
+        """结束回调线程入口"""
+        try:
+            self._on_exit(task_id, returncode, reason, error, usage)
+        except Exception as e:
+            print(f"[ERROR] 处理任务结束失败 {task_id}: {e}")
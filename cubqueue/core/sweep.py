@@ -0,0 +1,508 @@
+"""CubQueue参数扫描"""
+
+import copy
+import shutil
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from .models import Script, Sweep, Task
+
+if TYPE_CHECKING:
+    from .task_manager import TaskManager
+
+# 单个参数扫描最多展开的任务数
+MAX_SWEEP_TASKS = 10_000_000
+
+SWEEP_MODES = ("cartesian", "zip")
+
+
+class SweepAxis:
+    """扫描规格中的一个参数维度
+
+    取值为列表，或形如{"range": [stop]}、{"range": [start, stop]}、
+    {"range": [start, stop, step]}的整数区间（语义同Python的range），
+    区间不展开为列表，按下标计算取值。
+    """
+
+    def __init__(self, path: str, values: Any):
+        """解析参数维度
+
+        Args:
+            path: 参数路径，以点号分隔嵌套的键
+            values: 取值列表或range规格
+
+        Raises:
+            ValueError: 规格无效
+        """
+        self.path = path
+        self.keys = path.split(".")
+        if not path or not all(self.keys):
+            raise ValueError(f"无效的参数路径: {path!r}")
+
+        if isinstance(values, list):
+            self._values: Optional[List[Any]] = values
+            self._range: Optional[range] = None
+        elif isinstance(values, dict) and set(values) == {"range"}:
+            bounds = values["range"]
+            if (
+                not isinstance(bounds, list)
+                or not 1 <= len(bounds) <= 3
+                or not all(isinstance(b, int) and not isinstance(b, bool) for b in bounds)
+            ):
+                raise ValueError(f"参数 {path} 的range必须为1到3个整数")
+            try:
+                self._range = range(*bounds)
+            except ValueError as e:
+                raise ValueError(f"参数 {path} 的range无效: {e}")
+            self._values = None
+        else:
+            raise ValueError(f"参数 {path} 的取值必须为列表或{{\"range\": [...]}}")
+
+        if len(self) == 0:
+            raise ValueError(f"参数 {path} 没有任何取值")
+
+    def __len__(self) -> int:
+        return len(self._values) if self._values is not None else len(self._range)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._values[index] if self._values is not None else self._range[index]
+
+
+class SweepSpec:
+    """扫描规格：由参数模板与各参数维度按笛卡尔积或逐一配对（zip）生成参数"""
+
+    def __init__(self, spec: Dict[str, Any], mode: str = "cartesian"):
+        """解析扫描规格
+
+        Args:
+            spec: 参数路径 -> 取值列表或range规格
+            mode: cartesian表示所有维度的笛卡尔积（最后一个维度变化最快），
+                zip表示各维度按下标逐一配对
+
+        Raises:
+            ValueError: 规格无效
+        """
+        if mode not in SWEEP_MODES:
+            raise ValueError(f"扫描模式必须为 {' 或 '.join(SWEEP_MODES)}")
+        if not isinstance(spec, dict) or not spec:
+            raise ValueError("扫描规格必须为非空的JSON对象")
+
+        self.mode = mode
+        self.axes = [SweepAxis(path, values) for path, values in spec.items()]
+
+        if mode == "zip":
+            lengths = {len(axis) for axis in self.axes}
+            if len(lengths) != 1:
+                raise ValueError("zip模式下所有参数的取值数量必须相同")
+            self.total = lengths.pop()
+        else:
+            self.total = 1
+            for axis in self.axes:
+                self.total *= len(axis)
+
+        if self.total > MAX_SWEEP_TASKS:
+            raise ValueError(f"扫描展开后的任务数 {self.total} 超过上限 {MAX_SWEEP_TASKS}")
+
+    def point(self, index: int) -> List[Tuple[SweepAxis, Any]]:
+        """计算第index个扫描点各维度的取值
+
+        Args:
+            index: 扫描点下标
+
+        Returns:
+            (参数维度, 取值)列表
+        """
+        if self.mode == "zip":
+            return [(axis, axis[index]) for axis in self.axes]
+
+        # 按混合进制分解下标，最后一个维度变化最快
+        values = []
+        for axis in reversed(self.axes):
+            index, position = divmod(index, len(axis))
+            values.append((axis, axis[position]))
+        values.reverse()
+        return values
+
+    def render(self, template: Dict[str, Any], index: int) -> Dict[str, Any]:
+        """用第index个扫描点的取值填充参数模板
+
+        Args:
+            template: 参数模板
+            index: 扫描点下标
+
+        Returns:
+            任务参数
+        """
+        args = copy.deepcopy(template)
+        for axis, value in self.point(index):
+            target = args
+            for key in axis.keys[:-1]:
+                child = target.get(key)
+                if not isinstance(child, dict):
+                    child = target[key] = {}
+                target = child
+            target[axis.keys[-1]] = value
+        return args
+
+
+class SweepManager:
+    """参数扫描管理器
+
+    参数扫描创建时只保存模板与规格，由后台线程在调度器等待队列不足一批时
+    逐批展开为任务，展开进度随任务记录一起提交，服务器重启后从断点继续。
+    活动扫描的共享文件在sweeps/<扫描ID>下各保留一个硬链接，展开结束前不会被
+    垃圾回收。
+    """
+
+    def __init__(self, task_manager: "TaskManager", batch_size: int = 500):
+        """初始化管理器
+
+        Args:
+            task_manager: 任务管理器
+            batch_size: 每批展开的任务数
+        """
+        self.task_manager = task_manager
+        self.db_manager = task_manager.db_manager
+        self.batch_size = max(1, int(batch_size))
+        self.pins_dir = task_manager.base_dir / "sweeps"
+
+        # 展开与取消互斥，保证取消后不会再有新任务被展开
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动展开线程"""
+        if self._thread is not None:
+            return
+        self._release_stale_pins()
+        self._thread = threading.Thread(
+            target=self._run, name="cubqueue-sweep", daemon=True
+        )
+        self._thread.start()
+        self._wakeup.set()
+
+    def notify(self):
+        """通知展开线程检查等待队列（可在任意线程中调用）"""
+        self._wakeup.set()
+
+    def create_sweep(
+        self,
+        script_id: int,
+        template: Dict[str, Any],
+        spec: Dict[str, Any],
+        mode: str = "cartesian",
+        shared_files: Optional[List[Tuple[str, str]]] = None,
+        description: Optional[str] = None,
+        priority: int = 0,
+        submitter: Optional[str] = None,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
+    ) -> str:
+        """创建参数扫描
+
+        Args:
+            script_id: 脚本ID
+            template: 参数模板，可以包含<file1>等文件占位符
+            spec: 扫描规格
+            mode: 扫描模式（cartesian或zip）
+            shared_files: 共享文件列表，每项为(文件名, SHA-256摘要)
+            description: 任务描述
+            priority: 展开任务的优先级
+            submitter: 提交者
+            cpus: 展开任务需要的CPU数
+            memory_mb: 展开任务需要的内存（MB）
+            timeout: 展开任务的运行超时（秒）
+            cpu_time_limit: 展开任务的CPU时间上限（秒）
+            memory_limit_mb: 展开任务的地址空间上限（MB）
+            max_attempts: 展开任务最多尝试的次数
+            retry_backoff: 展开任务重试的基础退避间隔（秒）
+            retry_on: 展开任务重试的失败类别
+
+        Returns:
+            参数扫描ID
+
+        Raises:
+            ValueError: 模板或规格无效
+        """
+        if not isinstance(template, dict):
+            raise ValueError("参数模板必须为JSON对象")
+        sweep_spec = SweepSpec(spec, mode)
+
+        sweep_id = str(uuid.uuid4())
+        self._pin_files(sweep_id, shared_files or [])
+        db = self.db_manager.get_session()
+        try:
+            db.add(
+                Sweep(
+                    id=sweep_id,
+                    script_id=script_id,
+                    mode=mode,
+                    template=template,
+                    spec=spec,
+                    shared_files=[list(item) for item in shared_files or []],
+                    description=description,
+                    priority=priority,
+                    submitter=submitter,
+                    cpus=cpus,
+                    memory_mb=memory_mb,
+                    timeout=timeout,
+                    cpu_time_limit=cpu_time_limit,
+                    memory_limit_mb=memory_limit_mb,
+                    max_attempts=max_attempts,
+                    retry_backoff=retry_backoff,
+                    retry_on=retry_on,
+                    total=sweep_spec.total,
+                    expanded=0,
+                    status="active",
+                )
+            )
+            db.commit()
+        except Exception:
+            self._unpin_files(sweep_id)
+            raise
+        finally:
+            db.close()
+
+        self.notify()
+        return sweep_id
+
+    def get_sweep(self, sweep_id: str) -> Optional[Dict[str, Any]]:
+        """获取参数扫描信息
+
+        Args:
+            sweep_id: 参数扫描ID
+
+        Returns:
+            参数扫描信息，包含已展开任务的各状态数量；不存在时返回None
+        """
+        db = self.db_manager.get_session()
+        try:
+            sweep = db.query(Sweep).filter(Sweep.id == sweep_id).first()
+            if not sweep:
+                return None
+            counts = dict(
+                db.query(Task.status, func.count(Task.id))
+                .filter(Task.sweep_id == sweep_id)
+                .group_by(Task.status)
+                .all()
+            )
+            return {
+                "id": sweep.id,
+                "script_name": sweep.script.name,
+                "mode": sweep.mode,
+                "status": sweep.status,
+                "description": sweep.description,
+                "priority": sweep.priority or 0,
+                "submitter": sweep.submitter,
+                "cpus": sweep.cpus,
+                "memory_mb": sweep.memory_mb,
+                "timeout": sweep.timeout,
+                "cpu_time_limit": sweep.cpu_time_limit,
+                "memory_limit_mb": sweep.memory_limit_mb,
+                "max_attempts": sweep.max_attempts,
+                "retry_backoff": sweep.retry_backoff,
+                "retry_on": sweep.retry_on,
+                "total": sweep.total,
+                "expanded": sweep.expanded,
+                "counts": counts,
+                "message": sweep.message,
+                "created_at": sweep.created_at,
+            }
+        finally:
+            db.close()
+
+    def cancel_sweep(self, sweep_id: str) -> bool:
+        """取消参数扫描：停止展开，并取消已展开但未结束的任务
+
+        Args:
+            sweep_id: 参数扫描ID
+
+        Returns:
+            参数扫描是否存在
+        """
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                sweep = db.query(Sweep).filter(Sweep.id == sweep_id).first()
+                if not sweep:
+                    return False
+                if sweep.status != "cancelled":
+                    sweep.status = "cancelled"
+                    db.commit()
+                self._unpin_files(sweep_id)
+                task_ids = [
+                    task_id
+                    for (task_id,) in db.query(Task.id).filter(
+                        Task.sweep_id == sweep_id,
+                        Task.status.in_(("pending", "running")),
+                    )
+                ]
+            finally:
+                db.close()
+
+        for task_id in task_ids:
+            self.task_manager.cancel_task(task_id)
+        return True
+
+    def _run(self):
+        """展开线程入口"""
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                while self._expand_next_batch():
+                    pass
+            except Exception as e:
+                print(f"[ERROR] 展开参数扫描失败: {e}")
+
+    def _expand_next_batch(self) -> bool:
+        """在等待队列不足一批时展开优先级最高、最早创建的活动扫描的下一批任务
+
+        Returns:
+            是否展开了任务
+        """
+        queue_stats = self.task_manager.get_queue_stats()
+        queued = queue_stats["queued"] + queue_stats["worker_queued"]
+        if queued >= self.batch_size:
+            return False
+
+        with self._lock:
+            db = self.db_manager.get_session()
+            try:
+                sweep = (
+                    db.query(Sweep)
+                    .filter(Sweep.status == "active")
+                    .order_by(Sweep.priority.desc(), Sweep.created_at)
+                    .first()
+                )
+                if not sweep:
+                    return False
+                if sweep.expanded >= sweep.total:
+                    sweep.status = "expanded"
+                    db.commit()
+                    self._unpin_files(sweep.id)
+                    return True
+
+                script = db.query(Script).filter(Script.id == sweep.script_id).first()
+                sweep_id = sweep.id
+                template = sweep.template
+                spec = SweepSpec(sweep.spec, sweep.mode)
+                start = sweep.expanded
+                count = min(self.batch_size - queued, sweep.total - start)
+                shared_files = [tuple(item) for item in sweep.shared_files or []]
+                description = sweep.description
+                priority = sweep.priority or 0
+                submitter = sweep.submitter
+                cpus = sweep.cpus
+                memory_mb = sweep.memory_mb
+                limits = {
+                    "timeout": sweep.timeout,
+                    "cpu_time_limit": sweep.cpu_time_limit,
+                    "memory_limit_mb": sweep.memory_limit_mb,
+                    "max_attempts": sweep.max_attempts,
+                    "retry_backoff": sweep.retry_backoff,
+                    "retry_on": sweep.retry_on,
+                }
+            finally:
+                db.close()
+
+            if script is None:
+                self._set_status(sweep_id, "cancelled")
+                return True
+
+            try:
+                args_list = [spec.render(template, i) for i in range(start, start + count)]
+                self.task_manager.submit_tasks(
+                    script.id,
+                    script.name,
+                    args_list,
+                    shared_files,
+                    description,
+                    sweep_id=sweep_id,
+                    priority=priority,
+                    submitter=submitter,
+                    cpus=cpus,
+                    memory_mb=memory_mb,
+                    **limits,
+                )
+            except Exception as e:
+                # 展开失败的扫描不再保持活动，以免阻塞其他扫描的展开
+                print(f"[ERROR] 展开参数扫描 {sweep_id} 失败: {e}")
+                self._set_status(sweep_id, "failed", str(e))
+                return True
+            if start + count >= spec.total:
+                self._set_status(sweep_id, "expanded")
+        return True
+
+    def _set_status(self, sweep_id: str, status: str, message: Optional[str] = None):
+        """更新参数扫描状态
+
+        Args:
+            sweep_id: 参数扫描ID
+            status: 新状态
+            message: 状态消息，如展开失败的原因
+        """
+        values = {Sweep.status: status}
+        if message is not None:
+            values[Sweep.message] = message
+        db = self.db_manager.get_session()
+        try:
+            db.query(Sweep).filter(Sweep.id == sweep_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        if status != "active":
+            self._unpin_files(sweep_id)
+
+    def _pin_files(self, sweep_id: str, shared_files: List[Tuple[str, str]]):
+        """为参数扫描的共享文件各创建一个硬链接，使其在展开结束前不被回收
+
+        Raises:
+            ValueError: 共享文件不存在
+        """
+        pin_dir = self.pins_dir / sweep_id
+        pin_dir.mkdir(parents=True, exist_ok=True)
+        blob_store = self.task_manager.file_manager.blob_store
+        try:
+            for _, digest in shared_files:
+                dest = pin_dir / digest.lower()
+                if not dest.exists():
+                    blob_store.link(digest, dest)
+        except FileNotFoundError as e:
+            self._unpin_files(sweep_id)
+            raise ValueError(str(e))
+        except Exception:
+            self._unpin_files(sweep_id)
+            raise
+
+    def _unpin_files(self, sweep_id: str):
+        """释放参数扫描对共享文件的引用"""
+        shutil.rmtree(self.pins_dir / sweep_id, ignore_errors=True)
+
+    def _release_stale_pins(self):
+        """释放已不再活动的参数扫描遗留的文件引用（例如服务器在释放前退出）"""
+        if not self.pins_dir.is_dir():
+            return
+        db = self.db_manager.get_session()
+        try:
+            active = {
+                sweep_id
+                for (sweep_id,) in db.query(Sweep.id).filter(Sweep.status == "active")
+            }
+        finally:
+            db.close()
+        for pin_dir in self.pins_dir.iterdir():
+            if pin_dir.name not in active:
+                shutil.rmtree(pin_dir, ignore_errors=True)
@@ -2,28 +2,73 @@
 
 import os
 import json
-import subprocess
-import threading
-import zipfile
 import shutil
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, Optional, List, Tuple
+from datetime import datetime, timedelta
 import uuid
 
-from .models import Task, Script
+from sqlalchemy import func
+
+from .models import Script, Sweep, Task, TaskAttempt, TaskFile
+from .archive import ArchiveCache, iter_zip_directory
+from .config import CubQueueConfig, get_config
 from .database import get_db_manager
+from .executors import TaskExecutor, create_executor
 from .file_manager import FileManager
+from .leases import WORKER_EXECUTOR, LeaseManager
+from .log_reader import MAX_READ_BYTES, read_range, tail_lines
+from .notifier import TaskNotifier
+from .resources import ResourceDemand, ResourceMonitor
+from .result_cache import ResultCache, compute_fingerprint
+from .retry import RetryPolicy, RetryQueue, classify_failure
+from .scheduler import TaskScheduler
+from .stats import TaskStats
+from .sweep import SweepManager
+from .supervisor import ProcessSupervisor
+
+# 批量查询任务状态时每条SQL语句包含的任务ID数
+STATUS_QUERY_BATCH = 500
+
+# 构造调度队列条目所需的列
+QUEUE_COLUMNS = (
+    Task.id,
+    Task.priority,
+    Task.submitter,
+    Task.cpus,
+    Task.memory_mb,
+    Task.retry_at,
+    Script.name,
+    Script.executor,
+    Script.cpus.label("script_cpus"),
+    Script.memory_mb.label("script_memory_mb"),
+)
+
+# 任务生效的运行限制：任务未设置时使用脚本的设置
+LIMIT_COLUMNS = (
+    func.coalesce(Task.timeout, Script.timeout).label("timeout"),
+    func.coalesce(Task.cpu_time_limit, Script.cpu_time_limit).label("cpu_time_limit"),
+    func.coalesce(Task.memory_limit_mb, Script.memory_limit_mb).label("memory_limit_mb"),
+)
+
+# 任务生效的重试策略：任务未设置时使用脚本的设置
+RETRY_COLUMNS = (
+    func.coalesce(Task.max_attempts, Script.max_attempts).label("max_attempts"),
+    func.coalesce(Task.retry_backoff, Script.retry_backoff).label("retry_backoff"),
+    func.coalesce(Task.retry_on, Script.retry_on).label("retry_on"),
+)
 
 
 class TaskManager:
     """任务管理器"""
 
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, config: CubQueueConfig = None):
         """初始化任务管理器
 
         Args:
             base_dir: 工作目录
+            config: 配置实例，如果为None则使用全局配置
         """
         if base_dir is None:
             base_dir = Path.home() / ".cubqueue"
@@ -34,14 +79,73 @@ class TaskManager:
         self.tasks_dir = base_dir / "tasks"
         self.tasks_dir.mkdir(parents=True, exist_ok=True)
 
+        self.config = config or get_config()
         self.file_manager = FileManager(base_dir)
         self.db_manager = get_db_manager()
 
-        # 运行中的任务进程
-        self.running_processes: Dict[str, subprocess.Popen] = {}
+        # 子进程监督器，在单个事件循环线程中管理所有任务进程
+        self.supervisor = ProcessSupervisor(
+            self._on_task_exit, use_cgroups=self.config.task_cgroups
+        )
+        # 执行后端，按脚本注册时指定的名称在首次使用时创建
+        self._executors: Dict[str, TaskExecutor] = {
+            "subprocess": self.supervisor.default_executor
+        }
+        self._executors_lock = threading.Lock()
+
+        # 压缩包缓存，按目录指纹复用已生成的压缩包
+        self.archive_cache = ArchiveCache(
+            base_dir / "archive_cache", self.config.archive_cache_size
+        )
+
+        # 结果缓存，复用脚本、参数与输入文件都相同的已完成任务的结果
+        self.result_cache = ResultCache(
+            base_dir / "result_cache",
+            self.db_manager,
+            self.config.result_cache_ttl,
+            self.config.result_cache_size,
+        )
+
+        # 主机资源准入，按任务声明的CPU与内存以及实时读数限制启动
+        self.resources = None
+        if self.config.resource_admission:
+            self.resources = ResourceMonitor(
+                self.config.resource_cpus,
+                self.config.resource_memory_mb,
+                self.config.memory_reserve_mb,
+                pid_lookup=self.supervisor.get_pid,
+            )
+
+        # 任务调度器，限制同时运行的任务数，按优先级与公平份额决定启动顺序
+        self.scheduler = TaskScheduler(
+            self.config.max_concurrent_tasks,
+            self._launch_task,
+            self.config.fair_share_weights,
+            self.resources,
+        )
+
+        # 任务计数器，由任务创建与状态变化增量维护
+        self.stats = TaskStats()
 
-        # 启动时恢复运行中的任务状态
+        # 任务状态变化通知，用于唤醒等待任务结束的请求
+        self.notifier = TaskNotifier()
+
+        # 失败后等待退避结束的本机任务，到期后重新放入调度队列
+        self.retries = RetryQueue(self._resubmit_tasks)
+
+        # 远程worker任务租约，租约过期的任务重新排队
+        self.leases = LeaseManager(self, self.config.worker_lease_timeout)
+
+        # 参数扫描管理器，在等待队列不足时逐批展开扫描任务（包括重启前未展开完的扫描）
+        self.sweeps = SweepManager(self, self.config.sweep_batch_size)
+
+        # 启动时恢复运行中的任务状态；恢复的任务结束时会用到租约与扫描管理器，
+        # 因此二者需先创建，恢复完成后再启动后台线程
         self._recover_running_tasks()
+        if self.resources is not None:
+            self.resources.start(self.scheduler.dispatch)
+        self.leases.start()
+        self.sweeps.start()
 
     def create_task(
         self,
@@ -63,48 +167,277 @@ class TaskManager:
         Returns:
             任务信息
         """
-        # 创建任务目录
-        task_dir = self.tasks_dir / task_id
-        task_dir.mkdir(parents=True, exist_ok=True)
+        # 获取脚本信息
+        db = self.db_manager.get_session()
+        try:
+            script = db.query(Script).filter(Script.id == script_id).first()
+            if not script:
+                raise ValueError(f"脚本不存在: {script_id}")
+            script_path = Path(script.path)
+        finally:
+            db.close()
 
-        # 创建子目录
-        (task_dir / "files").mkdir(exist_ok=True)
-        (task_dir / "metadata").mkdir(exist_ok=True)
-        (task_dir / "output").mkdir(exist_ok=True)
+        self._prepare_task_dir(task_id, script_path, script_name, args, file_mappings)
 
-        # 获取脚本信息
+        return {
+            "id": task_id,
+            "script_name": script_name,
+            "status": "pending",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+
+    def create_tasks(
+        self,
+        script_id: int,
+        script_name: str,
+        args_list: List[Dict[str, Any]],
+        shared_files: List[Tuple[str, str]],
+    ) -> List[Dict[str, Any]]:
+        """批量创建任务目录
+
+        所有任务共享同一组输入文件，每个任务通过硬链接引用存储中的文件，
+        不复制文件内容。任一任务创建失败时删除本批次已创建的所有任务目录。
+
+        Args:
+            script_id: 脚本ID
+            script_name: 脚本名称
+            args_list: 每个任务的参数
+            shared_files: 共享文件列表，每项为(文件名, SHA-256摘要)，
+                依次对应<file1>、<file2>等占位符
+
+        Returns:
+            任务信息列表，每项包含id与files（(文件名, 文件信息)列表）
+        """
         db = self.db_manager.get_session()
         try:
             script = db.query(Script).filter(Script.id == script_id).first()
             if not script:
                 raise ValueError(f"脚本不存在: {script_id}")
+            script_path = Path(script.path)
+        finally:
+            db.close()
 
-            # 复制脚本文件到任务目录
-            script_src = Path(script.path)
-            script_dst = task_dir / f"{script_name}.py"
-            shutil.copy2(script_src, script_dst)
+        tasks = []
+        try:
+            for args in args_list:
+                task_id = str(uuid.uuid4())
+                task = {"id": task_id, "files": []}
+                tasks.append(task)
+
+                file_mappings = {}
+                for i, (filename, digest) in enumerate(shared_files, 1):
+                    file_info = self.file_manager.link_task_file(task_id, filename, digest)
+                    file_mappings[f"<file{i}>"] = file_info["file_uuid"]
+                    task["files"].append((filename, file_info))
+
+                self._prepare_task_dir(
+                    task_id, script_path, script_name, args, file_mappings
+                )
+        except Exception:
+            for task in tasks:
+                shutil.rmtree(self.tasks_dir / task["id"], ignore_errors=True)
+            raise
 
-            # 处理参数文件中的文件占位符
-            processed_args = self._process_file_placeholders(
-                args, file_mappings, task_dir
-            )
+        return tasks
 
-            # 保存参数文件
-            arg_file_path = task_dir / "arg_file.json"
-            with open(arg_file_path, "w", encoding="utf-8") as f:
-                json.dump(processed_args, f, indent=2, ensure_ascii=False)
+    def submit_tasks(
+        self,
+        script_id: int,
+        script_name: str,
+        args_list: List[Dict[str, Any]],
+        shared_files: List[Tuple[str, str]],
+        description: Optional[str] = None,
+        sweep_id: Optional[str] = None,
+        use_cache: bool = False,
+        priority: int = 0,
+        submitter: Optional[str] = None,
+        cpus: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        timeout: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_on: Optional[List[str]] = None,
+    ) -> List[str]:
+        """批量创建任务并提交到调度队列
+
+        任务目录创建完成后，所有任务记录在同一个事务中写入数据库；
+        属于参数扫描的任务同时在该事务中更新扫描的已展开数量。
 
-            return {
-                "id": task_id,
-                "script_name": script_name,
+        Args:
+            script_id: 脚本ID
+            script_name: 脚本名称
+            args_list: 每个任务的参数
+            shared_files: 共享文件列表，每项为(文件名, SHA-256摘要)
+            description: 任务描述
+            sweep_id: 所属参数扫描ID
+            use_cache: 是否复用结果缓存中指纹相同的已完成任务的结果
+            priority: 任务优先级
+            submitter: 提交者
+            cpus: 每个任务需要的CPU数，None表示使用脚本的声明
+            memory_mb: 每个任务需要的内存（MB），None表示使用脚本的声明
+            timeout: 每个任务的运行超时（秒，0表示不限制），None表示使用脚本的设置
+            cpu_time_limit: 每个任务的CPU时间上限（秒），None表示使用脚本的设置
+            memory_limit_mb: 每个任务的地址空间上限（MB），None表示使用脚本的设置
+            max_attempts: 每个任务最多尝试的次数，None表示使用脚本的设置
+            retry_backoff: 重试的基础退避间隔（秒），None表示使用脚本的设置
+            retry_on: 重试的失败类别，None表示使用脚本的设置
+
+        Returns:
+            按args_list顺序排列的任务ID列表
+        """
+        tasks = self.create_tasks(script_id, script_name, args_list, shared_files)
+
+        # 创建时间逐个递增以保持提交顺序
+        created_at = datetime.utcnow()
+        task_rows = []
+        file_rows = []
+        for i, (task, args) in enumerate(zip(tasks, args_list)):
+            row = {
+                "id": task["id"],
+                "script_id": script_id,
+                "sweep_id": sweep_id,
                 "status": "pending",
-                "created_at": datetime.utcnow().isoformat(),
+                "args": json.dumps(args),
+                "description": description,
+                "priority": priority,
+                "submitter": submitter,
+                "cpus": cpus,
+                "memory_mb": memory_mb,
+                "timeout": timeout,
+                "cpu_time_limit": cpu_time_limit,
+                "memory_limit_mb": memory_limit_mb,
+                "max_attempts": max_attempts,
+                "retry_backoff": retry_backoff,
+                "retry_on": retry_on,
+                "created_at": created_at + timedelta(microseconds=i),
             }
+            if self.config.result_cache_enabled:
+                row["fingerprint"] = self.task_fingerprint(script_id, args, shared_files)
+                if use_cache:
+                    row.update(self.restore_cached_result(task["id"], row["fingerprint"]))
+            task_rows.append(row)
+            for filename, file_info in task["files"]:
+                file_rows.append(
+                    {
+                        "task_id": task["id"],
+                        "filename": filename,
+                        "file_uuid": file_info["file_uuid"],
+                        "file_size": file_info["file_size"],
+                        "checksum": file_info["checksum"],
+                    }
+                )
+
+        db = self.db_manager.get_session()
+        try:
+            db.bulk_insert_mappings(Task, task_rows)
+            if file_rows:
+                db.bulk_insert_mappings(TaskFile, file_rows)
+            if sweep_id is not None:
+                db.query(Sweep).filter(Sweep.id == sweep_id).update(
+                    {Sweep.expanded: Sweep.expanded + len(task_rows)},
+                    synchronize_session=False,
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            for task in tasks:
+                shutil.rmtree(self.tasks_dir / task["id"], ignore_errors=True)
+            raise
         finally:
             db.close()
 
+        task_ids = [task["id"] for task in tasks]
+        pending_ids = [row["id"] for row in task_rows if row["status"] == "pending"]
+        self.record_task_created(script_id, script_name, count=len(pending_ids))
+        if len(pending_ids) < len(task_ids):
+            self.record_task_created(
+                script_id,
+                script_name,
+                count=len(task_ids) - len(pending_ids),
+                status="completed",
+            )
+        self.start_tasks(pending_ids)
+        return task_ids
+
+    def task_fingerprint(
+        self, script_id: int, args: Any, files: List[Tuple[str, str]]
+    ) -> str:
+        """计算任务的结果缓存指纹
+
+        Args:
+            script_id: 脚本ID
+            args: 任务参数（文件占位符替换之前）
+            files: 输入文件列表，每项为(文件名, SHA-256摘要)
+
+        Returns:
+            指纹
+        """
+        db = self.db_manager.get_session()
+        try:
+            script_path = db.query(Script.path).filter(Script.id == script_id).scalar()
+        finally:
+            db.close()
+        if script_path is None:
+            raise ValueError(f"脚本不存在: {script_id}")
+        return compute_fingerprint(Path(script_path), args, files)
+
+    def restore_cached_result(self, task_id: str, fingerprint: str) -> Dict[str, Any]:
+        """从结果缓存恢复任务结果
+
+        Args:
+            task_id: 任务ID（任务目录需已创建）
+            fingerprint: 任务指纹
+
+        Returns:
+            命中时为任务记录应设置的字段（status、message、started_at与finished_at），
+            未命中时为空字典
+        """
+        source_id = self.result_cache.restore(fingerprint, self.tasks_dir / task_id)
+        if source_id is None:
+            return {}
+        now = datetime.utcnow()
+        return {
+            "status": "completed",
+            "message": f"命中结果缓存，结果来自任务 {source_id}",
+            "started_at": now,
+            "finished_at": now,
+        }
+
+    def _prepare_task_dir(
+        self,
+        task_id: str,
+        script_path: Path,
+        script_name: str,
+        args: Dict[str, Any],
+        file_mappings: Dict[str, str],
+    ):
+        """创建任务目录结构，复制脚本并写入参数文件"""
+        # 创建任务目录
+        task_dir = self.tasks_dir / task_id
+        task_dir.mkdir(parents=True, exist_ok=True)
+
+        # 创建子目录
+        (task_dir / "files").mkdir(exist_ok=True)
+        (task_dir / "metadata").mkdir(exist_ok=True)
+        (task_dir / "output").mkdir(exist_ok=True)
+
+        # 复制脚本文件到任务目录
+        shutil.copy2(script_path, task_dir / f"{script_name}.py")
+
+        # 处理参数文件中的文件占位符
+        processed_args = self._process_file_placeholders(args, file_mappings, task_dir)
+
+        # 保存参数文件
+        arg_file_path = task_dir / "arg_file.json"
+        with open(arg_file_path, "w", encoding="utf-8") as f:
+            json.dump(processed_args, f, indent=2, ensure_ascii=False)
+
     def start_task(self, task_id: str):
-        """启动任务
+        """提交任务到调度队列
+
+        任务保持pending状态，直到调度器在并发上限内将其启动。
 
         Args:
             task_id: 任务ID
@@ -113,13 +446,295 @@ class TaskManager:
         if not task_dir.exists():
             raise FileNotFoundError(f"任务目录不存在: {task_dir}")
 
-        # 更新任务状态为运行中
-        self._update_task_status(task_id, "running", started_at=datetime.utcnow())
+        self.scheduler.submit_many(self._local_queue_entries([task_id]))
+
+    def start_tasks(self, task_ids: List[str]):
+        """按顺序批量提交任务到调度队列
+
+        Args:
+            task_ids: 任务ID列表
+        """
+        for task_id in task_ids:
+            task_dir = self.tasks_dir / task_id
+            if not task_dir.exists():
+                raise FileNotFoundError(f"任务目录不存在: {task_dir}")
+
+        self.scheduler.submit_many(self._local_queue_entries(task_ids))
+
+    def _local_queue_entries(
+        self, task_ids: List[str]
+    ) -> List[Tuple[str, int, str, Optional[ResourceDemand]]]:
+        """查询任务的调度参数，过滤掉由远程worker租用执行的任务
+
+        资源需求超过主机容量、永远无法启动的任务直接标记为失败。
+
+        Args:
+            task_ids: 任务ID列表
+
+        Returns:
+            需要在本机调度的(任务ID, 优先级, 分组, 资源需求)，保持原有顺序
+        """
+        found = {}
+        db = self.db_manager.get_session()
+        try:
+            for i in range(0, len(task_ids), STATUS_QUERY_BATCH):
+                batch = task_ids[i : i + STATUS_QUERY_BATCH]
+                rows = (
+                    db.query(*QUEUE_COLUMNS)
+                    .join(Script, Task.script_id == Script.id)
+                    .filter(Task.id.in_(batch), Script.executor != WORKER_EXECUTOR)
+                )
+                for row in rows:
+                    found[row.id] = row
+        finally:
+            db.close()
+        return self._queue_entries(
+            found[task_id] for task_id in task_ids if task_id in found
+        )
+
+    def _queue_entries(
+        self, rows: Iterable[Any]
+    ) -> List[Tuple[str, int, str, Optional[ResourceDemand]]]:
+        """由QUEUE_COLUMNS的查询结果构造调度队列条目"""
+        entries = []
+        for row in rows:
+            demand = self._resource_demand(row)
+            reason = None
+            if demand is not None and self.resources is not None:
+                reason = self.resources.check_demand(demand)
+            if reason:
+                self._update_task_status(
+                    row.id, "failed", message=reason, finished_at=datetime.utcnow()
+                )
+                continue
+            group = self._share_group(row.submitter, row.name)
+            entries.append((row.id, row.priority or 0, group, demand))
+        return entries
+
+    def _resource_demand(self, row: Any) -> Optional[ResourceDemand]:
+        """任务在本机占用的资源，任务的声明优先于脚本的声明
+
+        Ray任务由Ray按声明在集群中分配资源，不占用本机资源。任务与脚本都未声明、
+        且未配置默认需求的任务不参与资源准入，只受max_concurrent_tasks限制。
+        """
+        if row.executor == "ray":
+            return None
+        cpus = row.cpus or row.script_cpus or self.config.default_task_cpus
+        memory_mb = (
+            row.memory_mb or row.script_memory_mb or self.config.default_task_memory_mb
+        )
+        if not cpus and not memory_mb:
+            return None
+        return ResourceDemand(float(cpus or 0), int(memory_mb or 0))
+
+    def _share_group(self, submitter: Optional[str], script_name: str) -> str:
+        """任务所属的公平份额分组"""
+        if self.config.fair_share_by == "submitter":
+            return submitter or ""
+        return script_name
+
+    def record_task_created(
+        self, script_id: int, script_name: str, count: int = 1, status: str = "pending"
+    ):
+        """登记新创建的任务，需在任务记录提交到数据库后、start_task之前调用
+
+        Args:
+            script_id: 脚本ID
+            script_name: 脚本名称
+            count: 任务数量
+            status: 任务的初始状态
+        """
+        if count:
+            self.stats.record_created(script_id, script_name, status=status, count=count)
+
+    def get_task_stats(self) -> Dict[str, Any]:
+        """获取任务统计信息
+
+        Returns:
+            各状态、各脚本的任务数与最近时间窗口内的吞吐量
+        """
+        return self.stats.get_stats()
+
+    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务当前状态
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            任务状态信息，任务不存在时返回None
+        """
+        return self.get_task_statuses([task_id]).get(task_id)
+
+    def get_task_statuses(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量查询任务当前状态
+
+        Args:
+            task_ids: 任务ID列表
+
+        Returns:
+            任务ID -> 任务状态信息，不存在的任务不包含在结果中
+        """
+        statuses = {}
+        db = self.db_manager.get_session()
+        try:
+            # 分批查询，避免超出SQLite的参数个数限制
+            for i in range(0, len(task_ids), STATUS_QUERY_BATCH):
+                batch = task_ids[i : i + STATUS_QUERY_BATCH]
+                for task in db.query(Task).filter(Task.id.in_(batch)):
+                    statuses[task.id] = {
+                        "id": task.id,
+                        "status": task.status,
+                        "message": task.message,
+                        "created_at": task.created_at,
+                        "started_at": task.started_at,
+                        "finished_at": task.finished_at,
+                        "resource_usage": task.resource_usage,
+                        "attempt": task.attempt or 1,
+                        "retry_at": task.retry_at,
+                    }
+        finally:
+            db.close()
+        return statuses
+
+    def get_task_attempts(self, task_id: str) -> Optional[List[Dict[str, Any]]]:
+        """查询任务的各次尝试
 
-        # 在新线程中运行任务
-        thread = threading.Thread(target=self._run_task, args=(task_id,))
-        thread.daemon = True
-        thread.start()
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            按尝试序号排列的尝试记录，任务不存在时返回None
+        """
+        db = self.db_manager.get_session()
+        try:
+            if db.query(Task.id).filter(Task.id == task_id).first() is None:
+                return None
+            attempts = (
+                db.query(TaskAttempt)
+                .filter(TaskAttempt.task_id == task_id)
+                .order_by(TaskAttempt.attempt)
+                .all()
+            )
+            return [
+                {
+                    "attempt": a.attempt,
+                    "status": a.status,
+                    "return_code": a.return_code,
+                    "failure": a.failure,
+                    "message": a.message,
+                    "worker_id": a.worker_id,
+                    "log_start": a.log_start,
+                    "log_end": a.log_end,
+                    "resource_usage": a.resource_usage,
+                    "started_at": a.started_at,
+                    "finished_at": a.finished_at,
+                }
+                for a in attempts
+            ]
+        finally:
+            db.close()
+
+    def is_task_active(self, task_id: str) -> bool:
+        """任务是否仍在等待或运行中
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            是否未结束
+        """
+        if self.scheduler.is_queued(task_id) or self.scheduler.is_running(task_id):
+            return True
+        # 远程worker执行的任务不经过本机调度器
+        status = self.get_task_status(task_id)
+        return status is not None and status["status"] in ("pending", "running")
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """获取调度队列统计信息
+
+        Returns:
+            队列深度、运行数与等待时间统计，等待远程worker租用的任务数，
+            以及启用资源准入时的主机资源容量、预留量与实时读数
+        """
+        stats = self.scheduler.get_stats()
+        stats["worker_queued"] = self.leases.count_queued()
+        if self.resources is not None:
+            stats["resources"] = self.resources.get_stats()
+        return stats
+
+    def record_task_transition(
+        self, task_id: str, script_id: int, old_status: str, new_status: str
+    ):
+        """登记已提交到数据库的任务状态变化，更新统计并通知等待者
+
+        Args:
+            task_id: 任务ID
+            script_id: 脚本ID
+            old_status: 原状态
+            new_status: 新状态
+        """
+        self.stats.record_transition(script_id, old_status, new_status)
+        self.notifier.publish(task_id, new_status)
+
+    def finish_remote_task(
+        self,
+        task_id: str,
+        return_code: Optional[int],
+        error: Optional[str] = None,
+        timed_out: bool = False,
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """记录远程worker执行结束的任务，结果文件需已写入任务目录
+
+        Args:
+            task_id: 任务ID
+            return_code: 脚本退出码
+            error: 脚本未能运行时的错误信息
+            timed_out: 脚本是否因运行超时被worker终止
+            usage: worker记录的资源用量
+        """
+        if error:
+            reason = "error"
+        elif timed_out:
+            reason = "timeout"
+        else:
+            reason = "exited"
+        self._on_task_exit(task_id, return_code, reason, error, usage)
+
+    def get_task_limits(self, task_id: str) -> Tuple[Optional[int], Dict[str, int]]:
+        """获取任务生效的运行限制
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            (运行超时秒数，None表示不限制, 启动进程时设置的rlimits)
+        """
+        db = self.db_manager.get_session()
+        try:
+            row = (
+                db.query(*LIMIT_COLUMNS)
+                .select_from(Task)
+                .join(Script, Task.script_id == Script.id)
+                .filter(Task.id == task_id)
+                .first()
+            )
+        finally:
+            db.close()
+        return self._task_limits(row)
+
+    def _task_limits(self, row: Any) -> Tuple[Optional[int], Dict[str, int]]:
+        """由LIMIT_COLUMNS的查询结果得到运行超时与rlimits"""
+        timeout = getattr(row, "timeout", None)
+        if timeout is None:
+            timeout = self.config.task_timeout
+        rlimits = {}
+        if getattr(row, "cpu_time_limit", None):
+            rlimits["cpu_time"] = int(row.cpu_time_limit)
+        if getattr(row, "memory_limit_mb", None):
+            rlimits["memory_mb"] = int(row.memory_limit_mb)
+        return (int(timeout) if timeout else None), rlimits
 
     def cancel_task(self, task_id: str):
         """取消任务
@@ -127,68 +742,140 @@ class TaskManager:
         Args:
             task_id: 任务ID
         """
-        # 如果任务正在运行，终止进程
-        if task_id in self.running_processes:
-            process = self.running_processes[task_id]
-            try:
-                process.terminate()
-                process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            finally:
-                del self.running_processes[task_id]
+        # 如果任务仍在等待队列中，直接移出队列
+        if not self.scheduler.remove(task_id) and self.scheduler.is_running(task_id):
+            # 任务正在运行，由监督器终止进程并释放槽位
+            self.supervisor.cancel(task_id)
 
-        # 更新任务状态
+        # 更新任务状态；等待退避的任务不在调度队列中，到期时因状态不是pending被跳过
         self._update_task_status(task_id, "cancelled", finished_at=datetime.utcnow())
+        self._finish_attempt(task_id, "cancelled")
 
-    def get_task_log(self, task_id: str, lines: int = 100) -> str:
+    def get_task_log(
+        self, task_id: str, lines: int = 100, line_offset: int = 0
+    ) -> str:
         """获取任务日志
 
         Args:
             task_id: 任务ID
             lines: 日志行数
+            line_offset: 跳过末尾的行数
 
         Returns:
             日志内容
         """
-        log_file = self.tasks_dir / task_id / "log.txt"
-        if not log_file.exists():
-            return ""
-
         try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                all_lines = f.readlines()
-                if lines > 0:
-                    return "".join(all_lines[-lines:])
-                else:
-                    return "".join(all_lines)
+            window = self.read_task_log(task_id, lines=lines, line_offset=line_offset)
+            return window["log"]
         except Exception as e:
             return f"读取日志失败: {e}"
 
-    def create_metadata_archive(self, task_id: str) -> str:
-        """创建中间文件压缩包
+    def get_task_log_path(self, task_id: str) -> Path:
+        """获取任务日志文件路径
 
         Args:
             task_id: 任务ID
 
         Returns:
-            压缩包路径
+            日志文件路径
         """
-        task_dir = self.tasks_dir / task_id
-        metadata_dir = task_dir / "metadata"
+        return self.tasks_dir / task_id / "log.txt"
+
+    def read_task_log(
+        self,
+        task_id: str,
+        lines: int = 100,
+        line_offset: int = 0,
+        byte_offset: Optional[int] = None,
+        max_bytes: int = MAX_READ_BYTES,
+        attempt: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """按行或按字节窗口读取任务日志
+
+        指定byte_offset时按字节窗口读取，否则从文件末尾反向读取最后若干行。
+        两种方式的开销都只与返回的数据量有关，与日志总大小无关。
+        各次尝试的输出依次追加在同一个日志文件中；指定attempt时只按字节窗口
+        读取该次尝试的日志段，偏移量仍是日志文件中的位置。
+
+        Args:
+            task_id: 任务ID
+            lines: 日志行数，小于等于0时返回全部日志
+            line_offset: 跳过末尾的行数
+            byte_offset: 起始字节偏移，负数表示相对文件末尾（指定attempt时相对日志段末尾）
+            max_bytes: 按字节读取时最多返回的字节数
+            attempt: 尝试序号，None表示整个日志
+
+        Returns:
+            日志窗口，包含log、offset、next_offset与size
+
+        Raises:
+            ValueError: 任务没有该次尝试
+        """
+        log_file = self.get_task_log_path(task_id)
+        if attempt is not None:
+            start, end = self._attempt_log_range(task_id, attempt)
+            if not log_file.exists():
+                return {"log": "", "offset": start, "next_offset": start, "size": start}
+            size = log_file.stat().st_size
+            end = size if end is None else min(end, size)
+            if byte_offset is None:
+                byte_offset = start
+            elif byte_offset < 0:
+                byte_offset += end
+            byte_offset = min(max(start, byte_offset), end)
+            window = read_range(log_file, byte_offset, min(max_bytes, end - byte_offset))
+            return {
+                "log": window["content"].decode("utf-8", errors="replace"),
+                "offset": window["start"],
+                "next_offset": window["end"],
+                "size": end,
+            }
+
+        if not log_file.exists():
+            return {"log": "", "offset": 0, "next_offset": 0, "size": 0}
 
-        if not metadata_dir.exists():
-            raise FileNotFoundError(f"中间文件目录不存在: {metadata_dir}")
+        if byte_offset is not None:
+            window = read_range(log_file, byte_offset, max_bytes)
+        else:
+            window = tail_lines(log_file, lines, line_offset)
+
+        return {
+            "log": window["content"].decode("utf-8", errors="replace"),
+            "offset": window["start"],
+            "next_offset": window["end"],
+            "size": window["size"],
+        }
+
+    def _attempt_log_range(self, task_id: str, attempt: int) -> Tuple[int, Optional[int]]:
+        """任务某次尝试在日志文件中的字节范围，尚未结束的尝试end为None
 
-        zip_path = task_dir / f"{task_id}_metadata.zip"
+        Raises:
+            ValueError: 任务没有该次尝试
+        """
+        db = self.db_manager.get_session()
+        try:
+            row = (
+                db.query(TaskAttempt.log_start, TaskAttempt.log_end)
+                .filter(TaskAttempt.task_id == task_id, TaskAttempt.attempt == attempt)
+                .first()
+            )
+        finally:
+            db.close()
+        if row is None:
+            raise ValueError(f"任务没有第{attempt}次尝试")
+        return row.log_start or 0, row.log_end
+
+    def create_metadata_archive(self, task_id: str) -> str:
+        """创建中间文件压缩包
 
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in metadata_dir.rglob("*"):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(metadata_dir)
-                    zipf.write(file_path, arcname)
+        Args:
+            task_id: 任务ID
 
-        return str(zip_path)
+        Returns:
+            压缩包路径（位于压缩包缓存目录中）
+        """
+        metadata_dir = self._get_archive_source(task_id, "metadata")
+        return str(self.archive_cache.build(f"{task_id}_metadata", metadata_dir))
 
     def create_result_archive(self, task_id: str) -> str:
         """创建结果文件压缩包
@@ -197,32 +884,63 @@ class TaskManager:
             task_id: 任务ID
 
         Returns:
-            压缩包路径
+            压缩包路径（位于压缩包缓存目录中）
         """
-        task_dir = self.tasks_dir / task_id
-        output_dir = task_dir / "output"
+        output_dir = self._get_archive_source(task_id, "output")
+        return str(self.archive_cache.build(f"{task_id}_result", output_dir))
 
-        if not output_dir.exists():
-            raise FileNotFoundError(f"结果文件目录不存在: {output_dir}")
+    def iter_metadata_archive(self, task_id: str) -> Iterator[bytes]:
+        """流式生成中间文件压缩包
 
-        zip_path = task_dir / f"{task_id}_result.zip"
+        Args:
+            task_id: 任务ID
 
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in output_dir.rglob("*"):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(output_dir)
-                    zipf.write(file_path, arcname)
+        Returns:
+            压缩包数据块迭代器
 
-        return str(zip_path)
+        Raises:
+            FileNotFoundError: 中间文件目录不存在
+        """
+        return self._iter_archive(task_id, "metadata", f"{task_id}_metadata")
 
-    def _run_task(self, task_id: str):
-        """运行任务（在单独线程中执行）
+    def iter_result_archive(self, task_id: str) -> Iterator[bytes]:
+        """流式生成结果文件压缩包
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            压缩包数据块迭代器
+
+        Raises:
+            FileNotFoundError: 结果文件目录不存在
+        """
+        return self._iter_archive(task_id, "output", f"{task_id}_result")
+
+    def _iter_archive(self, task_id: str, subdir: str, name: str) -> Iterator[bytes]:
+        """流式生成压缩包，已结束的任务通过缓存复用之前生成的压缩包"""
+        source_dir = self._get_archive_source(task_id, subdir)
+
+        # 运行中的任务目录仍在变化，直接生成而不写入缓存
+        if self.is_task_active(task_id):
+            return iter_zip_directory(source_dir)
+        return self.archive_cache.stream(name, source_dir)
+
+    def _get_archive_source(self, task_id: str, subdir: str) -> Path:
+        """获取要打包的任务子目录"""
+        source_dir = self.tasks_dir / task_id / subdir
+        if not source_dir.exists():
+            label = "中间文件" if subdir == "metadata" else "结果文件"
+            raise FileNotFoundError(f"{label}目录不存在: {source_dir}")
+        return source_dir
+
+    def _launch_task(self, task_id: str):
+        """启动任务（由调度器调用）
 
         Args:
             task_id: 任务ID
         """
         task_dir = self.tasks_dir / task_id
-        log_file = task_dir / "log.txt"
 
         try:
             # 查找Python脚本文件
@@ -238,62 +956,340 @@ class TaskManager:
             env["CUBQUEUE_TASK_DIR"] = str(task_dir)
             env["CUBQUEUE_FILES_DIR"] = str(task_dir / "files")
 
-            # 启动进程
-            with open(log_file, "w", encoding="utf-8") as log_f:
-                process = subprocess.Popen(
-                    ["python", script_file.name],
-                    cwd=str(task_dir),
-                    stdout=log_f,
-                    stderr=subprocess.STDOUT,
-                    env=env,
-                    text=True,
+            # 按脚本指定的执行后端启动
+            db = self.db_manager.get_session()
+            try:
+                row = (
+                    db.query(
+                        Script.executor,
+                        Script.preload,
+                        func.coalesce(Task.cpus, Script.cpus).label("cpus"),
+                        func.coalesce(Task.memory_mb, Script.memory_mb).label("memory_mb"),
+                        *LIMIT_COLUMNS,
+                    )
+                    .join(Task, Task.script_id == Script.id)
+                    .filter(Task.id == task_id)
+                    .first()
                 )
+            finally:
+                db.close()
+            executor = self.get_executor(row.executor if row is not None else "subprocess")
+            options = {}
+            if row is not None:
+                options["preload"] = row.preload or []
+                # 远程执行后端按声明的资源分配节点
+                if row.cpus:
+                    options["num_cpus"] = row.cpus
+                if row.memory_mb:
+                    options["memory_mb"] = row.memory_mb
+            timeout, options["rlimits"] = self._task_limits(row)
+
+            # 更新任务状态为运行中，登记本次尝试
+            self._update_task_status(task_id, "running", started_at=datetime.utcnow())
+            self.begin_attempt(task_id)
+
+            # 交给监督器启动进程
+            self.supervisor.launch(
+                task_id,
+                ["python", script_file.name],
+                cwd=str(task_dir),
+                env=env,
+                log_path=str(task_dir / "log.txt"),
+                timeout=timeout,
+                executor=executor,
+                options=options,
+            )
+        except Exception as e:
+            self._on_task_exit(task_id, None, "error", str(e))
 
-                # 记录运行中的进程
-                self.running_processes[task_id] = process
+    def get_executor(self, name: str) -> TaskExecutor:
+        """获取执行后端，首次使用时创建
 
-                # 等待进程完成
-                return_code = process.wait()
+        Args:
+            name: 后端名称
 
-                # 移除进程记录
-                if task_id in self.running_processes:
-                    del self.running_processes[task_id]
+        Returns:
+            执行后端
 
-                # 更新任务状态
-                if return_code == 0:
-                    self._update_task_status(
-                        task_id,
-                        "completed",
-                        message="任务成功完成",
-                        finished_at=datetime.utcnow(),
-                    )
-                else:
-                    self._update_task_status(
-                        task_id,
-                        "failed",
-                        message=f"任务失败，退出码: {return_code}",
-                        finished_at=datetime.utcnow(),
-                    )
+        Raises:
+            ValueError: 未知的后端
+            RuntimeError: 后端依赖未安装
+        """
+        with self._executors_lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                executor = create_executor(name, self.config)
+                self._executors[name] = executor
+            return executor
 
-        except Exception as e:
-            # 记录错误日志
+    def shutdown(self):
+        """服务器关闭时停止调度、终止运行中任务的进程树并释放执行后端（阻塞）
+
+        被中断的任务标记为failed，等待中的任务保持pending，下次启动时重新入队。
+        """
+        self.scheduler.close()
+        self.supervisor.shutdown()
+        with self._executors_lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
             try:
-                with open(log_file, "a", encoding="utf-8") as log_f:
-                    log_f.write(f"\n任务执行错误: {e}\n")
-            except:
-                pass
+                executor.shutdown()
+            except Exception as e:
+                print(f"[WARN] 关闭执行后端失败: {e}")
+
+    def _on_task_exit(
+        self,
+        task_id: str,
+        return_code: Optional[int],
+        reason: str,
+        error: Optional[str] = None,
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """任务进程结束回调（在监督器的回调线程中执行）
+
+        失败或超时的任务按重试策略重新进入等待队列时，不记录为结束状态。
+
+        Args:
+            task_id: 任务ID
+            return_code: 进程退出码
+            reason: 结束原因（exited、timeout、cancelled、shutdown或error）
+            error: 错误信息
+            usage: 资源用量
+        """
+        try:
+            if reason == "shutdown":
+                status, message = "failed", "服务器关闭，任务被中断"
+            elif reason == "cancelled":
+                status, message = "cancelled", None
+            elif reason == "error":
+                # 记录错误日志
+                try:
+                    log_file = self.tasks_dir / task_id / "log.txt"
+                    with open(log_file, "a", encoding="utf-8") as log_f:
+                        log_f.write(f"\n任务执行错误: {error}\n")
+                except OSError:
+                    pass
+                status, message = "failed", f"任务执行错误: {error}"
+            elif reason == "timeout":
+                wall_seconds = (usage or {}).get("wall_seconds")
+                status = "timeout"
+                message = (
+                    f"任务运行超时（{wall_seconds:.0f}秒），已终止"
+                    if wall_seconds is not None
+                    else "任务运行超时，已终止"
+                )
+            elif return_code == 0:
+                status, message = "completed", "任务成功完成"
+            else:
+                status, message = "failed", f"任务失败，退出码: {return_code}"
+
+            failure = classify_failure(return_code, reason)
+            self._finish_attempt(task_id, status, return_code, failure, message, usage)
+            if failure is not None and self._retry_task(task_id, failure):
+                return
 
-            # 更新任务状态
             self._update_task_status(
                 task_id,
-                "failed",
-                message=f"任务执行错误: {e}",
+                status,
+                message=message,
                 finished_at=datetime.utcnow(),
+                resource_usage=usage,
+            )
+            if status == "completed":
+                self._cache_task_result(task_id)
+        finally:
+            # 释放调度槽位，启动等待中的任务
+            self.scheduler.task_finished(task_id)
+            self.sweeps.notify()
+
+    def begin_attempt(self, task_id: str, worker_id: Optional[str] = None):
+        """登记任务当前序号的尝试开始，日志段从日志文件当前末尾开始
+
+        远程worker的租约过期后同一次尝试会被重新租用，此时丢弃该次尝试已写入的日志。
+
+        Args:
+            task_id: 任务ID
+            worker_id: 执行本次尝试的远程worker
+        """
+        log_file = self.get_task_log_path(task_id)
+        db = self.db_manager.get_session()
+        try:
+            task = db.query(Task).filter(Task.id == task_id).first()
+            if task is None:
+                return
+            attempt = task.attempt or 1
+            record = (
+                db.query(TaskAttempt)
+                .filter(TaskAttempt.task_id == task_id, TaskAttempt.attempt == attempt)
+                .first()
+            )
+            if record is None:
+                record = TaskAttempt(task_id=task_id, attempt=attempt)
+                record.log_start = log_file.stat().st_size if log_file.exists() else 0
+                db.add(record)
+            else:
+                if log_file.exists():
+                    with open(log_file, "r+b") as f:
+                        f.truncate(record.log_start or 0)
+                record.status = "running"
+                record.log_end = None
+                record.finished_at = None
+            record.worker_id = worker_id
+            record.started_at = datetime.utcnow()
+            task.retry_at = None
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish_attempt(
+        self,
+        task_id: str,
+        status: str,
+        return_code: Optional[int] = None,
+        failure: Optional[str] = None,
+        message: Optional[str] = None,
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """记录任务当前尝试的结束，日志段到日志文件当前末尾为止"""
+        log_file = self.get_task_log_path(task_id)
+        db = self.db_manager.get_session()
+        try:
+            record = (
+                db.query(TaskAttempt)
+                .join(Task, Task.id == TaskAttempt.task_id)
+                .filter(
+                    TaskAttempt.task_id == task_id,
+                    TaskAttempt.attempt == Task.attempt,
+                    TaskAttempt.status == "running",
+                )
+                .first()
+            )
+            if record is None:
+                return
+            record.status = status
+            record.return_code = return_code
+            record.failure = failure
+            record.message = message
+            record.resource_usage = usage
+            record.log_end = log_file.stat().st_size if log_file.exists() else 0
+            record.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def _retry_policy(self, row: Any) -> RetryPolicy:
+        """由RETRY_COLUMNS的查询结果得到重试策略，未设置的项使用全局配置"""
+        max_attempts = row.max_attempts
+        if max_attempts is None:
+            max_attempts = self.config.task_max_attempts
+        backoff = row.retry_backoff
+        if backoff is None:
+            backoff = self.config.retry_backoff
+        return RetryPolicy(int(max_attempts), float(backoff), row.retry_on or None)
+
+    def _retry_task(self, task_id: str, failure: str) -> bool:
+        """按重试策略将失败的任务放回等待队列
+
+        Args:
+            task_id: 任务ID
+            failure: 本次尝试的失败类别
+
+        Returns:
+            是否会重试
+        """
+        db = self.db_manager.get_session()
+        try:
+            row = (
+                db.query(
+                    Task.status,
+                    Task.script_id,
+                    Task.attempt,
+                    Script.executor,
+                    *RETRY_COLUMNS,
+                )
+                .join(Script, Task.script_id == Script.id)
+                .filter(Task.id == task_id)
+                .first()
+            )
+            if row is None or row.status != "running":
+                return False
+            policy = self._retry_policy(row)
+            attempt = row.attempt or 1
+            if not policy.should_retry(attempt, failure):
+                return False
+
+            delay = policy.delay(attempt, self.config.retry_backoff_max)
+            # 只更新仍在运行的任务，避免覆盖同时发生的取消
+            updated = (
+                db.query(Task)
+                .filter(Task.id == task_id, Task.status == "running")
+                .update(
+                    {
+                        Task.status: "pending",
+                        Task.attempt: attempt + 1,
+                        Task.retry_at: datetime.utcnow() + timedelta(seconds=delay),
+                        Task.message: (
+                            f"第{attempt}次尝试失败（{failure}），{delay:.0f}秒后"
+                            f"进行第{attempt + 1}次尝试（最多{policy.max_attempts}次）"
+                        ),
+                        Task.started_at: None,
+                        Task.finished_at: None,
+                        Task.resource_usage: None,
+                        Task.worker_id: None,
+                        Task.lease_expires_at: None,
+                    },
+                    synchronize_session=False,
+                )
             )
+            db.commit()
+        finally:
+            db.close()
+        if not updated:
+            return False
 
-            # 清理进程记录
-            if task_id in self.running_processes:
-                del self.running_processes[task_id]
+        self.record_task_transition(task_id, row.script_id, "running", "pending")
+        # 远程worker执行的任务在退避结束后由worker租用，本机任务到期后重新入队
+        if row.executor != WORKER_EXECUTOR:
+            self.retries.schedule(task_id, delay)
+        return True
+
+    def _resubmit_tasks(self, task_ids: List[str]):
+        """将退避结束的任务重新放入调度队列（在重试线程中执行）
+
+        等待期间被取消的任务不再是pending，直接跳过。
+        """
+        db = self.db_manager.get_session()
+        try:
+            pending = {
+                task_id
+                for (task_id,) in db.query(Task.id).filter(
+                    Task.id.in_(task_ids), Task.status == "pending"
+                )
+            }
+        finally:
+            db.close()
+        task_ids = [task_id for task_id in task_ids if task_id in pending]
+        if task_ids:
+            self.scheduler.submit_many(self._local_queue_entries(task_ids))
+
+    def _cache_task_result(self, task_id: str):
+        """将成功完成的任务结果保存到结果缓存（任务没有指纹时跳过）"""
+        if not self.config.result_cache_enabled:
+            return
+        db = self.db_manager.get_session()
+        try:
+            fingerprint = (
+                db.query(Task.fingerprint).filter(Task.id == task_id).scalar()
+            )
+        finally:
+            db.close()
+        if not fingerprint:
+            return
+        try:
+            self.result_cache.store(fingerprint, task_id, self.tasks_dir / task_id)
+        except Exception as e:
+            print(f"[ERROR] 保存结果缓存失败 {task_id}: {e}")
 
     def _process_file_placeholders(
         self, args: Dict[str, Any], file_mappings: Dict[str, str], task_dir: Path
@@ -333,6 +1329,7 @@ class TaskManager:
         message: str = None,
         started_at: datetime = None,
         finished_at: datetime = None,
+        resource_usage: Optional[Dict[str, float]] = None,
     ):
         """更新任务状态
 
@@ -342,11 +1339,13 @@ class TaskManager:
             message: 状态消息
             started_at: 开始时间
             finished_at: 完成时间
+            resource_usage: 资源用量
         """
         db = self.db_manager.get_session()
         try:
             task = db.query(Task).filter(Task.id == task_id).first()
             if task:
+                old_status = task.status
                 task.status = status
                 if message:
                     task.message = message
@@ -354,7 +1353,10 @@ class TaskManager:
                     task.started_at = started_at
                 if finished_at:
                     task.finished_at = finished_at
+                if resource_usage is not None:
+                    task.resource_usage = resource_usage
                 db.commit()
+                self.record_task_transition(task_id, task.script_id, old_status, status)
         finally:
             db.close()
 
@@ -362,15 +1364,67 @@ class TaskManager:
         """恢复运行中的任务状态"""
         db = self.db_manager.get_session()
         try:
-            # 查找状态为running的任务
-            running_tasks = db.query(Task).filter(Task.status == "running").all()
+            # 查找本机运行中的任务；远程worker持有的任务等待其继续续约或租约过期
+            running_tasks = (
+                db.query(Task)
+                .filter(Task.status == "running", Task.worker_id.is_(None))
+                .all()
+            )
 
+            now = datetime.utcnow()
             for task in running_tasks:
                 # 将状态重置为failed，因为服务器重启后无法恢复进程
                 task.status = "failed"
                 task.message = "服务器重启，任务被中断"
-                task.finished_at = datetime.utcnow()
+                task.finished_at = now
+
+            # 同时结束这些任务未结束的尝试记录
+            if running_tasks:
+                (
+                    db.query(TaskAttempt)
+                    .filter(
+                        TaskAttempt.status == "running",
+                        TaskAttempt.task_id.in_([task.id for task in running_tasks]),
+                    )
+                    .update(
+                        {
+                            TaskAttempt.status: "failed",
+                            TaskAttempt.message: "服务器重启，任务被中断",
+                            TaskAttempt.finished_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
 
             db.commit()
+
+            # 加载任务计数，此后的状态变化均通过_update_task_status增量更新
+            self.stats.load(db)
+
+            # 按提交顺序将pending任务重新放入调度队列
+            pending = (
+                db.query(*QUEUE_COLUMNS)
+                .join(Script, Task.script_id == Script.id)
+                .filter(Task.status == "pending", Script.executor != WORKER_EXECUTOR)
+                .order_by(Task.created_at)
+                .all()
+            )
         finally:
             db.close()
+
+        rows = []
+        now = datetime.utcnow()
+        for row in pending:
+            if not (self.tasks_dir / row.id).exists():
+                self._update_task_status(
+                    row.id,
+                    "failed",
+                    message="任务目录不存在",
+                    finished_at=datetime.utcnow(),
+                )
+            elif row.retry_at is not None and row.retry_at > now:
+                # 仍在等待重试退避的任务到期后再入队
+                self.retries.schedule(row.id, (row.retry_at - now).total_seconds())
+            else:
+                rows.append(row)
+        self.scheduler.submit_many(self._queue_entries(rows))
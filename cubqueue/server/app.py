@@ -1,43 +1,184 @@
 """CubQueue FastAPI应用"""
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Depends,
+    Request,
+    Response,
+    Query,
+)
 from fastapi.responses import FileResponse, StreamingResponse
-from typing import List, Optional
+from sqlalchemy import and_, or_
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import asyncio
+import base64
 import os
 import json
 import uuid
 from pathlib import Path
 
-from ..core.models import Script, Task
+from ..core.models import Script, Task, TaskFile
 from ..core.task_manager import TaskManager
-from ..core.file_manager import FileManager
+from ..core.config import CubQueueConfig, init_config
 from ..core.database import get_db, SessionLocal, init_database
-from .schemas import ScriptResponse, TaskResponse, TaskStatusResponse
+from ..core.executors import EXECUTOR_NAMES, executor_available
+from ..core.leases import LeaseError
+from ..core.log_reader import MAX_READ_BYTES, follow_log, tail_lines
+from ..core.resources import ResourceDemand
+from ..core.retry import parse_retry_on
+from ..core.stats import FINISHED_STATUSES
+from .schemas import (
+    ScriptResponse,
+    TaskResponse,
+    BatchSubmitResponse,
+    SweepResponse,
+    TaskStatusResponse,
+    TaskAttemptResponse,
+    QueueStatsResponse,
+    StatsResponse,
+    TaskLogResponse,
+    TaskWaitRequest,
+    TaskWaitResponse,
+    BlobQueryRequest,
+    BlobQueryResponse,
+    BlobResponse,
+    WorkerLeaseRequest,
+    WorkerLeaseResponse,
+    WorkerHeartbeatRequest,
+    WorkerHeartbeatResponse,
+)
 
 
-def create_app(base_dir: str = None) -> FastAPI:
-    """创建FastAPI应用实例"""
+def _is_valid_digest(digest: str) -> bool:
+    """检查是否为合法的SHA-256十六进制摘要"""
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest.lower())
+
+
+# 任务列表单页最大数量
+MAX_LIST_LIMIT = 1000
+
+# 等待任务结束的单次请求最长阻塞时间（秒）
+MAX_WAIT_TIMEOUT = 300
+
+# 批量等待单次请求最多包含的任务数
+MAX_WAIT_TASKS = 10000
+
+# 批量提交单次请求最多包含的任务数
+MAX_BATCH_TASKS = 100000
+
+
+def _encode_cursor(created_at: datetime, task_id: str) -> str:
+    """将分页位置编码为不透明的游标"""
+    raw = f"{created_at.isoformat()}|{task_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析分页游标
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, task_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), task_id
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def _to_utc_naive(value: datetime) -> datetime:
+    """将带时区的时间转换为数据库中使用的UTC naive时间"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def create_app(base_dir: str = None, config: CubQueueConfig = None) -> FastAPI:
+    """创建FastAPI应用实例
+
+    Args:
+        base_dir: 工作目录
+        config: 配置实例，如果为None则根据base_dir创建默认配置
+    """
     app = FastAPI(
         title="CubQueue API",
         description="轻量级任务监控系统 RESTful API",
         version="0.1.0",
     )
 
+    # 初始化配置
+    if config is None:
+        config = init_config(base_dir)
+
     # 初始化数据库
-    init_database(base_dir)
+    init_database(base_dir, config)
     
     # 初始化组件
-    task_manager = TaskManager(base_dir)
-    file_manager = FileManager(base_dir)
+    task_manager = TaskManager(base_dir, config=config)
+    # 与任务管理器共用文件管理器，blob的检查、链接与回收使用同一把锁
+    file_manager = task_manager.file_manager
+
+    @app.on_event("shutdown")
+    async def shutdown_task_manager():
+        """服务器关闭时终止运行中的任务，任务在独立会话中运行，不会随服务器收到信号"""
+        await run_in_threadpool(task_manager.shutdown)
 
     @app.post("/api/script", response_model=ScriptResponse)
     async def register_script(
         name: str = Form(...),
         desc: str = Form(...),
         script: UploadFile = File(...),
+        executor: str = Form("subprocess"),
+        preload: str = Form(""),
+        cpus: Optional[float] = Form(None),
+        memory_mb: Optional[int] = Form(None),
+        timeout: Optional[int] = Form(None),
+        cpu_time_limit: Optional[int] = Form(None),
+        memory_limit_mb: Optional[int] = Form(None),
+        max_attempts: Optional[int] = Form(None),
+        retry_backoff: Optional[float] = Form(None),
+        retry_on: Optional[str] = Form(None),
         db: SessionLocal = Depends(get_db),
     ):
-        """注册脚本"""
+        """注册脚本
+
+        executor为任务的执行后端：subprocess在服务器本机启动子进程；
+        forkserver由预先导入了preload（逗号分隔的模块名）的常驻解释器fork产生，
+        省去每个任务启动解释器与导入模块的时间；ray以Ray远程函数在集群中运行。
+        cpus与memory_mb声明每个任务需要的CPU数与内存（MB），服务器只在主机资源
+        足够时启动任务；提交任务时可以覆盖。timeout为每个任务的运行超时（秒，0表示
+        不限制，未设置时使用服务器配置task_timeout），超时的任务整个进程组被终止并
+        进入timeout状态；cpu_time_limit与memory_limit_mb在进程启动时以RLIMIT_CPU
+        与RLIMIT_AS限制CPU时间（秒）与地址空间（MB）。提交任务时同样可以覆盖。
+        max_attempts为每个任务最多尝试的次数（包括第一次），失败或超时的任务等待
+        retry_backoff秒（每次失败后翻倍）后重新进入等待队列；retry_on以逗号分隔
+        只重试的失败类别：退出码（如1）、信号（如SIGKILL）、timeout或error，
+        未设置时任何失败都重试。提交任务时同样可以覆盖。
+        """
+        _check_resources(cpus, memory_mb)
+        _check_limits(timeout, cpu_time_limit, memory_limit_mb)
+        retry_classes = _check_retry(max_attempts, retry_backoff, retry_on)
+        if executor not in EXECUTOR_NAMES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"executor必须为 {' 或 '.join(EXECUTOR_NAMES)}",
+            )
+        if not executor_available(executor):
+            raise HTTPException(
+                status_code=400, detail=f"服务器未安装执行后端 {executor} 的依赖"
+            )
+        modules = [m.strip() for m in preload.split(",") if m.strip()]
+        for module in modules:
+            if not all(part.isidentifier() for part in module.split(".")):
+                raise HTTPException(status_code=400, detail=f"无效的模块名: {module}")
+
         try:
             # 验证脚本名称
             if not name.replace("_", "").replace("-", "").isalnum():
@@ -55,7 +196,21 @@ def create_app(base_dir: str = None) -> FastAPI:
             script_path = file_manager.save_script(name, script_content, desc)
 
             # 创建数据库记录
-            db_script = Script(name=name, description=desc, path=script_path)
+            db_script = Script(
+                name=name,
+                description=desc,
+                path=script_path,
+                executor=executor,
+                preload=modules or None,
+                cpus=cpus,
+                memory_mb=memory_mb,
+                timeout=timeout,
+                cpu_time_limit=cpu_time_limit,
+                memory_limit_mb=memory_limit_mb,
+                max_attempts=max_attempts,
+                retry_backoff=retry_backoff,
+                retry_on=retry_classes,
+            )
             db.add(db_script)
             db.commit()
             db.refresh(db_script)
@@ -64,6 +219,16 @@ def create_app(base_dir: str = None) -> FastAPI:
                 id=db_script.id,
                 name=db_script.name,
                 description=db_script.description,
+                executor=db_script.executor,
+                preload=db_script.preload,
+                cpus=db_script.cpus,
+                memory_mb=db_script.memory_mb,
+                timeout=db_script.timeout,
+                cpu_time_limit=db_script.cpu_time_limit,
+                memory_limit_mb=db_script.memory_limit_mb,
+                max_attempts=db_script.max_attempts,
+                retry_backoff=db_script.retry_backoff,
+                retry_on=db_script.retry_on,
                 created_at=db_script.created_at,
             )
         except Exception as e:
@@ -78,20 +243,126 @@ def create_app(base_dir: str = None) -> FastAPI:
                 id=script.id,
                 name=script.name,
                 description=script.description,
+                executor=script.executor,
+                preload=script.preload,
+                cpus=script.cpus,
+                memory_mb=script.memory_mb,
+                timeout=script.timeout,
+                cpu_time_limit=script.cpu_time_limit,
+                memory_limit_mb=script.memory_limit_mb,
+                max_attempts=script.max_attempts,
+                retry_backoff=script.retry_backoff,
+                retry_on=script.retry_on,
                 created_at=script.created_at,
             )
             for script in scripts
         ]
 
+    def _parse_file_refs(file_refs: str) -> List[Tuple[str, str]]:
+        """解析并校验按摘要引用的文件列表
+
+        Returns:
+            (摘要, 文件名)列表
+        """
+        try:
+            refs = json.loads(file_refs)
+            ref_pairs = [
+                (ref["digest"], ref.get("filename") or ref["digest"]) for ref in refs
+            ]
+        except (json.JSONDecodeError, TypeError, KeyError):
+            raise HTTPException(status_code=400, detail="file_refs格式错误")
+        missing = [
+            digest
+            for digest, _ in ref_pairs
+            if not _is_valid_digest(digest)
+            or not file_manager.blob_store.has_blob(digest)
+        ]
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"服务器上不存在以下文件: {', '.join(missing)}",
+            )
+        return ref_pairs
+
+    def _check_resources(cpus: Optional[float], memory_mb: Optional[int]):
+        """校验声明的资源需求，内存需求不能超过主机可分配的内存"""
+        if cpus is not None and cpus <= 0:
+            raise HTTPException(status_code=400, detail="cpus必须大于0")
+        if memory_mb is not None and memory_mb <= 0:
+            raise HTTPException(status_code=400, detail="memory_mb必须大于0")
+        resources = task_manager.resources
+        if memory_mb is not None and resources is not None:
+            reason = resources.check_demand(ResourceDemand(cpus or 0, memory_mb))
+            if reason:
+                raise HTTPException(status_code=400, detail=reason)
+
+    def _check_limits(
+        timeout: Optional[int],
+        cpu_time_limit: Optional[int],
+        memory_limit_mb: Optional[int],
+    ):
+        """校验运行限制"""
+        if timeout is not None and timeout < 0:
+            raise HTTPException(status_code=400, detail="timeout不能为负数")
+        if cpu_time_limit is not None and cpu_time_limit <= 0:
+            raise HTTPException(status_code=400, detail="cpu_time_limit必须大于0")
+        if memory_limit_mb is not None and memory_limit_mb <= 0:
+            raise HTTPException(status_code=400, detail="memory_limit_mb必须大于0")
+
+    def _check_retry(
+        max_attempts: Optional[int],
+        retry_backoff: Optional[float],
+        retry_on: Optional[str],
+    ) -> Optional[List[str]]:
+        """校验重试策略
+
+        Returns:
+            规范化的重试失败类别
+        """
+        if max_attempts is not None and max_attempts < 1:
+            raise HTTPException(status_code=400, detail="max_attempts必须大于0")
+        if retry_backoff is not None and retry_backoff < 0:
+            raise HTTPException(status_code=400, detail="retry_backoff不能为负数")
+        try:
+            return parse_retry_on(retry_on)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     @app.post("/api/task", response_model=TaskResponse)
     async def submit_task(
         script_name: str = Form(...),
         arg_file: UploadFile = File(...),
         files: List[UploadFile] = File(default=[]),
         description: Optional[str] = Form(None),
+        file_refs: Optional[str] = Form(None),
+        cache: bool = Form(True),
+        priority: int = Form(0),
+        submitter: Optional[str] = Form(None),
+        cpus: Optional[float] = Form(None),
+        memory_mb: Optional[int] = Form(None),
+        timeout: Optional[int] = Form(None),
+        cpu_time_limit: Optional[int] = Form(None),
+        memory_limit_mb: Optional[int] = Form(None),
+        max_attempts: Optional[int] = Form(None),
+        retry_backoff: Optional[float] = Form(None),
+        retry_on: Optional[str] = Form(None),
         db: SessionLocal = Depends(get_db),
     ):
-        """提交任务"""
+        """提交任务
+
+        file_refs为JSON列表，每项形如{"digest": ..., "filename": ...}，
+        引用服务器上已有的文件，编号接在files上传的文件之后。
+        服务器启用结果缓存且cache为真时，脚本、参数与输入文件都相同的任务
+        直接复用之前已完成任务的结果，返回的新任务处于completed状态。
+        priority越大的任务越先启动，优先级相同的任务按脚本或submitter
+        （取决于服务器配置fair_share_by）分组轮流启动。cpus与memory_mb覆盖
+        脚本注册时声明的资源需求，timeout、cpu_time_limit与memory_limit_mb覆盖
+        脚本注册时设置的运行限制，max_attempts、retry_backoff与retry_on覆盖脚本
+        注册时设置的重试策略。
+        """
+        _check_resources(cpus, memory_mb)
+        _check_limits(timeout, cpu_time_limit, memory_limit_mb)
+        retry_classes = _check_retry(max_attempts, retry_backoff, retry_on)
         try:
             print(f"[DEBUG] 开始处理任务提交: script_name={script_name}")
             print(f"[DEBUG] arg_file: {arg_file.filename if arg_file else None}")
@@ -111,18 +382,32 @@ def create_app(base_dir: str = None) -> FastAPI:
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="参数文件格式错误")
 
-            # 处理上传的文件
+            # 处理上传的文件（分块流式写入，不在内存中保留完整内容）
             file_mappings = {}
+            saved_files = []
             print(f"[DEBUG] 收到 {len(files)} 个文件")
             for i, file in enumerate(files, 1):
                 print(f"[DEBUG] 处理文件 {i}: {file.filename}")
-                file_content = await file.read()
-                print(f"[DEBUG] 文件内容长度: {len(file_content)}")
-                file_uuid = file_manager.save_task_file(
-                    task_id, file.filename, file_content
+                file_info = await run_in_threadpool(
+                    file_manager.save_task_file_stream,
+                    task_id,
+                    file.filename,
+                    file.file,
+                )
+                print(
+                    f"[DEBUG] 文件保存为: {file_info['file_uuid']} "
+                    f"({file_info['file_size']} bytes, sha256={file_info['checksum']})"
                 )
-                print(f"[DEBUG] 文件保存为: {file_uuid}")
-                file_mappings[f"<file{i}>"] = file_uuid
+                file_mappings[f"<file{i}>"] = file_info["file_uuid"]
+                saved_files.append((file.filename, file_info))
+
+            # 处理按摘要引用的已有文件
+            if file_refs:
+                ref_pairs = _parse_file_refs(file_refs)
+                for i, (digest, filename) in enumerate(ref_pairs, len(files) + 1):
+                    file_info = file_manager.link_task_file(task_id, filename, digest)
+                    file_mappings[f"<file{i}>"] = file_info["file_uuid"]
+                    saved_files.append((filename, file_info))
             print(f"[DEBUG] 文件映射: {file_mappings}")
 
             # 创建任务
@@ -134,20 +419,66 @@ def create_app(base_dir: str = None) -> FastAPI:
                 file_mappings=file_mappings,
             )
 
+            # 结果缓存：计算任务指纹，允许时复用指纹相同的已完成任务的结果
+            fingerprint = None
+            cached = {}
+            if config.result_cache_enabled:
+                fingerprint = task_manager.task_fingerprint(
+                    script.id,
+                    args,
+                    [(filename, info["checksum"]) for filename, info in saved_files],
+                )
+                if cache:
+                    cached = await run_in_threadpool(
+                        task_manager.restore_cached_result, task_id, fingerprint
+                    )
+
             # 创建数据库记录
             db_task = Task(
-                id=task_id, script_id=script.id, status="pending", args=json.dumps(args), description=description
+                id=task_id,
+                script_id=script.id,
+                status="pending",
+                args=json.dumps(args),
+                description=description,
+                priority=priority,
+                submitter=submitter,
+                cpus=cpus,
+                memory_mb=memory_mb,
+                timeout=timeout,
+                cpu_time_limit=cpu_time_limit,
+                memory_limit_mb=memory_limit_mb,
+                max_attempts=max_attempts,
+                retry_backoff=retry_backoff,
+                retry_on=retry_classes,
+                fingerprint=fingerprint,
             )
+            for key, value in cached.items():
+                setattr(db_task, key, value)
             db.add(db_task)
+            for filename, file_info in saved_files:
+                db.add(
+                    TaskFile(
+                        task_id=task_id,
+                        filename=filename,
+                        file_uuid=file_info["file_uuid"],
+                        file_size=file_info["file_size"],
+                        checksum=file_info["checksum"],
+                    )
+                )
             db.commit()
+            task_manager.record_task_created(script.id, script_name, status=db_task.status)
 
-            # 启动任务
-            task_manager.start_task(task_id)
+            # 启动任务（命中缓存的任务已经完成）
+            if db_task.status == "pending":
+                task_manager.start_task(task_id)
 
             return TaskResponse(
                 id=task_id,
                 script_name=script_name,
-                status="pending",
+                status=db_task.status,
+                description=description,
+                priority=priority,
+                submitter=submitter,
                 created_at=db_task.created_at,
             )
         except HTTPException:
@@ -158,75 +489,578 @@ def create_app(base_dir: str = None) -> FastAPI:
             print(f"[ERROR] 详细错误: {traceback.format_exc()}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    @app.post("/api/task/batch", response_model=BatchSubmitResponse)
+    async def submit_tasks(
+        script_name: str = Form(...),
+        manifest: UploadFile = File(...),
+        files: List[UploadFile] = File(default=[]),
+        description: Optional[str] = Form(None),
+        file_refs: Optional[str] = Form(None),
+        cache: bool = Form(True),
+        priority: int = Form(0),
+        submitter: Optional[str] = Form(None),
+        cpus: Optional[float] = Form(None),
+        memory_mb: Optional[int] = Form(None),
+        timeout: Optional[int] = Form(None),
+        cpu_time_limit: Optional[int] = Form(None),
+        memory_limit_mb: Optional[int] = Form(None),
+        max_attempts: Optional[int] = Form(None),
+        retry_backoff: Optional[float] = Form(None),
+        retry_on: Optional[str] = Form(None),
+        db: SessionLocal = Depends(get_db),
+    ):
+        """批量提交任务
+
+        manifest为JSON Lines文件，每行是一个任务的参数对象。所有任务共享
+        files上传的文件与file_refs引用的文件（编号规则与单个提交相同），
+        任务记录在同一个事务中写入数据库。cache、priority、submitter、资源
+        需求、运行限制与重试策略的含义与单个提交相同。
+        """
+        _check_resources(cpus, memory_mb)
+        _check_limits(timeout, cpu_time_limit, memory_limit_mb)
+        retry_classes = _check_retry(max_attempts, retry_backoff, retry_on)
+        script = db.query(Script).filter(Script.name == script_name).first()
+        if not script:
+            raise HTTPException(status_code=404, detail="脚本不存在")
+
+        # 解析参数清单
+        args_list = []
+        content = await manifest.read()
+        try:
+            lines = content.decode("utf-8").splitlines()
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="参数清单必须为UTF-8编码")
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                args = json.loads(line)
+            except json.JSONDecodeError:
+                raise HTTPException(
+                    status_code=400, detail=f"参数清单第{line_no}行格式错误"
+                )
+            if not isinstance(args, dict):
+                raise HTTPException(
+                    status_code=400, detail=f"参数清单第{line_no}行不是JSON对象"
+                )
+            args_list.append(args)
+        if not args_list:
+            raise HTTPException(status_code=400, detail="参数清单为空")
+        if len(args_list) > MAX_BATCH_TASKS:
+            raise HTTPException(
+                status_code=400, detail=f"单次最多提交{MAX_BATCH_TASKS}个任务"
+            )
+
+        # 共享文件只写入存储一次，各任务目录通过硬链接引用
+        shared_files = []
+        for file in files:
+            digest, _ = await run_in_threadpool(
+                file_manager.blob_store.ingest_stream, file.file
+            )
+            shared_files.append((file.filename, digest))
+        if file_refs:
+            shared_files.extend(
+                (filename, digest) for digest, filename in _parse_file_refs(file_refs)
+            )
+
+        try:
+            task_ids = await run_in_threadpool(
+                task_manager.submit_tasks,
+                script.id,
+                script_name,
+                args_list,
+                shared_files,
+                description,
+                None,
+                cache,
+                priority,
+                submitter,
+                cpus,
+                memory_mb,
+                timeout,
+                cpu_time_limit,
+                memory_limit_mb,
+                max_attempts,
+                retry_backoff,
+                retry_classes,
+            )
+        except Exception as e:
+            print(f"[ERROR] 批量提交任务失败: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        return BatchSubmitResponse(
+            script_name=script_name, task_ids=task_ids, created_at=datetime.utcnow()
+        )
+
+    @app.post("/api/sweep", response_model=SweepResponse)
+    async def submit_sweep(
+        script_name: str = Form(...),
+        arg_file: UploadFile = File(...),
+        sweep: str = Form(...),
+        mode: str = Form("cartesian"),
+        files: List[UploadFile] = File(default=[]),
+        description: Optional[str] = Form(None),
+        file_refs: Optional[str] = Form(None),
+        priority: int = Form(0),
+        submitter: Optional[str] = Form(None),
+        cpus: Optional[float] = Form(None),
+        memory_mb: Optional[int] = Form(None),
+        timeout: Optional[int] = Form(None),
+        cpu_time_limit: Optional[int] = Form(None),
+        memory_limit_mb: Optional[int] = Form(None),
+        max_attempts: Optional[int] = Form(None),
+        retry_backoff: Optional[float] = Form(None),
+        retry_on: Optional[str] = Form(None),
+        db: SessionLocal = Depends(get_db),
+    ):
+        """提交参数扫描
+
+        arg_file为参数模板，sweep为JSON对象形式的扫描规格：参数路径（以点号分隔
+        嵌套的键）-> 取值列表或{"range": [start, stop, step]}。mode为cartesian时
+        展开为所有取值的笛卡尔积，为zip时按下标逐一配对。服务器在等待队列不足时
+        逐批展开任务，所有任务共享上传的文件，并使用扫描的priority、submitter、
+        资源需求、运行限制与重试策略。
+        """
+        _check_resources(cpus, memory_mb)
+        _check_limits(timeout, cpu_time_limit, memory_limit_mb)
+        retry_classes = _check_retry(max_attempts, retry_backoff, retry_on)
+        script = db.query(Script).filter(Script.name == script_name).first()
+        if not script:
+            raise HTTPException(status_code=404, detail="脚本不存在")
+
+        try:
+            template = json.loads(await arg_file.read())
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="参数文件格式错误")
+        try:
+            spec = json.loads(sweep)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="扫描规格格式错误")
+
+        shared_files = []
+        for file in files:
+            digest, _ = await run_in_threadpool(
+                file_manager.blob_store.ingest_stream, file.file
+            )
+            shared_files.append((file.filename, digest))
+        if file_refs:
+            shared_files.extend(
+                (filename, digest) for digest, filename in _parse_file_refs(file_refs)
+            )
+
+        try:
+            sweep_id = await run_in_threadpool(
+                task_manager.sweeps.create_sweep,
+                script.id,
+                template,
+                spec,
+                mode,
+                shared_files,
+                description,
+                priority,
+                submitter,
+                cpus,
+                memory_mb,
+                timeout,
+                cpu_time_limit,
+                memory_limit_mb,
+                max_attempts,
+                retry_backoff,
+                retry_classes,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return SweepResponse(**task_manager.sweeps.get_sweep(sweep_id))
+
+    @app.get("/api/sweep/{sweep_id}", response_model=SweepResponse)
+    async def get_sweep(sweep_id: str):
+        """获取参数扫描的展开进度与任务状态统计"""
+        sweep = await run_in_threadpool(task_manager.sweeps.get_sweep, sweep_id)
+        if sweep is None:
+            raise HTTPException(status_code=404, detail="参数扫描不存在")
+        return SweepResponse(**sweep)
+
+    @app.delete("/api/sweep/{sweep_id}")
+    async def cancel_sweep(sweep_id: str):
+        """取消参数扫描：停止展开，并取消已展开但未结束的任务"""
+        found = await run_in_threadpool(task_manager.sweeps.cancel_sweep, sweep_id)
+        if not found:
+            raise HTTPException(status_code=404, detail="参数扫描不存在")
+        return {"message": "参数扫描已取消"}
+
+    @app.post("/api/blob/missing", response_model=BlobQueryResponse)
+    async def query_missing_blobs(request: BlobQueryRequest):
+        """查询服务器上尚不存在的文件摘要"""
+        missing = [
+            digest
+            for digest in dict.fromkeys(request.digests)
+            if not _is_valid_digest(digest)
+            or not file_manager.blob_store.has_blob(digest)
+        ]
+        return BlobQueryResponse(missing=missing)
+
+    @app.put("/api/blob/{digest}", response_model=BlobResponse)
+    async def upload_blob(digest: str, request: Request):
+        """按摘要上传文件（请求体为文件原始内容，流式写入）"""
+        if not _is_valid_digest(digest):
+            raise HTTPException(status_code=400, detail="无效的SHA-256摘要")
+
+        writer = file_manager.blob_store.open_writer()
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    await run_in_threadpool(writer.write, chunk)
+            digest, size = await run_in_threadpool(writer.commit, digest)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            writer.close()
+
+        return BlobResponse(digest=digest, size=size)
+
     @app.get("/api/task", response_model=List[TaskResponse])
-    async def list_tasks(db: SessionLocal = Depends(get_db)):
-        """获取任务列表"""
-        tasks = db.query(Task).join(Script).all()
+    async def list_tasks(
+        response: Response,
+        status: Optional[str] = None,
+        script: Optional[str] = None,
+        sweep: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        q: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=MAX_LIST_LIMIT),
+        cursor: Optional[str] = None,
+        db: SessionLocal = Depends(get_db),
+    ):
+        """获取任务列表
+
+        按创建时间从新到旧返回，使用(created_at, id)键集分页；
+        下一页的游标通过X-Next-Cursor响应头返回，没有更多数据时不返回该响应头。
+
+        Args:
+            status: 任务状态，多个状态以逗号分隔
+            script: 脚本名称
+            sweep: 参数扫描ID
+            since: 创建时间下限（包含）
+            until: 创建时间上限（不包含）
+            q: 描述中包含的子串
+            limit: 每页数量
+            cursor: 上一页返回的游标
+        """
+        query = db.query(
+            Task.id,
+            Task.status,
+            Task.description,
+            Task.priority,
+            Task.submitter,
+            Task.created_at,
+            Script.name,
+        ).join(Script, Task.script_id == Script.id)
+
+        if status:
+            statuses = [s.strip() for s in status.split(",") if s.strip()]
+            query = query.filter(Task.status.in_(statuses))
+        if script:
+            # 先解析脚本ID，使查询可以走(script_id, created_at, id)索引
+            script_id = db.query(Script.id).filter(Script.name == script).scalar()
+            if script_id is None:
+                return []
+            query = query.filter(Task.script_id == script_id)
+        if sweep:
+            query = query.filter(Task.sweep_id == sweep)
+        if since:
+            query = query.filter(Task.created_at >= _to_utc_naive(since))
+        if until:
+            query = query.filter(Task.created_at < _to_utc_naive(until))
+        if q:
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(Task.description.like(f"%{escaped}%", escape="\\"))
+        if cursor:
+            try:
+                cursor_time, cursor_id = _decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="无效的分页游标")
+            query = query.filter(
+                or_(
+                    Task.created_at < cursor_time,
+                    and_(Task.created_at == cursor_time, Task.id < cursor_id),
+                )
+            )
+
+        rows = (
+            query.order_by(Task.created_at.desc(), Task.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = _encode_cursor(
+                rows[-1].created_at, rows[-1].id
+            )
+
         return [
             TaskResponse(
-                id=task.id,
-                script_name=task.script.name,
-                status=task.status,
-                description=task.description,
-                created_at=task.created_at,
+                id=row.id,
+                script_name=row.name,
+                status=row.status,
+                description=row.description,
+                priority=row.priority or 0,
+                submitter=row.submitter,
+                created_at=row.created_at,
             )
-            for task in tasks
+            for row in rows
         ]
 
     @app.get("/api/task/{task_id}", response_model=TaskStatusResponse)
-    async def get_task_status(task_id: str, db: SessionLocal = Depends(get_db)):
-        """获取任务状态"""
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
+    async def get_task_status(task_id: str):
+        """获取任务状态，包括结束时记录的资源用量"""
+        status = await run_in_threadpool(task_manager.get_task_status, task_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
+        return TaskStatusResponse(**status)
 
-        return TaskStatusResponse(
-            id=task.id,
-            status=task.status,
-            message=task.message,
-            created_at=task.created_at,
-            started_at=task.started_at,
-            finished_at=task.finished_at,
-        )
+    @app.get("/api/task/{task_id}/attempts", response_model=List[TaskAttemptResponse])
+    async def get_task_attempts(task_id: str):
+        """获取任务的各次尝试，包括失败类别与各自在日志中的字节范围"""
+        attempts = await run_in_threadpool(task_manager.get_task_attempts, task_id)
+        if attempts is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return [TaskAttemptResponse(**attempt) for attempt in attempts]
+
+    @app.post("/api/task/wait", response_model=TaskWaitResponse)
+    async def wait_tasks(request: TaskWaitRequest):
+        """批量等待任务结束（长轮询）
+
+        mode为any时任一任务结束即返回，为all时全部任务结束才返回，
+        超过timeout秒后返回当前状态。请求开始时已结束的任务也计入结果；
+        存在不存在的任务时立即返回。
+        """
+        if request.mode not in ("any", "all"):
+            raise HTTPException(status_code=400, detail="mode必须为any或all")
+        if not 0 <= request.timeout <= MAX_WAIT_TIMEOUT:
+            raise HTTPException(
+                status_code=400, detail=f"timeout必须在0到{MAX_WAIT_TIMEOUT}秒之间"
+            )
+        task_ids = list(dict.fromkeys(request.task_ids))
+        if len(task_ids) > MAX_WAIT_TASKS:
+            raise HTTPException(
+                status_code=400, detail=f"单次最多等待{MAX_WAIT_TASKS}个任务"
+            )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + request.timeout
+
+        # 先订阅再查询，避免遗漏两者之间发生的状态变化
+        subscription = task_manager.notifier.subscribe(task_ids)
+        try:
+            statuses = await run_in_threadpool(
+                task_manager.get_task_statuses, task_ids
+            )
+            pending = {
+                task_id
+                for task_id, status in statuses.items()
+                if status["status"] not in FINISHED_STATUSES
+            }
+            done = len(statuses) < len(task_ids) or (
+                len(pending) < len(task_ids) if request.mode == "any" else not pending
+            )
+
+            # 等待期间只根据通知更新内存中的未结束集合，结束时再统一查询一次
+            changed = False
+            while not done:
+                event = await subscription.get(deadline - loop.time())
+                if event is None:
+                    break
+                task_id, status = event
+                if status in FINISHED_STATUSES and task_id in pending:
+                    pending.discard(task_id)
+                    changed = True
+                    done = request.mode == "any" or not pending
+
+            if changed:
+                statuses = await run_in_threadpool(
+                    task_manager.get_task_statuses, task_ids
+                )
+        finally:
+            task_manager.notifier.unsubscribe(subscription)
+
+        finished = []
+        pending_ids = []
+        missing = []
+        for task_id in task_ids:
+            status = statuses.get(task_id)
+            if status is None:
+                missing.append(task_id)
+            elif status["status"] in FINISHED_STATUSES:
+                finished.append(TaskStatusResponse(**status))
+            else:
+                pending_ids.append(task_id)
+        return TaskWaitResponse(finished=finished, pending=pending_ids, missing=missing)
+
+    @app.get("/api/task/{task_id}/wait", response_model=TaskStatusResponse)
+    async def wait_task(
+        task_id: str, timeout: float = Query(30, ge=0, le=MAX_WAIT_TIMEOUT)
+    ):
+        """等待任务结束（长轮询）
+
+        任务进入completed、failed或cancelled状态，或超过timeout秒后返回任务的当前状态。
+        等待期间由任务状态变化通知唤醒，不轮询数据库，也不占用数据库连接。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        # 先订阅再查询，避免遗漏两者之间发生的状态变化
+        subscription = task_manager.notifier.subscribe([task_id])
+        try:
+            status = await run_in_threadpool(task_manager.get_task_status, task_id)
+            if status is None:
+                raise HTTPException(status_code=404, detail="任务不存在")
+
+            while status["status"] not in FINISHED_STATUSES:
+                event = await subscription.get(deadline - loop.time())
+                if event is None:
+                    break
+                if event[1] in FINISHED_STATUSES:
+                    status = await run_in_threadpool(
+                        task_manager.get_task_status, task_id
+                    )
+        finally:
+            task_manager.notifier.unsubscribe(subscription)
+
+        return TaskStatusResponse(**status)
 
-    @app.get("/api/task/{task_id}/log")
-    async def get_task_log(task_id: str, lines: int = 100):
-        """获取任务日志"""
+    @app.get("/api/task/{task_id}/log", response_model=TaskLogResponse)
+    async def get_task_log(
+        task_id: str,
+        lines: int = 100,
+        line_offset: int = 0,
+        offset: Optional[int] = None,
+        max_bytes: int = MAX_READ_BYTES,
+        attempt: Optional[int] = None,
+    ):
+        """获取任务日志
+
+        默认返回最后lines行（可用line_offset向前翻页）；指定offset时
+        返回从该字节偏移开始的至多max_bytes字节。各次尝试的日志依次追加，
+        指定attempt时从该次尝试日志段的起点（或offset）读取，不超过日志段末尾。
+        """
         try:
-            log_content = task_manager.get_task_log(task_id, lines)
-            return {"log": log_content}
+            window = task_manager.read_task_log(
+                task_id,
+                lines=lines,
+                line_offset=line_offset,
+                byte_offset=offset,
+                max_bytes=min(max(0, max_bytes), MAX_READ_BYTES),
+                attempt=attempt,
+            )
+            return TaskLogResponse(**window)
         except FileNotFoundError:
             raise HTTPException(status_code=404, detail="任务或日志文件不存在")
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @app.get("/api/task/{task_id}/log/stream")
+    async def stream_task_log(
+        task_id: str,
+        request: Request,
+        offset: Optional[int] = None,
+        lines: int = 0,
+    ):
+        """以Server-Sent Events持续推送任务日志的新增内容
+
+        从offset字节处开始（支持Last-Event-ID续传）；未指定offset时从最后lines行开始。
+        每个log事件的data为JSON，包含log、offset与next_offset，事件id为next_offset；
+        任务结束且日志读完后发送end事件。
+        """
+        if not (task_manager.tasks_dir / task_id).exists():
+            raise HTTPException(status_code=404, detail="任务不存在")
+
+        log_file = task_manager.get_task_log_path(task_id)
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id and last_event_id.isdigit():
+            offset = int(last_event_id)
+        elif offset is None:
+            offset = 0
+            if lines > 0 and log_file.exists():
+                offset = (await run_in_threadpool(tail_lines, log_file, lines))["start"]
+        elif offset < 0:
+            size = log_file.stat().st_size if log_file.exists() else 0
+            offset = max(0, size + offset)
+
+        async def event_stream():
+            windows = follow_log(
+                log_file, offset, lambda: task_manager.is_task_active(task_id)
+            )
+            async for window in windows:
+                if await request.is_disconnected():
+                    return
+                if window is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                data = {
+                    "log": window["content"].decode("utf-8", errors="replace"),
+                    "offset": window["start"],
+                    "next_offset": window["end"],
+                }
+                yield (
+                    f"id: {window['end']}\nevent: log\n"
+                    f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                )
+            yield "event: end\ndata: {}\n\n"
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @app.get("/api/task/{task_id}/metadata")
     async def download_task_metadata(task_id: str):
-        """下载任务中间文件"""
+        """下载任务中间文件（边压缩边传输）"""
         try:
-            zip_path = task_manager.create_metadata_archive(task_id)
-            return FileResponse(
-                zip_path,
-                media_type="application/zip",
-                filename=f"{task_id}_metadata.zip",
+            chunks = await run_in_threadpool(
+                task_manager.iter_metadata_archive, task_id
             )
         except FileNotFoundError:
             raise HTTPException(status_code=404, detail="任务不存在")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(
+            chunks,
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{task_id}_metadata.zip"'
+            },
+        )
 
     @app.get("/api/task/{task_id}/result")
     async def download_task_result(task_id: str):
-        """下载任务结果文件"""
+        """下载任务结果文件（边压缩边传输）"""
         try:
-            zip_path = task_manager.create_result_archive(task_id)
-            return FileResponse(
-                zip_path, media_type="application/zip", filename=f"{task_id}_result.zip"
+            chunks = await run_in_threadpool(
+                task_manager.iter_result_archive, task_id
             )
         except FileNotFoundError:
             raise HTTPException(status_code=404, detail="任务不存在")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(
+            chunks,
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{task_id}_result.zip"'
+            },
+        )
+
+    @app.get("/api/queue", response_model=QueueStatsResponse)
+    async def get_queue_stats():
+        """获取调度队列状态"""
+        return QueueStatsResponse(**task_manager.get_queue_stats())
+
+    @app.get("/api/stats", response_model=StatsResponse)
+    async def get_stats():
+        """获取任务统计信息（由内存计数器提供，不扫描任务表）"""
+        return StatsResponse(
+            **task_manager.get_task_stats(), queue=task_manager.get_queue_stats()
+        )
 
     @app.delete("/api/task/{task_id}")
     async def cancel_task(task_id: str, db: SessionLocal = Depends(get_db)):
@@ -236,7 +1070,7 @@ def create_app(base_dir: str = None) -> FastAPI:
             if not task:
                 raise HTTPException(status_code=404, detail="任务不存在")
 
-            if task.status in ["completed", "failed", "cancelled"]:
+            if task.status in FINISHED_STATUSES:
                 raise HTTPException(status_code=400, detail="任务已完成或已取消")
 
             # 取消任务
@@ -250,6 +1084,97 @@ def create_app(base_dir: str = None) -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @app.post("/api/worker/lease", response_model=WorkerLeaseResponse)
+    async def lease_tasks(request: WorkerLeaseRequest):
+        """远程worker按提交顺序租用等待中的任务"""
+        tasks = await run_in_threadpool(
+            task_manager.leases.lease, request.worker_id, request.slots
+        )
+        return WorkerLeaseResponse(
+            tasks=tasks, lease_timeout=task_manager.leases.lease_timeout
+        )
+
+    @app.post("/api/worker/heartbeat", response_model=WorkerHeartbeatResponse)
+    async def worker_heartbeat(request: WorkerHeartbeatRequest):
+        """为worker运行中的任务续约，返回worker应终止的任务"""
+        cancelled = await run_in_threadpool(
+            task_manager.leases.heartbeat, request.worker_id, request.task_ids
+        )
+        return WorkerHeartbeatResponse(
+            cancelled=cancelled, lease_timeout=task_manager.leases.lease_timeout
+        )
+
+    @app.get("/api/worker/task/{task_id}/file/{path:path}")
+    async def download_task_input(task_id: str, path: str, worker_id: str):
+        """下载worker所租用任务的输入文件"""
+        try:
+            file_path = await run_in_threadpool(
+                task_manager.leases.input_path, task_id, worker_id, path
+            )
+        except LeaseError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="文件不存在")
+        return FileResponse(file_path, media_type="application/octet-stream")
+
+    @app.post("/api/worker/task/{task_id}/log")
+    async def append_task_log(
+        task_id: str, worker_id: str, offset: int, request: Request
+    ):
+        """在指定偏移处写入worker上传的任务日志（请求体为日志原始内容）"""
+        data = await request.body()
+        try:
+            size = await run_in_threadpool(
+                task_manager.leases.append_log, task_id, worker_id, offset, data
+            )
+        except LeaseError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"size": size}
+
+    @app.post("/api/worker/task/{task_id}/complete")
+    async def complete_task(
+        task_id: str,
+        worker_id: str = Form(...),
+        returncode: Optional[int] = Form(None),
+        error: Optional[str] = Form(None),
+        timed_out: bool = Form(False),
+        resource_usage: Optional[str] = Form(None),
+        results: Optional[UploadFile] = File(None),
+    ):
+        """记录worker完成的任务
+
+        results为metadata/与output/的zip压缩包；timed_out表示脚本因运行超时
+        被worker终止；resource_usage为JSON对象形式的资源用量。
+        """
+        if returncode is None and not error:
+            raise HTTPException(status_code=400, detail="returncode与error至少提供一个")
+        usage = None
+        if resource_usage:
+            try:
+                usage = json.loads(resource_usage)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail="resource_usage格式错误")
+            if not isinstance(usage, dict):
+                raise HTTPException(status_code=400, detail="resource_usage必须为JSON对象")
+        try:
+            await run_in_threadpool(
+                task_manager.leases.complete,
+                task_id,
+                worker_id,
+                returncode,
+                results.file if results is not None else None,
+                error,
+                timed_out,
+                usage,
+            )
+        except LeaseError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"message": "任务结果已保存"}
+
     @app.get("/health")
     async def health_check():
         """健康检查"""
@@ -10,12 +10,15 @@ from typing import Optional
 
 import uvicorn
 from .app import create_app
+from ..core.config import init_config
 
 
 class DaemonManager:
     """守护进程管理器"""
 
-    def __init__(self, base_dir: str = None, host: str = "127.0.0.1", port: int = 8000):
+    def __init__(
+        self, base_dir: str = None, host: str = "127.0.0.1", port: int = 8000, **kwargs
+    ):
         if base_dir is None:
             base_dir = Path.home() / ".cubqueue"
         else:
@@ -24,6 +27,8 @@ class DaemonManager:
         self.base_dir = base_dir
         self.host = host
         self.port = port
+        # 传递给CubQueueConfig的其他配置参数
+        self.config_kwargs = kwargs
         self.pid_file = base_dir / "cubqueue.pid"
         self.log_file = base_dir / "cubqueue.log"
 
@@ -32,7 +37,8 @@ class DaemonManager:
 
     def start_server(self):
         """启动服务器（非守护进程模式）"""
-        app = create_app(self.base_dir)
+        config = init_config(str(self.base_dir), **self.config_kwargs)
+        app = create_app(self.base_dir, config=config)
         uvicorn.run(app, host=self.host, port=self.port, log_level="info")
 
     def start_daemon(self):
@@ -92,9 +98,9 @@ class DaemonManager:
                 # 发送TERM信号
                 os.kill(pid, signal.SIGTERM)
 
-                # 等待进程结束
+                # 等待进程结束，服务器关闭时需要先终止运行中任务的进程树
                 process = psutil.Process(pid)
-                process.wait(timeout=10)
+                process.wait(timeout=45)
             except (ProcessLookupError, psutil.NoSuchProcess):
                 # 进程已经不存在
                 pass
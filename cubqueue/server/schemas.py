@@ -2,7 +2,7 @@
 
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class ScriptResponse(BaseModel):
@@ -11,6 +11,16 @@ class ScriptResponse(BaseModel):
     id: int
     name: str
     description: str
+    executor: str = "subprocess"
+    preload: Optional[List[str]] = None
+    cpus: Optional[float] = None
+    memory_mb: Optional[int] = None
+    timeout: Optional[int] = None
+    cpu_time_limit: Optional[int] = None
+    memory_limit_mb: Optional[int] = None
+    max_attempts: Optional[int] = None
+    retry_backoff: Optional[float] = None
+    retry_on: Optional[List[str]] = None
     created_at: datetime
 
     class Config:
@@ -24,12 +34,47 @@ class TaskResponse(BaseModel):
     script_name: str
     status: str
     description: Optional[str] = None
+    priority: int = 0
+    submitter: Optional[str] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class BatchSubmitResponse(BaseModel):
+    """批量提交任务响应模式"""
+
+    script_name: str
+    task_ids: List[str]
+    created_at: datetime
+
+
+class SweepResponse(BaseModel):
+    """参数扫描响应模式"""
+
+    id: str
+    script_name: str
+    mode: str
+    status: str
+    description: Optional[str] = None
+    priority: int = 0
+    submitter: Optional[str] = None
+    cpus: Optional[float] = None
+    memory_mb: Optional[int] = None
+    timeout: Optional[int] = None
+    cpu_time_limit: Optional[int] = None
+    memory_limit_mb: Optional[int] = None
+    max_attempts: Optional[int] = None
+    retry_backoff: Optional[float] = None
+    retry_on: Optional[List[str]] = None
+    total: int
+    expanded: int
+    counts: Dict[str, int]
+    message: Optional[str] = None
+    created_at: datetime
+
+
 class TaskStatusResponse(BaseModel):
     """任务状态响应模式"""
 
@@ -39,11 +84,157 @@ class TaskStatusResponse(BaseModel):
     created_at: datetime
     started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
+    resource_usage: Optional[Dict[str, float]] = None
+    attempt: int = 1
+    retry_at: Optional[datetime] = None  # 等待重试的任务最早再次启动的时间
 
     class Config:
         from_attributes = True
 
 
+class TaskAttemptResponse(BaseModel):
+    """任务尝试响应模式"""
+
+    attempt: int
+    status: str
+    return_code: Optional[int] = None
+    failure: Optional[str] = None  # exit:N、signal:NAME、timeout或error
+    message: Optional[str] = None
+    worker_id: Optional[str] = None
+    log_start: int  # 本次尝试在任务日志中的字节范围
+    log_end: Optional[int] = None
+    resource_usage: Optional[Dict[str, float]] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class TaskWaitRequest(BaseModel):
+    """批量等待任务请求模式"""
+
+    task_ids: List[str]
+    mode: str = "any"  # any: 任一任务结束即返回；all: 全部任务结束才返回
+    timeout: float = 30
+
+
+class TaskWaitResponse(BaseModel):
+    """批量等待任务响应模式"""
+
+    finished: List[TaskStatusResponse]
+    pending: List[str]
+    missing: List[str]
+
+
+class TaskLogResponse(BaseModel):
+    """任务日志响应模式"""
+
+    log: str
+    offset: int
+    next_offset: int
+    size: int
+
+
+class QueueStatsResponse(BaseModel):
+    """调度队列状态响应模式"""
+
+    max_concurrent_tasks: int
+    running: int
+    queued: int
+    oldest_wait_seconds: float
+    avg_wait_seconds: float
+    max_wait_seconds: float
+    worker_queued: int = 0
+    queued_by_group: Dict[str, int] = {}
+    resources: Optional[Dict[str, float]] = None
+
+
+class ThroughputResponse(BaseModel):
+    """时间窗口吞吐量响应模式"""
+
+    window_seconds: int
+    finished: int
+    completed: int
+    failed: int
+    timeout: int = 0
+    cancelled: int
+    per_minute: float
+
+
+class StatsResponse(BaseModel):
+    """任务统计响应模式"""
+
+    total: int
+    by_status: Dict[str, int]
+    by_script: Dict[str, Dict[str, int]]
+    throughput: List[ThroughputResponse]
+    queue: QueueStatsResponse
+
+
+class BlobQueryRequest(BaseModel):
+    """文件摘要查询请求模式"""
+
+    digests: List[str]
+
+
+class BlobQueryResponse(BaseModel):
+    """文件摘要查询响应模式"""
+
+    missing: List[str]
+
+
+class BlobResponse(BaseModel):
+    """文件上传响应模式"""
+
+    digest: str
+    size: int
+
+
+class WorkerLeaseRequest(BaseModel):
+    """worker租用任务请求模式"""
+
+    worker_id: str
+    slots: int = 1
+
+
+class WorkerInputFile(BaseModel):
+    """worker任务输入文件模式"""
+
+    path: str
+    size: int
+    digest: str
+
+
+class WorkerTask(BaseModel):
+    """worker租用到的任务模式"""
+
+    id: str
+    script_name: str
+    argv: List[str]
+    files: List[WorkerInputFile]
+    timeout: Optional[int] = None
+    rlimits: Dict[str, int] = {}
+
+
+class WorkerLeaseResponse(BaseModel):
+    """worker租用任务响应模式"""
+
+    tasks: List[WorkerTask]
+    lease_timeout: float
+
+
+class WorkerHeartbeatRequest(BaseModel):
+    """worker心跳请求模式"""
+
+    worker_id: str
+    task_ids: List[str] = []
+
+
+class WorkerHeartbeatResponse(BaseModel):
+    """worker心跳响应模式"""
+
+    cancelled: List[str]
+    lease_timeout: float
+
+
 class ErrorResponse(BaseModel):
     """错误响应模式"""
 
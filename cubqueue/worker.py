@@ -0,0 +1,407 @@
+"""CubQueue远程worker
+
+worker通过HTTP从服务器租用执行后端为worker的脚本的任务，在本机运行：
+下载脚本、参数文件与输入文件（按SHA-256摘要缓存在本地，相同的文件只下载一次），
+运行期间定期发送心跳续约并上传新增日志，结束后上传metadata/与output/以及资源用量。
+任务的运行超时由worker计时，CPU时间与地址空间上限在脚本进程启动时设置。
+脚本在独立的会话中运行，超时、收回或worker退出时终止整个进程树，
+脚本退出后残留的后代进程也一并清理。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from .core.limits import USAGE_SAMPLE_INTERVAL, UsageSampler, rlimits_preexec
+from .core.proctree import TASK_ID_ENV, ProcessTree
+
+# 没有可租用的任务时再次租用前等待的时间（秒）
+IDLE_POLL_INTERVAL = 2
+
+# 上传日志的时间间隔（秒）
+LOG_UPLOAD_INTERVAL = 1
+
+# 单次上传的最大日志字节数
+LOG_CHUNK_SIZE = 1024 * 1024
+
+# 终止任务时发送SIGTERM后等待进程退出的时间（秒），超时后发送SIGKILL
+KILL_GRACE_PERIOD = 10
+
+
+class WorkerAgent:
+    """从CubQueue服务器租用并运行任务的worker"""
+
+    def __init__(
+        self,
+        server_url: str,
+        slots: int = 1,
+        work_dir: Optional[str] = None,
+        worker_id: Optional[str] = None,
+    ):
+        """初始化worker
+
+        Args:
+            server_url: 服务器URL
+            slots: 同时运行的最大任务数
+            work_dir: 工作目录，存放文件缓存与任务目录，默认为~/.cubqueue-worker
+            worker_id: worker ID，默认由主机名、进程号与随机串组成
+        """
+        self.server_url = server_url.rstrip("/")
+        self.slots = max(1, int(slots))
+        self.work_dir = Path(work_dir or Path.home() / ".cubqueue-worker")
+        self.cache_dir = self.work_dir / "cache"
+        self.tasks_dir = self.work_dir / "tasks"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.tasks_dir.mkdir(parents=True, exist_ok=True)
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+
+        self.session = requests.Session()
+        self.lease_timeout = 60.0
+
+        self._lock = threading.Lock()
+        # 任务ID -> 运行中的脚本进程（下载输入期间为None）
+        self._running: Dict[str, Optional[subprocess.Popen]] = {}
+        # 任务ID -> 脚本的进程树，运行期间记录后代进程
+        self._trees: Dict[str, ProcessTree] = {}
+        # 被服务器收回的任务，结束后不再上传结果
+        self._revoked = set()
+        self._stop = threading.Event()
+        self._slot_freed = threading.Event()
+
+    def run(self):
+        """租用并运行任务，直到stop被调用或进程收到中断"""
+        print(f"[worker] {self.worker_id} 已连接 {self.server_url}，并发数 {self.slots}")
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="cubqueue-worker-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    free = self.slots - len(self._running)
+                if free <= 0:
+                    self._slot_freed.wait(IDLE_POLL_INTERVAL)
+                    self._slot_freed.clear()
+                    continue
+
+                try:
+                    tasks = self._lease(free)
+                except requests.RequestException as e:
+                    print(f"[worker] 租用任务失败: {e}")
+                    tasks = []
+                if not tasks:
+                    self._stop.wait(IDLE_POLL_INTERVAL)
+                    continue
+
+                for task in tasks:
+                    with self._lock:
+                        self._running[task["id"]] = None
+                    threading.Thread(
+                        target=self._run_task,
+                        args=(task,),
+                        name=f"cubqueue-worker-{task['id'][:8]}",
+                        daemon=True,
+                    ).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止租用新任务并终止运行中的任务，服务器在租约过期后将其重新排队"""
+        self._stop.set()
+        with self._lock:
+            self._revoked.update(self._running)
+            processes = [
+                (p, self._trees.get(task_id))
+                for task_id, p in self._running.items()
+                if p is not None
+            ]
+        for process, tree in processes:
+            _kill_group(process, tree)
+
+    def _lease(self, slots: int):
+        response = self.session.post(
+            f"{self.server_url}/api/worker/lease",
+            json={"worker_id": self.worker_id, "slots": slots},
+            timeout=30,
+        )
+        response.raise_for_status()
+        data = response.json()
+        self.lease_timeout = data["lease_timeout"]
+        return data["tasks"]
+
+    def _heartbeat_loop(self):
+        """定期为运行中的任务续约，并终止已被服务器收回的任务"""
+        next_beat = 0.0
+        while not self._stop.wait(1.0):
+            # 每个租约有效期内发送三次心跳
+            if time.monotonic() < next_beat:
+                continue
+            next_beat = time.monotonic() + max(1.0, self.lease_timeout / 3)
+            with self._lock:
+                task_ids = list(self._running)
+            if not task_ids:
+                continue
+            try:
+                response = self.session.post(
+                    f"{self.server_url}/api/worker/heartbeat",
+                    json={"worker_id": self.worker_id, "task_ids": task_ids},
+                    timeout=30,
+                )
+                response.raise_for_status()
+            except requests.RequestException as e:
+                print(f"[worker] 心跳失败: {e}")
+                continue
+
+            for task_id in response.json()["cancelled"]:
+                self._revoke(task_id)
+
+    def _revoke(self, task_id: str):
+        """任务已被服务器收回（取消或租约失效），终止运行且不再上传结果"""
+        with self._lock:
+            if task_id in self._revoked or task_id not in self._running:
+                return
+            self._revoked.add(task_id)
+            process = self._running.get(task_id)
+            tree = self._trees.get(task_id)
+        print(f"[worker] 任务 {task_id} 已被服务器收回，终止运行")
+        if process is not None:
+            threading.Thread(
+                target=_kill_group, args=(process, tree), daemon=True
+            ).start()
+
+    def _run_task(self, task: Dict[str, Any]):
+        """准备任务目录、运行脚本并上传结果"""
+        task_id = task["id"]
+        task_dir = self.tasks_dir / task_id
+        print(f"[worker] 开始任务 {task_id} ({task['script_name']})")
+        try:
+            returncode, error, timed_out, usage = None, None, False, None
+            try:
+                self._prepare_task_dir(task, task_dir)
+                returncode, timed_out, usage = self._execute(task, task_dir)
+            except Exception as e:
+                error = str(e)
+
+            with self._lock:
+                revoked = task_id in self._revoked
+            if not revoked:
+                self._complete(task_id, task_dir, returncode, error, timed_out, usage)
+                if timed_out:
+                    print(f"[worker] 任务 {task_id} 运行超时，已终止")
+                else:
+                    print(f"[worker] 任务 {task_id} 结束，退出码 {returncode}")
+        except requests.RequestException as e:
+            # 服务器在租约过期后会将任务重新排队
+            print(f"[worker] 上传任务 {task_id} 结果失败: {e}")
+        finally:
+            shutil.rmtree(task_dir, ignore_errors=True)
+            with self._lock:
+                self._running.pop(task_id, None)
+                self._trees.pop(task_id, None)
+                self._revoked.discard(task_id)
+            self._slot_freed.set()
+
+    def _prepare_task_dir(self, task: Dict[str, Any], task_dir: Path):
+        """下载（或从缓存链接）任务的输入文件"""
+        shutil.rmtree(task_dir, ignore_errors=True)
+        for name in ("files", "metadata", "output"):
+            (task_dir / name).mkdir(parents=True)
+
+        for item in task["files"]:
+            cached = self._fetch(task["id"], item["path"], item["digest"])
+            target = task_dir / item["path"]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(cached, target)
+            except OSError:
+                shutil.copy2(cached, target)
+
+    def _fetch(self, task_id: str, path: str, digest: str) -> Path:
+        """获取摘要为digest的文件，本地缓存中没有时从服务器下载"""
+        cached = self.cache_dir / digest
+        if cached.exists():
+            return cached
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            sha256 = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f:
+                with self.session.get(
+                    f"{self.server_url}/api/worker/task/{task_id}/file/{path}",
+                    params={"worker_id": self.worker_id},
+                    stream=True,
+                    timeout=60,
+                ) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        sha256.update(chunk)
+                        f.write(chunk)
+            if sha256.hexdigest() != digest.lower():
+                raise ValueError(f"文件 {path} 的SHA-256摘要不匹配")
+            os.replace(tmp_path, cached)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return cached
+
+    def _execute(
+        self, task: Dict[str, Any], task_dir: Path
+    ) -> Tuple[int, bool, Dict[str, float]]:
+        """运行脚本，运行期间持续上传新增日志
+
+        Returns:
+            (退出码, 是否因运行超时被终止, 资源用量)
+        """
+        task_id = task["id"]
+        env = os.environ.copy()
+        env[TASK_ID_ENV] = task_id
+        env["CUBQUEUE_TASK_DIR"] = str(task_dir)
+        env["CUBQUEUE_FILES_DIR"] = str(task_dir / "files")
+
+        log_path = task_dir / "log.txt"
+        with open(log_path, "wb") as log_f:
+            with self._lock:
+                if task_id in self._revoked or self._stop.is_set():
+                    raise RuntimeError("任务已被收回")
+                process = subprocess.Popen(
+                    task["argv"],
+                    cwd=task_dir,
+                    stdout=log_f,
+                    stderr=subprocess.STDOUT,
+                    env=env,
+                    start_new_session=True,
+                    preexec_fn=rlimits_preexec(task.get("rlimits")),
+                )
+                self._running[task_id] = process
+                tree = self._trees[task_id] = ProcessTree(process.pid, task_id=task_id)
+
+        started = time.monotonic()
+        deadline = started + task["timeout"] if task.get("timeout") else None
+        sampler = UsageSampler(process.pid)
+        next_sample = 0.0
+        timed_out = False
+        offset = 0
+        while True:
+            finished = process.poll() is not None
+            now = time.monotonic()
+            if not finished and now >= next_sample:
+                sampler.sample()
+                tree.refresh()
+                next_sample = now + USAGE_SAMPLE_INTERVAL
+            if not finished and deadline is not None and now >= deadline:
+                timed_out = True
+                _kill_group(process, tree)
+                finished = True
+            with self._lock:
+                revoked = task_id in self._revoked
+            if not revoked:
+                offset = self._upload_log(task_id, log_path, offset)
+            if finished:
+                usage = sampler.usage(time.monotonic() - started)
+                # 清理脚本退出后残留的后代进程
+                tree.terminate(KILL_GRACE_PERIOD)
+                return process.returncode, timed_out, usage
+            try:
+                process.wait(timeout=LOG_UPLOAD_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def _upload_log(self, task_id: str, log_path: Path, offset: int) -> int:
+        """上传日志中offset之后的内容，返回新的偏移"""
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            while True:
+                data = f.read(LOG_CHUNK_SIZE)
+                if not data:
+                    return offset
+                try:
+                    response = self.session.post(
+                        f"{self.server_url}/api/worker/task/{task_id}/log",
+                        params={"worker_id": self.worker_id, "offset": offset},
+                        data=data,
+                        timeout=30,
+                    )
+                    if response.status_code == 409:
+                        self._revoke(task_id)
+                        return offset
+                    response.raise_for_status()
+                except requests.RequestException as e:
+                    # 下次从同一偏移重试
+                    print(f"[worker] 上传任务 {task_id} 日志失败: {e}")
+                    return offset
+                offset += len(data)
+
+    def _complete(
+        self,
+        task_id: str,
+        task_dir: Path,
+        returncode: Optional[int],
+        error: Optional[str],
+        timed_out: bool = False,
+        usage: Optional[Dict[str, float]] = None,
+    ):
+        """打包metadata/与output/并报告任务结束"""
+        data = {"worker_id": self.worker_id}
+        if returncode is not None:
+            data["returncode"] = str(returncode)
+        if error:
+            data["error"] = error
+        if timed_out:
+            data["timed_out"] = "true"
+        if usage:
+            data["resource_usage"] = json.dumps(usage)
+
+        with tempfile.TemporaryFile(dir=self.work_dir) as archive:
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for name in ("metadata", "output"):
+                    root = task_dir / name
+                    if not root.is_dir():
+                        continue
+                    zf.write(root, name)
+                    for path in sorted(root.rglob("*")):
+                        zf.write(path, path.relative_to(task_dir).as_posix())
+            archive.seek(0)
+            response = self.session.post(
+                f"{self.server_url}/api/worker/task/{task_id}/complete",
+                data=data,
+                files={"results": ("results.zip", archive, "application/zip")},
+                timeout=300,
+            )
+        if response.status_code == 409:
+            print(f"[worker] 任务 {task_id} 的租约已失效，结果未被接受")
+            return
+        response.raise_for_status()
+
+
+def _kill_group(process: subprocess.Popen, tree: Optional[ProcessTree] = None):
+    """先向进程树发送SIGTERM，超过宽限期后发送SIGKILL，脚本退出后清理其余进程"""
+    if tree is None:
+        tree = ProcessTree(process.pid)
+    tree.refresh()
+    for signum in (signal.SIGTERM, signal.SIGKILL):
+        tree.signal(signum)
+        try:
+            process.wait(timeout=KILL_GRACE_PERIOD)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+    else:
+        process.wait()
+    tree.terminate(KILL_GRACE_PERIOD)
@@ -29,6 +29,9 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "ray": ["ray>=2.9.0"],
+    },
     entry_points={
         "console_scripts": [
             "cubqueue=cubqueue.cli.main:main",